@@ -0,0 +1,86 @@
+"""
+JPEG decode benchmark for the viewer at every OV5642 resolution.
+
+Encodes a synthetic scene at each size the Arducam driver supports and
+times the viewer's decode + fit-to-window step with a full decode and
+with draft-mode (DCT-domain) downscaling.
+
+    python bench/bench_decode.py --window 860x480
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import cloud  # noqa: E402
+from util import synthetic_jpeg  # noqa: E402
+
+# Frame sizes selectable through Arducam.OV5642_* constants
+OV5642_SIZES = [
+    ("OV5642_320x240", (320, 240)),
+    ("OV5642_640x480", (640, 480)),
+    ("OV5642_1024x768", (1024, 768)),
+    ("OV5642_1280x960", (1280, 960)),
+    ("OV5642_1600x1200", (1600, 1200)),
+    ("OV5642_1920x1080", (1920, 1080)),
+    ("OV5642_2048x1536", (2048, 1536)),
+    ("OV5642_2592x1944", (2592, 1944)),
+]
+
+
+def time_full(jpeg, box, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        img = Image.open(io.BytesIO(jpeg))
+        img.load()
+        cloud.fit_image(img, box)
+    return (time.perf_counter() - t0) / repeat
+
+
+class _Slot:
+    first_ts = 0.0
+
+    def __init__(self, jpeg):
+        self._jpeg = jpeg
+
+    def view(self):
+        return memoryview(self._jpeg)
+
+
+def time_draft(jpeg, box, repeat):
+    slot = _Slot(jpeg)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        job = cloud.DecodeJob((0, 0), slot, box)
+        job.run()
+        if job.error is not None:
+            raise job.error
+    return (time.perf_counter() - t0) / repeat, job.image.size
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--window", default="860x480", help="display box WxH")
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+    box = tuple(int(v) for v in args.window.lower().split("x"))
+
+    print(f"display box {box[0]}x{box[1]}, {args.repeat} decodes per size")
+    print(f"{'resolution':>17} {'jpeg KB':>8} {'full ms':>8} {'draft ms':>9} {'decoded at':>11} {'speedup':>8}")
+    for name, size in OV5642_SIZES:
+        jpeg = synthetic_jpeg(size)
+        full = time_full(jpeg, box, args.repeat)
+        draft, decoded = time_draft(jpeg, box, args.repeat)
+        print(f"{name:>17} {len(jpeg) / 1024:8.1f} {full * 1000:8.2f} {draft * 1000:9.2f} "
+              f"{decoded[0]:>5}x{decoded[1]:<5} {full / draft:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
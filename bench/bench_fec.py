@@ -0,0 +1,136 @@
+"""
+XOR parity FEC: encode cost on the camera, decode throughput on the desktop.
+
+Encode: times lib/fec.py's pure-Python xor_into (the loop a bytecode-only
+MicroPython build runs; on CPython it is the same byte loop) per 1200-byte
+chunk, and estimates the ESP32 cost per frame for the bytecode and viper
+builds from per-byte figures given on the command line (estimates, not
+measurements), next to the frame's airtime.
+
+Decode: packetizes frames with the firmware's send_frame_chunks and an
+XorParity (main.py on mpstubs), drops datagrams (data and parity alike)
+at random, and feeds the rest to cloud.Reassembler. Reports complete
+frames, chunks rebuilt, link overhead and reassembly throughput for each
+FEC group size against no FEC, and checks every complete frame is
+byte-identical to the original.
+
+    python bench/bench_fec.py --loss 0.005,0.01,0.03,0.05 --groups 4,8,16
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import mpstubs  # noqa: E402
+import cloud  # noqa: E402
+
+CHUNK = 1200
+
+
+def encode_cost(fec, repeat):
+    dst = bytearray(os.urandom(CHUNK))
+    src = bytes(os.urandom(CHUNK))
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fec.xor_into(dst, src, CHUNK)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def packetize(fw, frames, group):
+    """Datagrams for each frame, as the firmware sends them."""
+    sock = fw.socket.socket()
+    sock.keep = True
+    parity = fw.XorParity(group, fw.MAX_PAYLOAD, fw.PARITY_HDR_SIZE) if group else None
+    out = []
+    for frame_id, jpeg in enumerate(frames):
+        sock.sent = []
+        fw.send_frame_chunks(sock, "192.168.4.1", 4444, jpeg, frame_id, parity)
+        out.append(sock.sent)
+    return out
+
+
+def decode(packets, frames, loss, seed):
+    rng = random.Random(seed)
+    kept = [[p for p in pkts if rng.random() >= loss] for pkts in packets]
+    reasm = cloud.Reassembler(nack_deadline=0)
+    complete = 0
+    wrong = 0
+    now = 0.0
+    t0 = time.perf_counter()
+    for pkts in kept:
+        now += 0.07
+        for p in pkts:
+            slot = reasm.feed(0, p, now)
+            if slot is not None:
+                complete += 1
+                wrong += bytes(slot.view()) != frames[slot.frame_id]
+                slot.release()
+    elapsed = time.perf_counter() - t0
+    return {
+        "complete": complete / len(frames),
+        "rebuilt": reasm.fec_rebuilt,
+        "wrong": wrong,
+        "mbps": sum(len(f) for f in frames) * 8 / elapsed / 1e6,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--loss", default="0.005,0.01,0.03,0.05", help="datagram loss rates")
+    ap.add_argument("--groups", default="4,8,16", help="data chunks per parity chunk")
+    ap.add_argument("--frame-kb", type=float, default=20)
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--wifi-mbps", type=float, default=8.0)
+    ap.add_argument("--bytecode-us-per-byte", type=float, default=2.0,
+                    help="assumed cost of the pure-Python loop on an ESP32-S3")
+    ap.add_argument("--viper-ns-per-byte", type=float, default=40.0,
+                    help="assumed cost of the viper loop on an ESP32-S3")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        fw = mpstubs.load_firmware()
+    fec = sys.modules["fec"]
+    groups = [int(g) for g in args.groups.split(",")]
+    size = int(args.frame_kb * 1024)
+    chunks = (size + CHUNK - 1) // CHUNK
+    airtime_ms = size * 8 / args.wifi_mbps / 1000
+
+    us = encode_cost(fec, 200)
+    print(f"encode: pure-Python xor_into {us:.0f} us per {CHUNK}-byte chunk on this CPU")
+    print(f"estimated ESP32 cost for a {args.frame_kb:g} KB frame ({chunks} chunks, "
+          f"{airtime_ms:.1f} ms airtime at {args.wifi_mbps:g} Mbit/s)")
+    print(f"{'group':>6} {'overhead':>9} {'bytecode ms':>12} {'viper ms':>9}")
+    for g in groups:
+        xored = size - min(size, (chunks + g - 1) // g * CHUNK)  # first chunk of a group is copied
+        print(f"{g:>6} {1 / g:9.1%} {xored * args.bytecode_us_per_byte / 1000:12.1f} "
+              f"{xored * args.viper_ns_per_byte / 1e6:9.2f}")
+
+    rng = random.Random(args.seed)
+    frames = [bytes(rng.getrandbits(8) for _ in range(size - rng.randrange(CHUNK)))
+              for _ in range(args.frames)]
+    packets = {g: packetize(fw, frames, g) for g in [0] + groups}
+    print()
+    print(f"decode: {args.frames} frames of about {args.frame_kb:g} KB, random datagram loss")
+    print(f"{'loss':>6} {'group':>6} {'complete':>9} {'rebuilt':>8} {'Mbit/s':>8}")
+    wrong = 0
+    for loss in (float(v) for v in args.loss.split(",")):
+        for g in [0] + groups:
+            r = decode(packets[g], frames, loss, args.seed)
+            wrong += r["wrong"]
+            print(f"{loss:6.1%} {g or 'none':>6} {r['complete']:9.1%} {r['rebuilt']:>8} "
+                  f"{r['mbps']:8.0f}")
+    print(f"complete frames identical to the originals: {wrong == 0}")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Multi-camera ingest benchmark.
+
+Runs cloud.Ingest (one socket, one asyncio loop) while loadgen.py
+streams from N simulated cameras, then reports aggregate fps and
+receiver CPU per stream. With --record, every frame is also written to
+disk by recorder.Recorder, as the viewer does.
+
+With --flood, the cameras send as fast as they can instead, so the
+socket never drains, and the bench reports how late a 50 ms timer on
+the ingest loop fires meanwhile: the sweep, NACK, feedback and command
+timers share that loop and must keep running under saturation.
+
+    python bench/bench_ingest.py --cameras 10,25,50 --seconds 5
+    python bench/bench_ingest.py --cameras 50 --record /tmp/rec
+    python bench/bench_ingest.py --flood --cameras 8 --seconds 3
+"""
+import argparse
+import os
+import shutil
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cloud  # noqa: E402
+import loadgen  # noqa: E402
+import recorder  # noqa: E402
+import util  # noqa: E402
+
+
+def run(cameras, fps, size, seconds, record=None):
+    table = cloud.CameraTable((f"cam{i}", loadgen.camera_ip(i)) for i in range(cameras))
+    rec = None
+    if record:
+        rec = recorder.Recorder(os.path.join(record, "bench_ingest"), table.names).start()
+    ingest = cloud.Ingest(table, bind=("127.0.0.1", 0), recorder=rec).start()
+
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    for w in loadgen.start(ingest.address, cameras, fps, size, seconds):
+        w.join()
+    elapsed = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+
+    ingest.stop()
+    recorded = 0
+    if rec is not None:
+        rec.stop()
+        recorded = sum(rec.frames)
+        shutil.rmtree(os.path.join(record, "bench_ingest"), ignore_errors=True)
+
+    frames = sum(table.frames)
+    return {
+        "fps": frames / elapsed,
+        "target": cameras * fps,
+        "dropped": sum(table.dropped),
+        "cpu": cpu / elapsed,
+        "cpu_per_stream_ms": cpu / elapsed / cameras * 1000,
+        "recorded": recorded,
+    }
+
+
+def flood(cameras, size, seconds, period=0.05):
+    """Saturate ingest; return how often and how late a `period` timer on its loop fired."""
+    table = cloud.CameraTable((f"cam{i}", loadgen.camera_ip(i)) for i in range(cameras))
+    ingest = cloud.Ingest(table, bind=("127.0.0.1", 0)).start()
+    lates = []
+    done = threading.Event()
+
+    def probe(due):
+        lates.append(time.monotonic() - due)
+        if not done.is_set():
+            ingest.loop.call_later(period, probe, time.monotonic() + period)
+
+    ingest.loop.call_soon_threadsafe(probe, time.monotonic())
+    workers = loadgen.start(ingest.address, cameras, 1e6, size, seconds)
+    t0 = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    ingest.stop()
+    lates = lates[1:]
+    return {
+        "fps": sum(table.frames) / elapsed,
+        "fired": len(lates),
+        "expected": int(elapsed / period),
+        "p50": util.pct(lates, 50) * 1000,
+        "max": max(lates, default=float("inf")) * 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--cameras", default="10,25,50")
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--size", type=int, default=24000, help="JPEG bytes per frame")
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--record", default=None, help="also record every frame under this directory")
+    ap.add_argument("--flood", action="store_true", help="send flat out and time the loop's timers")
+    args = ap.parse_args()
+
+    if args.flood:
+        print(f"flood, {args.size} B per frame, {args.seconds:g} s, 50 ms probe timer")
+        print(f"{'cams':>5} {'fps':>8} {'fired':>6} {'expected':>9} {'late p50 ms':>12} {'late max ms':>12}")
+        for n in (int(c) for c in args.cameras.split(",")):
+            r = flood(n, args.size, args.seconds)
+            print(f"{n:>5} {r['fps']:8.1f} {r['fired']:>6} {r['expected']:>9} "
+                  f"{r['p50']:12.1f} {r['max']:12.1f}")
+        return
+
+    print(f"{args.fps:g} fps x {args.size} B per camera, {args.seconds:g} s")
+    print(f"{'cams':>5} {'fps':>8} {'target':>7} {'dropped':>8} {'cpu':>6} {'cpu ms/s/stream':>16}"
+          + (f" {'recorded':>9}" if args.record else ""))
+    for n in (int(c) for c in args.cameras.split(",")):
+        r = run(n, args.fps, args.size, args.seconds, args.record)
+        print(f"{n:>5} {r['fps']:8.1f} {r['target']:7.0f} {r['dropped']:>8} "
+              f"{r['cpu']:6.1%} {r['cpu_per_stream_ms']:16.2f}"
+              + (f" {r['recorded']:>9}" if args.record else ""))
+
+
+if __name__ == "__main__":
+    main()
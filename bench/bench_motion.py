@@ -0,0 +1,184 @@
+"""
+Motion analysis throughput: can the viewer keep up with N cameras at F fps?
+
+Renders a short looping scene per camera (a static room with sensor
+noise and someone crossing it once per loop), then publishes the JPEGs
+into a CameraTable at --fps per camera, as the receiver does, with a
+motion.MotionAnalyzer watching it. Reports:
+
+    per core   decode + detect per frame in one thread, unpaced
+    paced      frames analysed per camera per second against frames sent,
+               frames skipped because a newer one had arrived, analysis
+               time p50/p99, and the CPU the analyzer used
+    detection  motion start events against crossings
+
+Exits 1 if less than --min-share of the frames sent were analysed.
+
+    python bench/bench_motion.py --cameras 16 --fps 30 --size 640x480 --workers 2
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+from PIL import Image, ImageChops, ImageDraw
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import cloud  # noqa: E402
+import motion  # noqa: E402
+from util import pct  # noqa: E402
+
+
+def render(size, frames, rng, quality=80, noise=6.0):
+    """One camera's loop: JPEGs of a static scene with a walker crossing in its second half."""
+    w, h = size
+    bg = Image.new("RGB", size)
+    draw = ImageDraw.Draw(bg)
+    for y in range(h):
+        g = 90 + y * 60 // h
+        draw.line([(0, y), (w, y)], fill=(g, g - 10, g - 25))
+    for _ in range(40):
+        x, y = rng.randrange(w), rng.randrange(h)
+        bw, bh = rng.randrange(w // 40, w // 5), rng.randrange(h // 30, h // 4)
+        draw.rectangle([x, y, x + bw, y + bh], fill=tuple(rng.randrange(30, 220) for _ in range(3)))
+    walker = (w // 12, h // 3)
+    y = rng.randrange(h // 4, h - walker[1])
+    color = tuple(rng.randrange(20, 240) for _ in range(3))
+    jpegs = []
+    for i in range(frames):
+        img = bg.copy()
+        half = frames // 2
+        if i >= half:
+            x = -walker[0] + (i - half) * (w + walker[0]) // (frames - half)
+            ImageDraw.Draw(img).rectangle([x, y, x + walker[0], y + walker[1]], fill=color)
+        grain = Image.effect_noise(size, noise).convert("RGB")
+        img = ImageChops.add(img, grain, 1.0, -128)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=quality)
+        jpegs.append(out.getvalue())
+    return jpegs
+
+
+class TimedAnalyzer(motion.MotionAnalyzer):
+    """Keeps every frame's analysis time."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.times = []
+
+    def analyze(self, idx):
+        before = self.results[idx]
+        super().analyze(idx)
+        after = self.results[idx]
+        if after is not before:
+            self.times.append(after.ms)
+
+
+def per_core(jpegs, seconds):
+    """Frames per second decoded and analysed by one thread."""
+    det = motion.MotionDetector()
+    n = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        det.update(motion.decode_gray(jpegs[n % len(jpegs)]))
+        n += 1
+    return n / (time.perf_counter() - t0)
+
+
+def feed(table, pool, analyzer, loops, fps, seconds):
+    """Publish every camera's next frame every 1/fps s; returns frames sent."""
+    period = 1 / fps
+    sent = 0
+    t0 = time.perf_counter()
+    tick = t0
+    k = 0
+    while time.perf_counter() - t0 < seconds:
+        now = time.perf_counter()
+        if now < tick:
+            time.sleep(tick - now)
+        tick += period
+        for idx, jpegs in enumerate(loops):
+            jpeg = jpegs[k % len(jpegs)]
+            slot = pool.acquire()
+            if slot is None:
+                continue
+            slot.buf[:len(jpeg)] = jpeg
+            slot.size = len(jpeg)
+            slot.ts = time.time()
+            table.publish(idx, slot)
+            analyzer.notify(idx)
+            sent += 1
+        k += 1
+    return sent
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--cameras", type=int, default=16)
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--size", default="640x480", help="camera frame size")
+    ap.add_argument("--workers", type=int, default=motion.MOTION_WORKERS)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--loop", type=float, default=4, help="seconds per scene loop (one crossing each)")
+    ap.add_argument("--min-share", type=float, default=0.95)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    size = tuple(int(v) for v in args.size.split("x"))
+    rng = random.Random(args.seed)
+    frames = int(args.loop * args.fps)
+    loops = [render(size, frames, rng) for _ in range(args.cameras)]
+    kb = sum(len(j) for j in loops[0]) / len(loops[0]) / 1024
+    print(f"{args.cameras} cameras x {args.fps:g} fps, {size[0]}x{size[1]} JPEGs of {kb:.0f} KB, "
+          f"analysed at {motion.MOTION_SIZE[0]}x{motion.MOTION_SIZE[1]}, {os.cpu_count()} CPU(s)")
+
+    rate = per_core(loops[0], 2)
+    need = args.cameras * args.fps
+    print(f"per core: {rate:.0f} frames/s ({1000 / rate:.2f} ms each); {need:g} frames/s needs "
+          f"{need / rate:.2f} cores")
+
+    table = cloud.CameraTable((f"cam{i}", f"10.0.0.{i + 1}") for i in range(args.cameras))
+    pool = cloud.FramePool(cloud.SLOTS_PER_CAMERA * args.cameras + args.workers,
+                           slot_size=max(len(j) for jpegs in loops for j in jpegs))
+    analyzer = TimedAnalyzer(table, workers=args.workers)
+    starts = [0] * args.cameras
+    lock = threading.Lock()
+
+    def on_event(event):
+        if event.kind == "start":
+            with lock:
+                starts[event.camera] += 1
+
+    analyzer.on_event = on_event
+    analyzer.start()
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    sent = feed(table, pool, analyzer, loops, args.fps, args.seconds)
+    elapsed = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    analyzer.stop()
+    ms = analyzer.times
+
+    analyzed = sum(analyzer.analyzed)
+    per_cam = [n / elapsed for n in analyzer.analyzed]
+    crossings = int(args.seconds / args.loop)
+    share = analyzed / max(1, sent)
+    print(f"paced {elapsed:.1f} s, {args.workers} worker(s): {analyzed} of {sent} frames analysed ({share:.1%}), "
+          f"{sum(analyzer.skipped)} skipped, {analyzer.errors} errors")
+    print(f"  per camera {min(per_cam):.1f}-{max(per_cam):.1f} fps analysed (sent {args.fps:g}); "
+          f"analysis {pct(ms, 50):.2f} ms p50, {pct(ms, 99):.2f} ms p99; "
+          f"process CPU {cpu / elapsed:.2f} cores incl. the feeder")
+    print(f"detection: {sum(starts)} motion starts for {crossings * args.cameras} crossings "
+          f"({min(starts)}-{max(starts)} per camera)")
+    if share < args.min_share:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
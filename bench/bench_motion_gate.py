@@ -0,0 +1,230 @@
+"""
+Motion-gated streaming: bandwidth saved on recorded sequences.
+
+Plays JPEG sequences through the firmware's MotionGate (lib/motion_gate.py
+on the mpstubs clock) at the camera's frame rate and reports the bytes
+sent with the gate against sending every frame, the share of frames with
+motion in them that were still sent, and how long after each motion
+episode started its first frame went out.
+
+The built-in sequences are rendered and JPEG-encoded here, 320x240 like
+the camera's first rung, with sensor noise on every frame and known
+motion:
+
+    corridor  people walk across a static room now and then
+    parked    a car drives in and stays; later someone walks past
+    lighting  light drifting by 5% (what auto exposure leaves of a cloud), one walker
+    busy      somebody is moving almost all the time
+
+A directory of JPEGs from a real camera can be played instead; without
+ground truth only the bandwidth is reported.
+
+    python bench/bench_motion_gate.py --threshold-pct 1 --hold-ms 3000 --keepalive-ms 1000
+    python bench/bench_motion_gate.py --jpegs recorded/cam0 --fps 15
+"""
+import argparse
+import contextlib
+import glob
+import io
+import math
+import os
+import random
+import sys
+
+from PIL import Image, ImageChops, ImageDraw, ImageEnhance
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH)
+
+import mpstubs  # noqa: E402
+
+W, H = 320, 240
+CHUNK = 1200
+OVERHEAD = 9 + 28                    # chunk header + UDP/IP, per datagram
+
+
+# ----------------------------
+# Synthetic sequences
+# ----------------------------
+def room(rng):
+    """A static background with enough detail to give the JPEG some body."""
+    img = Image.new("RGB", (W, H))
+    draw = ImageDraw.Draw(img)
+    for y in range(H):
+        g = 90 + y * 60 // H
+        draw.line([(0, y), (W, y)], fill=(g, g - 10, g - 25))
+    for _ in range(40):
+        x, y = rng.randrange(W), rng.randrange(H)
+        w, h = rng.randrange(8, 60), rng.randrange(8, 60)
+        color = tuple(rng.randrange(30, 220) for _ in range(3))
+        shape = draw.rectangle if rng.random() < 0.6 else draw.ellipse
+        shape([x, y, x + w, y + h], fill=color)
+    return img
+
+
+class Walker:
+    """Something crossing the frame at `speed` px/s, starting at `start` s."""
+
+    def __init__(self, start, speed, rng, size=(26, 70), stays=False):
+        self.start = start
+        self.speed = speed
+        self.size = size
+        self.stays = stays             # stops in the middle and stays there
+        self.y = rng.randrange(60, H - size[1])
+        self.colors = [tuple(rng.randrange(20, 240) for _ in range(3)) for _ in range(3)]
+
+    def x(self, t):
+        x = -self.size[0] + (t - self.start) * self.speed
+        return min(x, W // 2 - self.size[0] // 2) if self.stays else x
+
+    def visible(self, t):
+        return t >= self.start and self.x(t) < W
+
+    def moving(self, t):
+        if not self.visible(t):
+            return False
+        return not self.stays or self.x(t) < W // 2 - self.size[0] // 2
+
+    def draw(self, draw, t):
+        x, y = int(self.x(t)), self.y
+        w, h = self.size
+        for i, color in enumerate(self.colors):
+            draw.rectangle([x, y + i * h // 3, x + w, y + (i + 1) * h // 3], fill=color)
+        draw.ellipse([x + w // 4, y - w // 2, x + 3 * w // 4, y], fill=self.colors[0])
+
+
+def scene(name, seconds, rng):
+    """(walkers, brightness(t)) for one of the built-in sequences."""
+    steady = lambda t: 1.0  # noqa: E731
+    if name == "corridor":
+        return [Walker(s, rng.uniform(50, 80), rng) for s in (12, 40, 70)], steady
+    if name == "parked":
+        return [Walker(15, 90, rng, size=(90, 40), stays=True), Walker(60, 60, rng)], steady
+    if name == "lighting":
+        return [Walker(45, 60, rng)], lambda t: 1.0 + 0.05 * math.sin(2 * math.pi * t / 60)
+    if name == "busy":
+        starts = [0.0]
+        while starts[-1] < seconds:
+            starts.append(starts[-1] + rng.uniform(1.0, 5.0))
+        return [Walker(s, rng.uniform(40, 90), rng) for s in starts], steady
+    raise ValueError(name)
+
+
+def render(name, seconds, fps, quality, noise, seed):
+    """JPEG frames of a built-in sequence, with a motion flag per frame."""
+    rng = random.Random(seed)
+    bg = room(rng)
+    walkers, brightness = scene(name, seconds, rng)
+    frames = []
+    for i in range(int(seconds * fps)):
+        t = i / fps
+        img = bg.copy()
+        draw = ImageDraw.Draw(img)
+        for w in walkers:
+            if w.visible(t):
+                w.draw(draw, t)
+        level = brightness(t)
+        if level != 1.0:
+            img = ImageEnhance.Brightness(img).enhance(level)
+        grain = Image.effect_noise((W, H), noise).convert("RGB")
+        img = ImageChops.add(img, grain, 1.0, -128)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=quality)
+        frames.append((out.getvalue(), any(w.moving(t) for w in walkers)))
+    return frames
+
+
+def recorded(path):
+    names = sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.jpeg")))
+    frames = []
+    for name in names:
+        with open(name, "rb") as f:
+            frames.append((f.read(), None))
+    return frames
+
+
+# ----------------------------
+# Gate replay
+# ----------------------------
+def wire_bytes(size):
+    return size + (size + CHUNK - 1) // CHUNK * OVERHEAD
+
+
+def replay(fw, frames, fps, threshold_pct, hold_ms, keepalive_ms):
+    clock = mpstubs.clock
+    gate = fw.MotionGate(threshold_pct, hold_ms, keepalive_ms)
+    period_us = 1_000_000 // fps
+    sent = [False] * len(frames)
+    for i, (jpeg, _) in enumerate(frames):
+        clock.advance(period_us)
+        sent[i] = gate.observe(len(jpeg))
+
+    total = sum(wire_bytes(len(j)) for j, _ in frames)
+    gated = sum(wire_bytes(len(j)) for (j, _), s in zip(frames, sent) if s)
+    r = {"frames": len(frames), "sent": sum(sent), "total": total, "gated": gated,
+         "recall": None, "episodes": 0, "missed": 0, "delay": []}
+    if frames and frames[0][1] is not None:
+        moving = [m for _, m in frames]
+        r["recall"] = sum(s for s, m in zip(sent, moving) if m) / max(1, sum(moving))
+        i = 0
+        while i < len(moving):
+            if not moving[i]:
+                i += 1
+                continue
+            r["episodes"] += 1
+            j = i
+            while j < len(moving) and moving[j] and not sent[j]:
+                j += 1
+            if j < len(moving) and moving[j]:
+                r["delay"].append((j - i) * 1000 / fps)
+            else:
+                r["missed"] += 1
+            while i < len(moving) and moving[i]:
+                i += 1
+    return r
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--scenes", default="corridor,parked,lighting,busy")
+    ap.add_argument("--jpegs", default=None, help="directory of recorded JPEG frames, played in name order")
+    ap.add_argument("--seconds", type=float, default=90)
+    ap.add_argument("--fps", type=int, default=15)
+    ap.add_argument("--quality", type=int, default=75, help="JPEG quality of the rendered frames")
+    ap.add_argument("--noise", type=float, default=6.0, help="sensor noise sigma of the rendered frames")
+    ap.add_argument("--threshold-pct", type=float, default=None, help="default: firmware MOTION_THRESHOLD_PCT")
+    ap.add_argument("--hold-ms", type=int, default=None, help="default: firmware MOTION_HOLD_MS")
+    ap.add_argument("--keepalive-ms", type=int, default=None, help="default: firmware MOTION_KEEPALIVE_MS")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        fw = mpstubs.load_firmware()
+    threshold = args.threshold_pct if args.threshold_pct is not None else fw.MOTION_THRESHOLD_PCT
+    hold = args.hold_ms if args.hold_ms is not None else fw.MOTION_HOLD_MS
+    keepalive = args.keepalive_ms if args.keepalive_ms is not None else fw.MOTION_KEEPALIVE_MS
+
+    if args.jpegs:
+        sequences = [(os.path.basename(os.path.normpath(args.jpegs)), recorded(args.jpegs))]
+    else:
+        sequences = [(name, render(name, args.seconds, args.fps, args.quality, args.noise, args.seed))
+                     for name in args.scenes.split(",")]
+
+    print(f"{args.fps} fps, threshold {threshold:g}%, hold {hold} ms, keep-alive {keepalive} ms")
+    print(f"{'sequence':>10} {'frames':>7} {'sent':>6} {'all kbit/s':>11} {'gated kbit/s':>13} "
+          f"{'saved':>6} {'motion sent':>12} {'episodes':>9} {'missed':>7} {'max delay ms':>13}")
+    for name, frames in sequences:
+        if not frames:
+            print(f"{name:>10} no frames")
+            continue
+        r = replay(fw, frames, args.fps, threshold, hold, keepalive)
+        seconds = r["frames"] / args.fps
+        recall = f"{r['recall']:.1%}" if r["recall"] is not None else "-"
+        delay = f"{max(r['delay']):.0f}" if r["delay"] else "-"
+        print(f"{name:>10} {r['frames']:>7} {r['sent']:>6} {r['total'] * 8 / seconds / 1000:11.0f} "
+              f"{r['gated'] * 8 / seconds / 1000:13.0f} {1 - r['gated'] / r['total']:6.1%} "
+              f"{recall:>12} {r['episodes']:>9} {r['missed']:>7} {delay:>13}")
+
+
+if __name__ == "__main__":
+    main()
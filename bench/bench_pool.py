@@ -0,0 +1,129 @@
+"""
+Receive-path allocation and GC benchmark.
+
+Several simulated cameras stream at 30 fps over loopback from a separate
+process while the receiver runs either the old single-datagram path
+(recvfrom(65535) + data[5:]) or the chunked FramePool path
+(recvfrom_into + Reassembler). Reports bytes allocated per frame and GC
+pauses for both.
+
+    python bench/bench_pool.py --cameras 4 --seconds 5
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cloud  # noqa: E402
+from bench_transport import send_frame_chunks  # noqa: E402
+
+
+def sender(addr, mode, cameras, fps, size, seconds):
+    socks = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(cameras)]
+    jpeg = os.urandom(size)
+    legacy = b"\x01" + struct.pack(">I", size) + jpeg
+    period = 1.0 / fps
+    t0 = time.perf_counter()
+    frame_id = 0
+    while time.perf_counter() - t0 < seconds:
+        for s in socks:
+            if mode == "legacy":
+                s.sendto(legacy, addr)
+            else:
+                send_frame_chunks(s, addr, jpeg, frame_id, 0, None)
+        frame_id = (frame_id + 1) & 0xFFFF
+        delay = t0 + (frame_id + 1) * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    for s in socks:
+        s.close()
+
+
+def receive(mode, cameras, fps, size, seconds, trace):
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(1.0)
+
+    pauses = []
+    started = [0.0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            started[0] = time.perf_counter()
+        else:
+            pauses.append(time.perf_counter() - started[0])
+
+    proc = multiprocessing.Process(
+        target=sender, args=(rx.getsockname(), mode, cameras, fps, size, seconds))
+    if trace:
+        tracemalloc.start()
+    gc.callbacks.append(on_gc)
+    proc.start()
+
+    frames = 0
+    allocated = 0
+    latest = {}
+    reasm = cloud.Reassembler()
+    pkt = bytearray(cloud.PACKET_BUF_SIZE)
+    view = memoryview(pkt)
+    while True:
+        if trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        try:
+            if mode == "legacy":
+                data, addr = rx.recvfrom(65535)
+                jpeg = data[5:]
+                if len(jpeg) == struct.unpack(">I", data[1:5])[0]:
+                    latest[addr] = jpeg
+                    frames += 1
+            else:
+                n, addr = rx.recvfrom_into(pkt)
+                slot = reasm.feed(addr, view[:n], time.monotonic())
+                if slot is not None:
+                    old = latest.get(addr)
+                    latest[addr] = slot
+                    if old is not None:
+                        old.release()
+                    frames += 1
+        except socket.timeout:
+            break
+        if trace:
+            allocated += tracemalloc.get_traced_memory()[1] - base
+
+    gc.callbacks.remove(on_gc)
+    if trace:
+        tracemalloc.stop()
+    proc.join()
+    rx.close()
+    return frames, allocated, pauses
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--cameras", type=int, default=4)
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--size", type=int, default=24000, help="JPEG bytes per frame")
+    ap.add_argument("--seconds", type=float, default=5)
+    args = ap.parse_args()
+
+    print(f"{args.cameras} cameras x {args.fps:g} fps x {args.size} B for {args.seconds:g} s")
+    print(f"{'path':>7} {'frames':>7} {'KiB/frame':>10} {'gc runs':>8} {'gc total ms':>12} {'gc max ms':>10}")
+    for mode in ("legacy", "pool"):
+        frames, allocated, _ = receive(mode, args.cameras, args.fps, args.size, args.seconds, True)
+        per_frame = allocated / frames / 1024 if frames else 0.0
+        frames, _, pauses = receive(mode, args.cameras, args.fps, args.size, args.seconds, False)
+        print(f"{mode:>7} {frames:>7} {per_frame:10.1f} {len(pauses):>8} "
+              f"{sum(pauses) * 1000:12.2f} {max(pauses, default=0) * 1000:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Event recording: pre-event coverage, memory and retention.
+
+Runs recorder.Recorder in event mode for N cameras over simulated time
+(frames are added as fast as the recorder takes them, each stamped with
+its simulated arrival time) with events fired at random on every camera,
+and reports:
+
+    coverage   for each event, the seconds recorded before it (the pre-event
+               ring's worth, capped by its byte budget) and whether the
+               recording runs without a gap from there to post_event after
+    memory     the rings' preallocated bytes, and the peak of everything
+               else allocated while recording (tracemalloc), which must not
+               grow with the number of frames
+    disk       frames and bytes written against recording continuously,
+               and the directory size against --retain-mb, if given
+
+Exits 1 if an event's recording has a gap or starts later than its ring
+could have held.
+
+    python bench/bench_pre_event.py --cameras 50 --fps 15 --minutes 10 --event-every 60
+    python bench/bench_pre_event.py --ring-total-mb 64 --retain-mb 200
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import cloud  # noqa: E402
+import playback  # noqa: E402
+import recorder  # noqa: E402
+from util import START  # noqa: E402
+
+
+def make_slot(size, rng):
+    pool = cloud.FramePool(1, slot_size=size)
+    slot = pool.acquire()
+    slot.buf[:] = rng.randbytes(size)
+    slot.buf[:2] = b"\xff\xd8"
+    slot.buf[-2:] = b"\xff\xd9"
+    slot.size = size
+    return slot
+
+
+def dir_bytes(root):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+
+
+def coverage(archive, at, pre, post, period):
+    """(seconds recorded without a gap up to `at`, at most `pre`; True if no gap from `at` to `at` + post)."""
+    frame = archive.seek(at)
+    if frame is None or at - frame.ts > 1.5 * period:
+        return 0.0, False
+    first = frame
+    while True:
+        prev = archive.step(first, -1)
+        if prev is None or first.ts - prev.ts > 1.5 * period or at - prev.ts > pre:
+            break
+        first = prev
+    last = frame
+    while last.ts < at + post - 1.5 * period:
+        nxt = archive.step(last)
+        if nxt is None or nxt.ts - last.ts > 1.5 * period:
+            return at - first.ts, False
+        last = nxt
+    return at - first.ts, True
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--dir", default=None, help="record directory (default: temporary)")
+    ap.add_argument("--cameras", type=int, default=50)
+    ap.add_argument("--fps", type=float, default=15)
+    ap.add_argument("--frame-kb", type=float, default=40)
+    ap.add_argument("--minutes", type=float, default=10, help="simulated")
+    ap.add_argument("--event-every", type=float, default=60, help="mean seconds between events per camera")
+    ap.add_argument("--pre", type=float, default=10)
+    ap.add_argument("--post", type=float, default=recorder.POST_EVENT_SECONDS)
+    ap.add_argument("--ring-mb", type=float, default=recorder.RING_BYTES / 2**20)
+    ap.add_argument("--ring-total-mb", type=float, default=recorder.RING_TOTAL_BYTES / 2**20)
+    ap.add_argument("--retain-mb", type=float, default=None)
+    ap.add_argument("--keep", action="store_true")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    tmp = None if args.dir else tempfile.mkdtemp(prefix="bench_pre_event-")
+    root = os.path.join(args.dir or tmp, "bench_pre_event")
+    names = [f"cam{i}" for i in range(args.cameras)]
+    rec = recorder.Recorder(root, names, pre_event=args.pre, post_event=args.post,
+                            ring_bytes=int(args.ring_mb * 2**20),
+                            ring_total_bytes=int(args.ring_total_mb * 2**20),
+                            retain_bytes=int(args.retain_mb * 2**20) if args.retain_mb else None,
+                            retain_interval=1.0).start()
+    size = int(args.frame_kb * 1024)
+    slots = [make_slot(size, rng) for _ in range(args.cameras)]
+    period = 1 / args.fps
+    ticks = int(args.minutes * 60 * args.fps)
+    events = []                      # (camera, time)
+    chance = period / args.event_every
+    offered = 0
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for k in range(ticks):
+        now = START + k * period
+        for idx, slot in enumerate(slots):
+            slot.seq += 1
+            slot.frame_id = slot.seq & 0xFFFF
+            slot.ts = now + idx * period / args.cameras
+            while not rec.add(idx, slot):
+                time.sleep(0.005)    # the disk is behind; we are not a live camera
+            offered += 1
+            if rng.random() < chance:
+                rec.trigger(idx, at=slot.ts)
+                events.append((idx, slot.ts))
+    rec.stop()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ring = rec.ring_bytes
+    frames_fit = ring // (size + recorder.RECORD.size)
+    pre_expected = min(args.pre, (frames_fit - 1) * period) - period / 2
+    simulated = args.minutes * 60
+    print(f"{args.cameras} cameras x {args.fps:g} fps x {args.frame_kb:g} KB, {args.minutes:g} min simulated "
+          f"in {elapsed:.1f} s, {len(events)} events, pre {args.pre:g} s, post {args.post:g} s")
+    print(f"memory: rings {ring * args.cameras / 2**20:.0f} MB preallocated ({ring / 2**20:.1f} MB, "
+          f"{frames_fit * period:.1f} s per camera); peak allocated while recording "
+          f"{peak / 2**20:.1f} MB (staging cap {recorder.BUFFER_BYTES / 2**20:.0f} MB)")
+    written = sum(rec.frames)
+    print(f"disk: {written} of {offered} frames written ({written / max(1, offered):.1%}), "
+          f"{sum(rec.bytes) / 2**20:.0f} MB; {sum(rec.dropped)} dropped while the disk was behind")
+
+    bad = 0
+    evicted = 0
+    pres = []
+    archives = {}
+    for idx, at in events:
+        if at + args.post > START + simulated:
+            continue                 # recording cut short by the end of the run
+        archive = archives.get(idx) or archives.setdefault(idx, playback.Archive(rec.camera_dir(idx)))
+        span = archive.span()
+        if span is None or (args.retain_mb and span[0] > max(at - pre_expected, START + period)):
+            evicted += 1             # deleted by retention
+            continue
+        pre, whole = coverage(archive, at, args.pre, args.post, period)
+        pres.append(pre)
+        if not whole or pre < min(pre_expected, at - START - period):
+            bad += 1
+    for archive in archives.values():
+        archive.close()
+    if pres:
+        pres.sort()
+        print(f"coverage: {len(pres)} events, pre-event recorded min {pres[0]:.1f} s, "
+              f"median {pres[len(pres) // 2]:.1f} s (ring holds {frames_fit * period:.1f} s); "
+              f"{bad} with a gap or short pre-event, {evicted} deleted by retention")
+    if args.retain_mb:
+        disk = rec.disks[0]
+        print(f"retention: {dir_bytes(root) / 2**20:.0f} MB on disk, limit {args.retain_mb:g} MB "
+              f"(open segments excepted); {disk.evicted_segments} segments, "
+              f"{disk.evicted_bytes / 2**20:.0f} MB deleted")
+
+    if not args.keep:
+        shutil.rmtree(root, ignore_errors=True)
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Recorder throughput: MB/s and frames/s written per disk.
+
+Feeds recorder.Recorder from one thread standing in for the ingest
+thread, with N cameras' frames either paced at --fps or as fast as
+add() takes them, and reports per record directory the bytes and frames
+written per second, frames dropped because the disk fell behind, the
+number and mean size of the bulk writes and the time spent in fsync.
+The ingest side's cost is the time add() takes (p50/p99/max), which must
+stay flat whatever the disk does. Afterwards every segment is read back
+and each record checked against its index entry and CRC.
+
+    python bench/bench_recorder.py --dir /mnt/disk1 --dir /mnt/disk2 --cameras 16 --fps 30
+    python bench/bench_recorder.py --fps 0          # unpaced: the disks' ceiling
+"""
+import argparse
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import cloud  # noqa: E402
+import recorder  # noqa: E402
+from util import pct  # noqa: E402
+
+
+def make_slots(cameras, size, rng):
+    """One ready FrameSlot per camera holding `size` bytes of JPEG-like data."""
+    pool = cloud.FramePool(cameras, slot_size=size)
+    slots = []
+    for i in range(cameras):
+        slot = pool.acquire()
+        slot.buf[:] = rng.randbytes(size)
+        slot.buf[:2] = b"\xff\xd8"
+        slot.buf[-2:] = b"\xff\xd9"
+        slot.size = size
+        slot.frame_id = 0
+        slot.seq = 0
+        slots.append(slot)
+    return slots
+
+
+def feed(rec, slots, fps, seconds):
+    """Add frames for `seconds`; returns add() times in µs and frames offered."""
+    times = []
+    offered = 0
+    period = 1 / fps if fps else 0
+    t0 = time.perf_counter()
+    tick = t0
+    while True:
+        now = time.perf_counter()
+        if now - t0 >= seconds:
+            break
+        if period and now < tick:
+            time.sleep(tick - now)
+        tick += period
+        for idx, slot in enumerate(slots):
+            slot.seq += 1
+            slot.frame_id = slot.seq & 0xFFFF
+            slot.ts = time.time()
+            a = time.perf_counter()
+            rec.add(idx, slot)
+            times.append((time.perf_counter() - a) * 1e6)
+            offered += 1
+    return times, offered
+
+
+def verify(rec):
+    """Read every segment back; returns (records, bad) over all cameras."""
+    records = bad = 0
+    for idx in range(len(rec.names)):
+        for seg in sorted(glob.glob(os.path.join(rec.camera_dir(idx), "*" + recorder.SEGMENT_EXT))):
+            with open(seg, "rb") as f:
+                data = f.read()
+            with open(seg[:-len(recorder.SEGMENT_EXT)] + recorder.INDEX_EXT, "rb") as f:
+                index = f.read()
+            for ts, off in recorder.INDEX.iter_unpack(index):
+                magic, size, crc, _, _, _, rts = recorder.RECORD.unpack_from(data, off)
+                start = off + recorder.RECORD.size
+                ok = (magic == recorder.RECORD_MAGIC and rts == ts
+                      and zlib.crc32(data[start:start + size]) == crc)
+                records += 1
+                bad += not ok
+    return records, bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--dir", action="append", help="record directory, one per disk (repeatable); "
+                    "default: a temporary directory")
+    ap.add_argument("--cameras", type=int, default=16)
+    ap.add_argument("--fps", type=float, default=30, help="per camera; 0 = unpaced")
+    ap.add_argument("--frame-kb", type=float, default=40)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--fsync-interval", type=float, default=recorder.FSYNC_INTERVAL,
+                    help="seconds; 0 = after every write, -1 = only at segment close")
+    ap.add_argument("--flush-kb", type=int, default=recorder.FLUSH_BYTES // 1024)
+    ap.add_argument("--keep", action="store_true", help="keep the recordings")
+    args = ap.parse_args()
+
+    tmp = None
+    dirs = args.dir
+    if not dirs:
+        tmp = tempfile.mkdtemp(prefix="bench_recorder-")
+        dirs = [tmp]
+    roots = [os.path.join(d, "bench_recorder") for d in dirs]
+    fsync = None if args.fsync_interval < 0 else args.fsync_interval
+    size = int(args.frame_kb * 1024)
+    slots = make_slots(args.cameras, size, random.Random(1))
+    rec = recorder.Recorder(roots, [f"cam{i}" for i in range(args.cameras)],
+                            flush_bytes=args.flush_kb * 1024, fsync_interval=fsync).start()
+
+    t0 = time.perf_counter()
+    times, offered = feed(rec, slots, args.fps, args.seconds)
+    rec.stop()
+    elapsed = time.perf_counter() - t0
+    times.sort()
+
+    target = f"{args.cameras * args.fps:g} fps offered" if args.fps else "unpaced"
+    print(f"{args.cameras} cameras x {args.frame_kb:g} KB, {target}, {elapsed:.1f} s, "
+          f"flush {args.flush_kb} KB, fsync {'segment close' if fsync is None else f'{fsync:g} s'}")
+    print(f"{'disk':>30} {'MB/s':>8} {'frames/s':>9} {'dropped':>8} {'writes':>7} {'KB/write':>9} "
+          f"{'fsyncs':>7} {'fsync s':>8}")
+    for disk in rec.disks:
+        cams = [i for i, d in enumerate(rec.disk_of) if d is disk]
+        nbytes = sum(rec.bytes[i] for i in cams)
+        frames = sum(rec.frames[i] for i in cams)
+        dropped = sum(rec.dropped[i] for i in cams)
+        print(f"{disk.root[-30:]:>30} {nbytes / elapsed / 1e6:8.1f} {frames / elapsed:9.0f} {dropped:>8} "
+              f"{disk.writes:>7} {nbytes / max(1, disk.writes) / 1024:9.0f} {disk.fsyncs:>7} "
+              f"{disk.fsync_seconds:8.2f}")
+    print(f"ingest add(): p50 {pct(times, 50):.1f} µs  p99 {pct(times, 99):.1f} µs  "
+          f"max {times[-1] if times else 0:.0f} µs  ({offered} frames offered)")
+
+    records, bad = verify(rec)
+    written = sum(rec.frames)
+    print(f"read back: {records} records, {bad} bad, {written} written")
+    for root in roots:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+    if tmp and not args.keep:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if bad or records != written:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Import cost of the OV5642 register tables: nested lists vs packed bytes.
+
+Compares three ways of getting the tables a JPEG Camera_Init needs:
+  lists   import tools/OV5642_reg_src.py, the original [[addr, val], ...]
+          lists, all 15 tables kept for good
+  packed  every lib/ov5642_tables module imported up front
+  lazy    what Camera_Init does now: load_regs() one table at a time,
+          unloaded after use, plus the register shadow the driver keeps
+          (the shadow_regs address blob and a value and a flag per register)
+Reports source size, time to compile and run the modules, peak and
+post-init heap on CPython (tracemalloc), and an estimate for a 32-bit
+MicroPython heap (16-byte GC blocks: a two-element list is one block for
+the object and one for its items, plus a word in the outer list; a bytes
+object is its length plus a one-block header).
+
+    python bench/bench_reg_tables.py --repeat 20
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SOURCE = os.path.join(ROOT, "tools", "OV5642_reg_src.py")
+TABLES = os.path.join(ROOT, "lib", "ov5642_tables")
+JPEG_INIT = ["ov5642_qvga_preview1", "ov5642_qvga_preview2",
+             "ov5642_jpeg_capture_qsxga", "ov5642_320x240"]
+GC_BLOCK = 16
+
+
+def blocks(n):
+    return (n + GC_BLOCK - 1) // GC_BLOCK * GC_BLOCK
+
+
+def micropython_estimate(ns):
+    total = 0
+    for value in ns.values():
+        if isinstance(value, list):
+            total += blocks(16) + blocks(4 * len(value))
+            total += len(value) * (blocks(16) + blocks(8))
+        elif isinstance(value, bytes):
+            total += blocks(16) + blocks(len(value))
+    return total
+
+
+def measure(path, repeat):
+    with open(path) as f:
+        source = f.read()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        exec(compile(source, path, "exec"), {})
+        times.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    ns = {}
+    exec(compile(source, path, "exec"), ns)
+    ns.pop("__builtins__", None)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "source": len(source),
+        "ms": sorted(times)[len(times) // 2] * 1000,
+        "heap": retained,
+        "mpy": micropython_estimate(ns),
+    }
+
+
+def table_path(name):
+    return os.path.join(TABLES, name + ".py")
+
+
+def combine(results, keep):
+    """Totals for importing `results` in turn; `keep` = all stay loaded."""
+    pick = sum if keep else max
+    return {
+        "source": sum(r["source"] for r in results),
+        "ms": sum(r["ms"] for r in results),
+        "heap": pick(r["heap"] for r in results),
+        "mpy": pick(r["mpy"] for r in results),
+        "kept": sum(r["heap"] for r in results) if keep else 0,
+        "kept_mpy": sum(r["mpy"] for r in results) if keep else 0,
+    }
+
+
+def shadow_cost(repeat):
+    """(registers, CPython heap, MicroPython estimate) kept by ArducamClass's register shadow."""
+    path = table_path("shadow_regs")
+    ns = {}
+    with open(path) as f:
+        exec(compile(f.read(), path, "exec"), ns)
+    n = len(ns["REGS"]) // 2
+    r = measure(path, repeat)
+    # shadow (values) and _shadow_known (flags): one bytearray of n each
+    return n, r["heap"] + 2 * sys.getsizeof(bytearray(n)), r["mpy"] + 2 * (blocks(16) + blocks(n))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    lists = combine([measure(SOURCE, args.repeat)], keep=True)
+    names = sorted(f[:-3] for f in os.listdir(TABLES) if f.startswith("ov5642_"))
+    packed = combine([measure(table_path(n), args.repeat) for n in names], keep=True)
+    lazy = combine([measure(table_path(n), args.repeat) for n in JPEG_INIT], keep=False)
+    shadow, shadow_heap, shadow_mpy = shadow_cost(args.repeat)
+    lazy["kept"] += shadow_heap
+    lazy["kept_mpy"] += shadow_mpy
+
+    print("tables for a JPEG Camera_Init; heap in KB as CPython / MicroPython estimate")
+    print(f"{'tables':>7} {'source KB':>10} {'import ms':>10} {'peak heap':>14} {'kept after init':>16}")
+    for name, r in (("lists", lists), ("packed", packed), ("lazy", lazy)):
+        print(f"{name:>7} {r['source'] / 1024:10.1f} {r['ms']:10.2f} "
+              f"{r['heap'] / 1024:6.1f} / {r['mpy'] / 1024:5.1f} "
+              f"{r['kept'] / 1024:7.1f} / {r['kept_mpy'] / 1024:5.1f}")
+    print(f"lazy keeps the register shadow: {shadow} registers, "
+          f"{shadow_heap / 1024:.1f} / {shadow_mpy / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
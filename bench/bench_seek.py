@@ -0,0 +1,212 @@
+"""
+Seek time over a recorded archive.
+
+Records a synthetic archive for one camera with recorder.Recorder (24 h
+at 15 fps by default, with an hour's gap, timestamps simulated so it is
+written in seconds), then seeks to random times with playback.Archive
+and reports seek time percentiles:
+
+    cold   a new Archive per seek: segment listing, mmap and index bisect
+    warm   one Archive for every seek, as the viewer's slider uses it
+    step   stepping to the next frame, as playback does
+
+Each seek is checked: the frame found is the last one at or before the
+target, and its JPEG starts with SOI.
+
+Then records --retention-segments more segments for a second camera
+with a size limit of about four, so retention deletes the oldest while
+an Archive of it is open and seeking as the slider would. Afterwards
+every seek through that Archive must land on the exact frame, the
+newest included, and stepping from a frame whose segment was deleted
+must continue at the oldest frame left.
+
+Exits 1 if a seek lands wrong or the warm p99 is not under --budget-ms.
+
+    python bench/bench_seek.py --hours 24 --fps 15 --seeks 2000
+    python bench/bench_seek.py --dir /mnt/disk1/archive --keep   # reuse it next time
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import cloud  # noqa: E402
+import playback  # noqa: E402
+import recorder  # noqa: E402
+from util import START, pct  # noqa: E402
+
+
+def tiny_jpeg():
+    out = io.BytesIO()
+    Image.new("RGB", (32, 24), (90, 120, 150)).save(out, "JPEG")
+    return out.getvalue()
+
+
+def build(root, hours, fps, gap_hours):
+    """Record `hours` of frames into root/cam0; returns (first, last) timestamp."""
+    jpeg = tiny_jpeg()
+    pool = cloud.FramePool(1, slot_size=len(jpeg))
+    slot = pool.acquire()
+    slot.buf[:] = jpeg
+    slot.size = len(jpeg)
+    rec = recorder.Recorder(root, ["cam0"], fsync_interval=None).start()
+    frames = int(hours * 3600 * fps)
+    gap_from = frames // 3
+    gap = gap_hours * 3600
+    for k in range(frames):
+        slot.seq = k + 1
+        slot.frame_id = slot.seq & 0xFFFF
+        slot.ts = START + k / fps + (gap if k >= gap_from else 0)
+        while not rec.add(0, slot):
+            time.sleep(0.01)         # let the writer catch up; we are not a live camera
+    rec.stop()
+    return START, slot.ts
+
+
+def check(archive, frame, target):
+    """True if `frame` is the last one at or before `target` (the first, if none is)."""
+    if frame is None or bytes(frame.view()[:2]) != b"\xff\xd8":
+        return False
+    if frame.ts > target:
+        return archive.step(frame, -1) is None
+    nxt = archive.step(frame)
+    return nxt is None or nxt.ts > target
+
+
+def retention(root, fps, segments, seeks, rng, keep=4):
+    """
+    Record `segments` segments into root/cam1 with retention keeping about
+    `keep`, an Archive open throughout. Returns (segments deleted, wrong seeks).
+    """
+    jpeg = tiny_jpeg()
+    pool = cloud.FramePool(1, slot_size=len(jpeg))
+    slot = pool.acquire()
+    slot.buf[:] = jpeg
+    slot.size = len(jpeg)
+    per_segment = int(recorder.SEGMENT_SECONDS * fps)
+    seg_bytes = per_segment * (len(jpeg) + recorder.RECORD.size + recorder.INDEX.size)
+    rec = recorder.Recorder(root, ["cam1"], fsync_interval=None, flush_interval=0.01,
+                            retain_bytes=int((keep + 0.5) * seg_bytes), retain_interval=0.01).start()
+    camera = rec.camera_dir(0)
+    archive = None
+    held = None                      # a frame of the first segment, which retention deletes
+    for k in range(segments * per_segment):
+        slot.seq = k + 1
+        slot.frame_id = slot.seq & 0xFFFF
+        slot.ts = START + k / fps
+        while not rec.add(0, slot):
+            time.sleep(0.01)
+        if k % per_segment == per_segment - 1:
+            time.sleep(0.05)         # let the writer flush and retention sweep
+            if archive is None:
+                archive = playback.Archive(camera)
+            frame = archive.seek(slot.ts)
+            if held is None and frame is not None and frame.ts < START + recorder.SEGMENT_SECONDS:
+                held = frame
+    rec.stop()
+
+    left = len([f for f in os.listdir(camera) if f.endswith(recorder.SEGMENT_EXT)])
+    last = START + (segments * per_segment - 1) / fps
+    wrong = 0
+    span = archive.span()
+    if span is None or abs(span[1] - last) > 1e-6:
+        wrong += 1
+    else:
+        for ts in [last] + [rng.uniform(*span) for _ in range(seeks)]:
+            frame = archive.seek(ts)
+            k = int((ts - START) * fps + 1e-9)
+            wrong += frame is None or abs(frame.ts - (START + k / fps)) > 1e-6
+        if held is not None:
+            nxt = archive.step(held)
+            wrong += nxt is None or abs(nxt.ts - span[0]) > 1e-6
+    wrong += len(archive) != left
+    archive.close()
+    return segments - left, wrong
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--dir", default=None, help="archive directory (default: temporary); "
+                    "an existing archive there is reused")
+    ap.add_argument("--hours", type=float, default=24)
+    ap.add_argument("--fps", type=float, default=15)
+    ap.add_argument("--gap-hours", type=float, default=1)
+    ap.add_argument("--seeks", type=int, default=2000)
+    ap.add_argument("--budget-ms", type=float, default=50)
+    ap.add_argument("--retention-segments", type=int, default=12,
+                    help="segments recorded while retention deletes old ones; 0 skips")
+    ap.add_argument("--keep", action="store_true")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    root = args.dir or tempfile.mkdtemp(prefix="bench_seek-")
+    camera = os.path.join(root, "cam0")
+    if not os.path.isdir(camera) or not os.listdir(camera):
+        t0 = time.perf_counter()
+        build(root, args.hours, args.fps, args.gap_hours)
+        print(f"recorded {args.hours:g} h at {args.fps:g} fps in {time.perf_counter() - t0:.0f} s")
+    archive = playback.Archive(camera)
+    first, last = archive.span()
+    size = sum(os.path.getsize(os.path.join(camera, f)) for f in os.listdir(camera))
+    print(f"archive: {len(archive)} segments, {(last - first) / 3600:.1f} h, {size / 1e6:.0f} MB")
+
+    rng = random.Random(args.seed)
+    targets = [rng.uniform(first - 60, last + 60) for _ in range(args.seeks)]
+    wrong = 0
+    cold = []
+    for ts in targets[:max(1, args.seeks // 10)]:
+        t0 = time.perf_counter()
+        a = playback.Archive(camera)
+        frame = a.seek(ts)
+        bytes(frame.view()[:2])
+        cold.append((time.perf_counter() - t0) * 1000)
+        wrong += not check(a, frame, ts)
+        a.close()
+
+    warm = []
+    for ts in targets:
+        t0 = time.perf_counter()
+        frame = archive.seek(ts)
+        bytes(frame.view()[:2])
+        warm.append((time.perf_counter() - t0) * 1000)
+        wrong += not check(archive, frame, ts)
+
+    step = []
+    frame = archive.seek(first)
+    for _ in range(args.seeks):
+        t0 = time.perf_counter()
+        frame = archive.step(frame) or archive.seek(first)
+        step.append((time.perf_counter() - t0) * 1000)
+
+    print(f"{'':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'n':>6}")
+    for name, times in (("cold", cold), ("warm", warm), ("step", step)):
+        print(f"{name:>6} {pct(times, 50):8.3f} {pct(times, 99):8.3f} {max(times):8.3f} {len(times):>6}")
+    print(f"seeks landing on the wrong frame: {wrong}")
+    archive.close()
+
+    if args.retention_segments:
+        deleted, bad = retention(os.path.join(root, "retention"), 2, args.retention_segments,
+                                 max(1, args.seeks // 10), rng)
+        print(f"retention with the archive open: {deleted} of {args.retention_segments} segments "
+              f"deleted; seeks and steps landing wrong after: {bad}")
+        wrong += bad
+        if not args.keep or not args.dir:
+            shutil.rmtree(os.path.join(root, "retention"), ignore_errors=True)
+    if not args.keep and not args.dir:
+        shutil.rmtree(root, ignore_errors=True)
+    if wrong or pct(warm, 99) >= args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
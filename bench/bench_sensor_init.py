@@ -0,0 +1,133 @@
+"""
+OV5642 initialisation benchmark on the simulated I2C bus.
+
+Runs the firmware's camera_init() against mpstubs.OV5642I2C twice: once
+with the original one-register-per-write programming (new 3-byte buffer
+and a 3 ms sleep per register) and once with the batched
+wrSensorRegs16_8. Reports I2C transactions, bytes on the bus and virtual
+init time, and checks that both leave the sensor with the same register
+writes in the same order.
+
+Then times runtime resolution switches (QVGA -> UXGA -> QVGA by default)
+three ways: a full Camera_Init plus window table, the full window table
+(OV5642_set_JPEG_size) and the shadow-register diff (set_resolution),
+and checks that all three leave the sensor registers in the same state.
+
+    python bench/bench_sensor_init.py --i2c-khz 400 --switch QVGA,UXGA,QVGA
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mpstubs  # noqa: E402
+
+
+def legacy_writer(cam):
+    """The per-register writes Arducam.py used before batching."""
+    def wrSensorReg16_8(addr, val):
+        buffer = bytearray(3)
+        buffer[0] = (addr >> 8) & 0xff
+        buffer[1] = addr & 0xff
+        buffer[2] = val
+        cam.iic_write(buffer)
+        mpstubs.clock.advance(3000)  # time.sleep(0.003)
+
+    def wrSensorRegs16_8(reg_value):
+        for i in range(0, len(reg_value), 3):
+            wrSensorReg16_8((reg_value[i] << 8) | reg_value[i + 1], reg_value[i + 2])
+
+    cam.wrSensorReg16_8 = wrSensorReg16_8
+    cam.wrSensorRegs16_8 = wrSensorRegs16_8
+
+
+def make_camera(freq):
+    fw = mpstubs.load_firmware()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cam = fw.Arducam(spi=fw.SPI(2), cs_pin=fw.CS_PIN,
+                         i2c=fw.I2C(0, freq=freq))
+    cam.CameraType = fw.OV5642
+    cam.Set_Camera_mode(fw.JPEG)
+    return sys.modules["Arducam"], cam
+
+
+def run(legacy, freq):
+    _, cam = make_camera(freq)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if legacy:
+            legacy_writer(cam)
+        i2c = cam.i2c
+        i2c.transactions = i2c.bytes = 0
+        t0 = mpstubs.clock.us
+        cam.init()
+        elapsed = mpstubs.clock.us - t0
+    return {
+        "transactions": i2c.transactions,
+        "bytes": i2c.bytes,
+        "ms": elapsed / 1000,
+        "writes": i2c.writes,
+    }
+
+
+def switch(how, freq, sizes):
+    """Init at sizes[0], then switch through the rest; cost of the switches."""
+    driver, cam = make_camera(freq)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cam.init()
+        cam.set_framesize(sizes[0])
+        i2c = cam.i2c
+        i2c.transactions = 0
+        start = len(i2c.writes)
+        t0 = mpstubs.clock.us
+        for name in sizes[1:]:
+            size = driver.OV5642_FRAMESIZES[name.upper()]
+            if how == "reinit":
+                cam.init()
+                cam.OV5642_set_JPEG_size(size)
+            elif how == "table":
+                cam.OV5642_set_JPEG_size(size)
+            else:
+                cam.set_resolution(size)
+        elapsed = mpstubs.clock.us - t0
+    return {
+        "registers": len(i2c.writes) - start,
+        "transactions": i2c.transactions,
+        "ms": elapsed / 1000,
+        "state": dict(i2c.regs),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--i2c-khz", type=float, default=400)
+    ap.add_argument("--switch", default="QVGA,UXGA,QVGA", help="frame sizes to switch through")
+    args = ap.parse_args()
+    freq = int(args.i2c_khz * 1000)
+
+    old = run(True, freq)
+    new = run(False, freq)
+    print(f"Camera_Init (JPEG) at {args.i2c_khz:g} kHz I2C")
+    print(f"{'mode':>12} {'transactions':>13} {'bus bytes':>10} {'init ms':>9}")
+    for name, r in (("per-register", old), ("batched", new)):
+        print(f"{name:>12} {r['transactions']:>13} {r['bytes']:>10} {r['ms']:9.1f}")
+    same = old["writes"] == new["writes"]
+    print(f"register writes identical: {same} ({len(new['writes'])} writes)")
+
+    sizes = args.switch.split(",")
+    print()
+    print(f"resolution switches {' -> '.join(sizes)}")
+    print(f"{'mode':>12} {'registers':>10} {'transactions':>13} {'ms':>9}")
+    runs = [(how, switch(how, freq, sizes)) for how in ("reinit", "table", "diff")]
+    for how, r in runs:
+        print(f"{how:>12} {r['registers']:>10} {r['transactions']:>13} {r['ms']:9.1f}")
+    same_state = runs[1][1]["state"] == runs[2][1]["state"]
+    print(f"sensor state identical (table vs diff): {same_state}")
+    if not (same and same_state):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Thumbnail throughput per core and across processes, and contact sheet time.
+
+Thumbnails synthetic frames at each --sizes resolution with
+thumbnails.make_thumbnail:
+
+    per core   one process, draft decode vs a full decode then resize
+    scaling    a spawned process pool of 1, 2, 4 ... --max-workers workers:
+               thumbnails/s, per worker, and against perfect scaling
+
+Then writes --hours of thumbnails for one camera (a day by default; one
+every thumbnails.THUMB_INTERVAL seconds, in .thm files per 5-minute
+segment) and times contact_sheet() over the last hour of them and over
+all of them.
+
+    python bench/bench_thumbnails.py --sizes 1600x1200,2592x1944 --max-workers 8
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from PIL import Image
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import recorder  # noqa: E402
+import thumbnails  # noqa: E402
+from util import START, synthetic_jpeg  # noqa: E402
+
+
+def full_thumbnail(jpeg, size=thumbnails.THUMB_SIZE, quality=thumbnails.THUMB_QUALITY):
+    """make_thumbnail without draft: decode every pixel, then shrink."""
+    img = Image.open(io.BytesIO(jpeg)).convert("RGB")
+    img.thumbnail(size, Image.BILINEAR)
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+def rate(fn, jpeg, seconds):
+    n = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        fn(jpeg)
+        n += 1
+    return n / (time.perf_counter() - t0)
+
+
+def pool_rate(workers, jpeg, count):
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        list(pool.map(thumbnails.make_thumbnail, [jpeg] * workers))  # start every worker first
+        t0 = time.perf_counter()
+        for _ in pool.map(thumbnails.make_thumbnail, [jpeg] * count, chunksize=8):
+            pass
+        return count / (time.perf_counter() - t0)
+
+
+def write_day(directory, thumb, hours):
+    """One camera's .thm files for `hours` at THUMB_INTERVAL; returns the thumbnail count."""
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    per_segment = int(recorder.SEGMENT_SECONDS / thumbnails.THUMB_INTERVAL)
+    for seg in range(int(hours * 3600 / recorder.SEGMENT_SECONDS)):
+        start = START + seg * recorder.SEGMENT_SECONDS
+        path = os.path.join(directory, recorder.segment_name(start) + thumbnails.THUMB_EXT)
+        parts = []
+        for i in range(per_segment):
+            ts = start + i * thumbnails.THUMB_INTERVAL
+            parts.append(thumbnails.THUMB.pack(ts, len(thumb)) + thumb)
+        with open(path, "wb") as f:
+            f.write(b"".join(parts))
+        count += per_segment
+    return count
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", default="640x480,1600x1200,2592x1944")
+    ap.add_argument("--seconds", type=float, default=2, help="per single-process measurement")
+    ap.add_argument("--count", type=int, default=400, help="thumbnails per pool measurement")
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--hours", type=float, default=24, help="archive for the contact sheet timing")
+    args = ap.parse_args()
+
+    sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+    print(f"{os.cpu_count()} CPU(s); thumbnails fit {thumbnails.THUMB_SIZE[0]}x{thumbnails.THUMB_SIZE[1]}, "
+          f"quality {thumbnails.THUMB_QUALITY}")
+    print(f"{'frame':>10} {'KB':>5} {'thumb KB':>8} {'full/s':>8} {'draft/s':>8} {'speedup':>8}")
+    frames = {}
+    for size in sizes:
+        jpeg = frames[size] = synthetic_jpeg(size)
+        full = rate(full_thumbnail, jpeg, args.seconds)
+        draft = rate(thumbnails.make_thumbnail, jpeg, args.seconds)
+        thumb = thumbnails.make_thumbnail(jpeg)
+        print(f"{size[0]:>5}x{size[1]:<4} {len(jpeg) / 1024:5.0f} {len(thumb) / 1024:8.1f} "
+              f"{full:8.1f} {draft:8.1f} {draft / full:7.1f}x")
+
+    workers = [1]
+    while workers[-1] * 2 <= args.max_workers:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != args.max_workers:
+        workers.append(args.max_workers)
+    print("\nprocess pool, draft thumbnails/s (per worker, share of perfect scaling)")
+    print(f"{'frame':>10} " + " ".join(f"{w:>22}" for w in workers))
+    for size in sizes:
+        cells = []
+        base = None
+        for w in workers:
+            r = pool_rate(w, frames[size], args.count)
+            base = base or r
+            cells.append(f"{r:7.1f} ({r / w:6.1f}, {r / (base * w):4.0%})")
+        print(f"{size[0]:>5}x{size[1]:<4} " + " ".join(f"{c:>22}" for c in cells))
+
+    tmp = tempfile.mkdtemp(prefix="bench_thumbnails-")
+    try:
+        camera = os.path.join(tmp, "cam0")
+        thumb = thumbnails.make_thumbnail(frames[sizes[0]])
+        count = write_day(camera, thumb, args.hours)
+        print(f"\ncontact sheets from {count} thumbnails ({args.hours:g} h, "
+              f"{count * (len(thumb) + thumbnails.THUMB.size) / 2**20:.0f} MB of .thm)")
+        end = START + args.hours * 3600
+        hour = min(1.0, args.hours)
+        for label, start in ((f"last {hour:g} h", end - hour * 3600), (f"all {args.hours:g} h", START)):
+            t0 = time.perf_counter()
+            sheet = thumbnails.contact_sheet(camera, start, end)
+            ms = (time.perf_counter() - t0) * 1000
+            if sheet is None:
+                print(f"{label:>12}: {ms:7.1f} ms, no thumbnails")
+            else:
+                print(f"{label:>12}: {ms:7.1f} ms, {sheet.width}x{sheet.height}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Loopback benchmark for the chunked frame transport.
+
+Sends synthetic JPEG-sized frames over 127.0.0.1 using the same chunk
+format as main.py, randomly drops chunks at several rates, and reports
+how many frames the cloud.py Reassembler delivers.
+
+    python bench/bench_transport.py --frames 600 --size 24000
+"""
+import argparse
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cloud  # noqa: E402
+
+CHUNK_HDR = struct.Struct(">BHHHH")
+
+
+def send_frame_chunks(sock, addr, jpeg, frame_id, drop, rng):
+    """Same packet layout as main.send_frame_chunks, with simulated loss."""
+    mv = memoryview(jpeg)
+    total = (len(jpeg) + cloud.MAX_PAYLOAD - 1) // cloud.MAX_PAYLOAD
+    for chunk_id in range(total):
+        if drop and rng.random() < drop:
+            continue
+        start = chunk_id * cloud.MAX_PAYLOAD
+        payload = mv[start:start + cloud.MAX_PAYLOAD]
+        header = CHUNK_HDR.pack(cloud.PKT_FRAME_CHUNK, frame_id, chunk_id, total, len(payload))
+        sock.sendto(header + payload, addr)
+
+
+def run(drop, frames, size, fps, seed):
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(0.2)
+    addr = rx.getsockname()
+
+    reasm = cloud.Reassembler()
+    delivered = []
+
+    def receiver():
+        while True:
+            try:
+                data, src = rx.recvfrom(2048)
+            except socket.timeout:
+                return
+            slot = reasm.feed(src[0], data, time.monotonic())
+            if slot is not None:
+                delivered.append(slot.size)
+                slot.release()
+
+    t = threading.Thread(target=receiver)
+    t.start()
+
+    rng = random.Random(seed)
+    jpeg = bytes(rng.getrandbits(8) for _ in range(size))
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    period = 1.0 / fps if fps else 0.0
+    t0 = time.perf_counter()
+    for frame_id in range(frames):
+        send_frame_chunks(tx, addr, jpeg, frame_id & 0xFFFF, drop, rng)
+        if period:
+            delay = t0 + (frame_id + 1) * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    elapsed = time.perf_counter() - t0
+    t.join()
+    tx.close()
+    rx.close()
+
+    ok = sum(1 for n in delivered if n == size)
+    return {
+        "drop": drop,
+        "sent": frames,
+        "delivered": ok,
+        "fps": ok / elapsed,
+        "loss": 1.0 - ok / frames,
+        "expected_loss": 1.0 - (1.0 - drop) ** ((size + cloud.MAX_PAYLOAD - 1) // cloud.MAX_PAYLOAD),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--size", type=int, default=24000, help="JPEG bytes per frame")
+    ap.add_argument("--fps", type=float, default=0, help="pace sender (0 = as fast as possible)")
+    ap.add_argument("--drops", default="0,0.001,0.005,0.01,0.02,0.05")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    chunks = (args.size + cloud.MAX_PAYLOAD - 1) // cloud.MAX_PAYLOAD
+    print(f"{args.frames} frames x {args.size} B ({chunks} chunks/frame)")
+    print(f"{'drop':>7} {'delivered':>10} {'fps':>9} {'loss':>7} {'expected':>9}")
+    for drop in (float(d) for d in args.drops.split(",")):
+        r = run(drop, args.frames, args.size, args.fps, args.seed)
+        print(f"{r['drop']:7.3f} {r['delivered']:>10} {r['fps']:9.1f} "
+              f"{r['loss']:7.2%} {r['expected_loss']:9.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Synthetic multi-camera load generator.
+
+Each simulated camera streams chunked frames from its own source address
+(127.0.0.2, 127.0.0.3, ... on loopback) so the receiver sees N distinct
+cameras. Cameras are spread across several sender processes.
+
+    python bench/loadgen.py --cameras 50 --fps 30 --seconds 10 --port 4444
+
+Register the same addresses in cloud.CAMERAS to watch them in the viewer.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import struct
+import time
+
+CHUNK_HDR = struct.Struct(">BHHHH")
+MAX_PAYLOAD = 1200
+PKT_FRAME_CHUNK = 0x01
+
+
+def camera_ip(i, first=2):
+    """Loopback source address for simulated camera `i`."""
+    n = first + i
+    return f"127.0.{n // 256}.{n % 256}"
+
+
+def _chunk_packets(jpeg, frame_id):
+    mv = memoryview(jpeg)
+    total = (len(jpeg) + MAX_PAYLOAD - 1) // MAX_PAYLOAD
+    for chunk_id in range(total):
+        payload = mv[chunk_id * MAX_PAYLOAD:(chunk_id + 1) * MAX_PAYLOAD]
+        yield CHUNK_HDR.pack(PKT_FRAME_CHUNK, frame_id, chunk_id, total, len(payload)) + payload
+
+
+def sender(addr, cams, fps, size, seconds):
+    """Stream from every camera index in `cams` until `seconds` elapse."""
+    socks = []
+    for i in cams:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if addr[0].startswith("127."):
+            s.bind((camera_ip(i), 0))
+        socks.append(s)
+
+    jpeg = os.urandom(size)
+    period = 1.0 / fps
+    t0 = time.perf_counter()
+    frame_id = 0
+    while time.perf_counter() - t0 < seconds:
+        packets = list(_chunk_packets(jpeg, frame_id))
+        for s in socks:
+            for p in packets:
+                s.sendto(p, addr)
+        frame_id = (frame_id + 1) & 0xFFFF
+        delay = t0 + frame_id * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    for s in socks:
+        s.close()
+
+
+def start(addr, cameras, fps, size, seconds, procs=None):
+    """Launch sender processes and return them (call .join() to wait)."""
+    procs = procs or min(cameras, os.cpu_count() or 1)
+    workers = []
+    for p in range(procs):
+        cams = list(range(p, cameras, procs))
+        w = multiprocessing.Process(target=sender, args=(addr, cams, fps, size, seconds))
+        w.start()
+        workers.append(w)
+    return workers
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=4444)
+    ap.add_argument("--cameras", type=int, default=50)
+    ap.add_argument("--fps", type=float, default=30)
+    ap.add_argument("--size", type=int, default=24000, help="JPEG bytes per frame")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--procs", type=int, default=0, help="sender processes (0 = one per CPU)")
+    args = ap.parse_args()
+
+    workers = start((args.host, args.port), args.cameras, args.fps, args.size,
+                    args.seconds, args.procs)
+    for w in workers:
+        w.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Stand-ins for the MicroPython modules the firmware imports, so main.py and
+lib/Arducam.py can run on a desktop against a simulated board.
+
+All timing is virtual: sleeps, SPI and I2C transfers and UDP sends only
+advance `clock`, using the configured bus and link rates. The ArduChip
+model captures a frame on the next sensor VSYNC after start_capture() and
+serves a synthetic JPEG from its FIFO.
+
+    import mpstubs
+    fw = mpstubs.load_firmware(spi_baud=8_000_000, frame_bytes=20_000)
+    cam = fw.camera_init()
+"""
+import gc
+import importlib.util
+import os
+import random
+import struct
+import sys
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LIB = os.path.join(ROOT, "lib")
+
+# Simulated board; load_firmware() overrides these.
+CONFIG = {
+    "spi_baud": None,            # None = use the baudrate main.py asks for
+    "spi_call_us": 20,           # interpreter overhead per SPI call
+    "i2c_call_us": 30,           # interpreter overhead per I2C call
+    "frame_bytes": 20_000,       # JPEG size the sensor produces
+    "fifo_padding": 8,           # bytes the ArduChip reports past EOI
+    "sensor_fps": 30,            # sensor frame rate (VSYNC period)
+    "wifi_mbps": 8.0,            # sustained UDP throughput
+    "packet_us": 250,            # per-datagram cost on top of airtime
+    "heap_free": 150_000,        # gc.mem_free() after a collect
+}
+
+
+class VirtualClock:
+    def __init__(self):
+        self.us = 0
+
+    def advance(self, us):
+        self.us += int(us)
+
+    def reset(self):
+        self.us = 0
+
+
+clock = VirtualClock()
+
+
+# ----------------------------
+# time / utime
+# ----------------------------
+def _time_module(name):
+    m = types.ModuleType(name)
+    m.ticks_ms = lambda: clock.us // 1000
+    m.ticks_us = lambda: clock.us
+    m.ticks_diff = lambda a, b: a - b
+    m.ticks_add = lambda a, b: a + b
+    m.sleep = lambda s: clock.advance(s * 1_000_000)
+    m.sleep_ms = lambda ms: clock.advance(ms * 1000)
+    m.sleep_us = lambda us: clock.advance(us)
+    m.time = lambda: clock.us / 1_000_000
+    return m
+
+
+# ----------------------------
+# machine
+# ----------------------------
+class Pin:
+    OUT = 1
+    IN = 0
+
+    def __init__(self, pin, mode=None, value=None):
+        self.pin = pin
+        self._value = value or 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = v
+
+
+def filler_jpeg(size, rng=None):
+    """SOI + marker-free filler + EOI, so SOI/EOI scanning behaves like a real frame."""
+    rng = rng or random.Random(size)
+    body = bytes(rng.randrange(0, 0xFF) for _ in range(max(0, size - 4)))
+    return b"\xff\xd8" + body + b"\xff\xd9"
+
+
+class ArduChipSPI:
+    """SPI bus with an ArduChip (FIFO + capture control) on the other end."""
+
+    def __init__(self, spi_id=None, baudrate=2_000_000, **kwargs):
+        self.baudrate = CONFIG["spi_baud"] or baudrate
+        self.regs = bytearray(256)
+        self.burst = False
+        self.fifo = b""
+        self.fifo_pos = 0
+        self.capture_done_us = None
+        self.transactions = 0
+        self.bytes = 0
+        self.set_frame(CONFIG["frame_bytes"])
+
+    def set_frame(self, size):
+        self.fifo = filler_jpeg(size) + bytes(CONFIG["fifo_padding"])
+
+    def _transfer(self, n):
+        self.transactions += 1
+        self.bytes += n
+        clock.advance(CONFIG["spi_call_us"] + n * 8 * 1_000_000 / self.baudrate)
+
+    def _reg_read(self, addr):
+        if addr == 0x41:
+            done = self.capture_done_us is not None and clock.us >= self.capture_done_us
+            return 0x08 if done else 0x00
+        n = len(self.fifo)
+        if addr == 0x42:
+            return n & 0xFF
+        if addr == 0x43:
+            return (n >> 8) & 0xFF
+        if addr == 0x44:
+            return (n >> 16) & 0x7F
+        return self.regs[addr]
+
+    def _reg_write(self, addr, value):
+        self.regs[addr] = value
+        if addr == 0x04:
+            if value & 0x01:
+                self.capture_done_us = None
+                self.fifo_pos = 0
+            if value & 0x02:
+                # Capture starts at the next VSYNC and takes one frame time.
+                period = 1_000_000 // CONFIG["sensor_fps"]
+                vsync = (clock.us // period + 1) * period
+                self.capture_done_us = vsync + period
+                self.fifo_pos = 0
+
+    def write(self, buf):
+        buf = bytes(buf)
+        self._transfer(len(buf))
+        if buf == b"\x3c":
+            self.burst = True
+        elif len(buf) == 2 and buf[0] & 0x80:
+            self.burst = False
+            self._reg_write(buf[0] & 0x7F, buf[1])
+
+    def readinto(self, buf):
+        n = len(buf)
+        self._transfer(n)
+        if self.burst:
+            chunk = self.fifo[self.fifo_pos:self.fifo_pos + n]
+            buf[:len(chunk)] = chunk
+            self.fifo_pos += n
+
+    def write_readinto(self, tx, rx):
+        self._transfer(len(tx))
+        self.burst = False
+        rx[1] = self._reg_read(tx[0] & 0x7F)
+
+
+class OV5642I2C:
+    """I2C bus with an OV5642 (16-bit register addresses, auto-increment writes)."""
+
+    def __init__(self, i2c_id=None, scl=None, sda=None, freq=400_000):
+        self.freq = freq
+        self.regs = {0x300A: 0x56, 0x300B: 0x42}
+        self.ptr = 0
+        self.transactions = 0
+        self.bytes = 0
+        self.writes = []             # (address, value) in bus order
+
+    def _transfer(self, n):
+        self.transactions += 1
+        self.bytes += n
+        # start + address byte + data bytes, 9 clocks each, + stop
+        clock.advance(CONFIG["i2c_call_us"] + (n + 1) * 9 * 1_000_000 / self.freq)
+
+    def scan(self):
+        return [0x3C]
+
+    def writeto(self, addr, buf):
+        buf = bytes(buf)
+        self._transfer(len(buf))
+        if len(buf) < 2:
+            return
+        reg = (buf[0] << 8) | buf[1]
+        self.ptr = reg
+        for i, v in enumerate(buf[2:]):
+            self.regs[reg + i] = v
+            self.writes.append((reg + i, v))
+
+    def readfrom_into(self, addr, buf):
+        self._transfer(len(buf))
+        for i in range(len(buf)):
+            buf[i] = self.regs.get(self.ptr + i, 0)
+
+
+# ----------------------------
+# network / socket / neopixel
+# ----------------------------
+class WLAN:
+    def __init__(self, iface=None):
+        pass
+
+    def active(self, on=None):
+        return True
+
+    def connect(self, ssid, password):
+        pass
+
+    def isconnected(self):
+        return True
+
+    def ifconfig(self):
+        return ("192.168.4.2", "255.255.255.0", "192.168.4.1", "192.168.4.1")
+
+
+class UDPSocket:
+    """Datagram socket whose sends cost airtime on the virtual clock."""
+
+    def __init__(self, *args):
+        self.packets = 0
+        self.bytes = 0
+        self.sent = []               # keep=True: copies of every datagram
+        self.keep = False
+        self.inbox = []
+
+    def bind(self, addr):
+        pass
+
+    def settimeout(self, t):
+        pass
+
+    def sendto(self, data, addr):
+        n = len(data)
+        self.packets += 1
+        self.bytes += n
+        if self.keep:
+            self.sent.append(bytes(data))
+        clock.advance(CONFIG["packet_us"] + (n + 28) * 8 / CONFIG["wifi_mbps"])
+        return n
+
+    def recvfrom(self, n):
+        if not self.inbox:
+            raise OSError(11)  # EAGAIN
+        return self.inbox.pop(0)
+
+
+class NeoPixel:
+    def __init__(self, pin, n):
+        self.pixels = [(0, 0, 0)] * n
+
+    def __setitem__(self, i, v):
+        self.pixels[i] = v
+
+    def __getitem__(self, i):
+        return self.pixels[i]
+
+    def write(self):
+        pass
+
+
+def _install():
+    machine = types.ModuleType("machine")
+    machine.Pin = Pin
+    machine.SPI = ArduChipSPI
+    machine.I2C = OV5642I2C
+    machine.reset = lambda: None
+
+    network = types.ModuleType("network")
+    network.WLAN = WLAN
+    network.STA_IF = 0
+
+    neopixel = types.ModuleType("neopixel")
+    neopixel.NeoPixel = NeoPixel
+
+    ustruct = types.ModuleType("ustruct")
+    for name in ("pack", "pack_into", "unpack", "unpack_from", "calcsize"):
+        setattr(ustruct, name, getattr(struct, name))
+
+    sys.modules.update({
+        "machine": machine,
+        "network": network,
+        "neopixel": neopixel,
+        "ustruct": ustruct,
+        "utime": _time_module("utime"),
+    })
+
+
+def load_firmware(**config):
+    """
+    Import lib/Arducam.py and main.py against the stubs and return the
+    firmware module. Keyword arguments override CONFIG. The firmware's
+    `time` and `socket` are swapped for virtual versions and its `gc` gains
+    MicroPython's mem_free(); the rest of the interpreter keeps the real ones.
+    """
+    CONFIG.update(config)
+    clock.reset()
+    _install()
+    if LIB not in sys.path:
+        sys.path.insert(0, LIB)
+
+    real_time = sys.modules["time"]
+    sys.modules["time"] = _time_module("time")
+    try:
+        for name in [n for n in sys.modules if n == "Arducam" or n.lower().startswith("ov5642")]:
+            del sys.modules[name]
+        spec = importlib.util.spec_from_file_location("firmware_main", os.path.join(ROOT, "main.py"))
+        fw = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(fw)
+    finally:
+        sys.modules["time"] = real_time
+
+    fw.socket = types.SimpleNamespace(socket=UDPSocket, AF_INET=2, SOCK_DGRAM=2)
+    fw.gc = types.SimpleNamespace(collect=gc.collect, mem_free=lambda: CONFIG["heap_free"])
+    return fw
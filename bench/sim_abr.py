@@ -0,0 +1,222 @@
+"""
+Offline simulation of the adaptive bitrate controller (lib/rate_control.py).
+
+Plays synthetic link traces (capacity and chunk loss over time) against
+the firmware's RATE_LADDER and RateController, with a simple model of the
+camera: JPEG size scales with pixel count and JPEG qscale and drifts with
+scene complexity; sending costs airtime plus a per-packet overhead; a
+frame is lost if any of its chunks is. The receiver's loss report is fed
+back once per second. Compares the controller against fixed rungs.
+The controller runs inside the firmware's Streamer, as on the camera, so
+the last row, starting at 2592x1944 (off the ladder), checks that the
+camera keeps that size instead of falling back to a rung.
+
+    python bench/sim_abr.py --trace all --fps 15
+    python bench/sim_abr.py --trace my_trace.csv   # rows: seconds,kbps,loss
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mpstubs  # noqa: E402
+
+DURATION = 120.0
+CHUNK = 1200
+PACKET_OVERHEAD = 9 + 28             # chunk header + UDP/IP
+PACKET_US = 250                      # per-datagram cost on the ESP32
+SPI_BPS = 8_000_000
+SENSOR_FPS = 30
+BYTES_PER_PIXEL_Q8 = 0.09            # JPEG bytes per pixel at qscale 8, average scene
+
+PIXELS = {                           # Arducam OV5642_* size -> pixel count
+    "OV5642_320x240": 320 * 240,
+    "OV5642_640x480": 640 * 480,
+    "OV5642_1024x768": 1024 * 768,
+    "OV5642_1280x960": 1280 * 960,
+    "OV5642_1600x1200": 1600 * 1200,
+    "OV5642_2048x1536": 2048 * 1536,
+    "OV5642_2592x1944": 2592 * 1944,
+}
+
+
+# ----------------------------
+# Link traces: t (s) -> (capacity kbps, chunk loss)
+# ----------------------------
+def steady(t):
+    return 6000, 0.002
+
+
+def drop(t):
+    return (8000 if t < 40 else 1200 if t < 80 else 5000), 0.002
+
+
+def fading(t):
+    return 1000 + 3500 * (1 + math.sin(2 * math.pi * t / 40)), 0.002
+
+
+def lossy(t):
+    return 5000, 0.10 if t % 30 < 5 else 0.002
+
+
+def walk(seed=3):
+    rng = random.Random(seed)
+    points = []
+    kbps = 4000.0
+    for _ in range(int(DURATION) + 1):
+        kbps = min(10000.0, max(800.0, kbps * math.exp(rng.gauss(0, 0.15))))
+        points.append(kbps)
+    return lambda t: (points[min(int(t), len(points) - 1)], 0.003)
+
+
+def csv_trace(path):
+    rows = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                t, kbps, loss = (float(v) for v in line.split(",")[:3])
+                rows.append((t, kbps, loss))
+    rows.sort()
+
+    def trace(t):
+        current = rows[0]
+        for row in rows:
+            if row[0] > t:
+                break
+            current = row
+        return current[1], current[2]
+    return trace
+
+
+TRACES = {"steady": steady, "drop": drop, "fading": fading, "lossy": lossy, "walk": walk()}
+
+
+# ----------------------------
+# Camera + link model
+# ----------------------------
+def frame_bytes(pixels, qscale, scene, rng):
+    return max(600, int(pixels * BYTES_PER_PIXEL_Q8 * (8 / qscale) ** 0.75 * scene
+                        * rng.uniform(0.9, 1.1)))
+
+
+class ModelCamera:
+    """Just the parts of the Arducam driver Streamer's rate control touches."""
+
+    def __init__(self, size, qscale=0x20):
+        self.resolution = size
+        self.qscale = qscale
+
+    def set_resolution(self, size):
+        self.resolution = size
+        return 0
+
+    def set_jpeg_qscale(self, qscale):
+        self.qscale = qscale
+
+
+def simulate(trace, cam, pixels, fps, streamer=None, seed=1):
+    rng = random.Random(seed)
+    t = 0.0
+    scene = 1.0
+    second_frames = {}
+    px_delivered = 0
+    delivered = 0
+    sent_bytes = 0
+    chunks_sent = chunks_lost = 0
+    next_report = 1.0
+    while t < DURATION:
+        kbps, loss = trace(t)
+        size, qscale = cam.resolution, cam.qscale
+        scene = min(1.6, max(0.5, scene * math.exp(rng.gauss(0, 0.03))))
+        nbytes = frame_bytes(pixels[size], qscale, scene, rng)
+        chunks = (nbytes + CHUNK - 1) // CHUNK
+        send_ms = ((nbytes + chunks * PACKET_OVERHEAD) * 8 / kbps
+                   + chunks * PACKET_US / 1000)
+        readout_ms = nbytes * 8 / SPI_BPS * 1000
+        period = max(1000 / fps, 1000 / SENSOR_FPS, readout_ms + send_ms)
+
+        lost = sum(rng.random() < loss for _ in range(chunks))
+        chunks_sent += chunks
+        chunks_lost += lost
+        sent_bytes += nbytes
+        if not lost:
+            delivered += 1
+            px_delivered += pixels[size]
+            sec = int(t)
+            second_frames[sec] = second_frames.get(sec, 0) + 1
+
+        t += period / 1000
+        if streamer and streamer.rate:
+            if t >= next_report:
+                streamer.rate.observe_loss(chunks_lost / max(1, chunks_sent))
+                chunks_sent = chunks_lost = 0
+                next_report += 1.0
+            if streamer.rate.observe_frame(nbytes, send_ms):
+                streamer.apply_rate()
+                t += 1 / SENSOR_FPS  # the capture in flight is discarded
+
+    seconds = int(DURATION)
+    on_target = sum(second_frames.get(s, 0) >= 0.9 * fps for s in range(seconds))
+    return {
+        "fps": delivered / DURATION,
+        "on_target": on_target / seconds,
+        "mpx": px_delivered / max(1, delivered) / 1e6,
+        "kbps": sent_bytes * 8 / DURATION / 1000,
+        "switches": streamer.controller.switches if streamer else 0,
+        "rung": streamer.rate.rung if streamer and streamer.rate else 0xFF,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--trace", default="all", help=f"{', '.join(TRACES)}, all, or a CSV file")
+    ap.add_argument("--fps", type=int, default=15, help="target fps")
+    ap.add_argument("--budget-kbps", type=float, default=None, help="default: firmware RATE_BUDGET_KBPS")
+    args = ap.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        fw = mpstubs.load_firmware()
+    driver = sys.modules["Arducam"]
+    pixels = {getattr(driver, name): n for name, n in PIXELS.items()}
+    ladder = fw.RATE_LADDER
+    budget = args.budget_kbps or fw.RATE_BUDGET_KBPS
+
+    if args.trace == "all":
+        traces = list(TRACES.items())
+    elif args.trace in TRACES:
+        traces = [(args.trace, TRACES[args.trace])]
+    else:
+        traces = [(os.path.basename(args.trace), csv_trace(args.trace))]
+
+    policies = [("fixed low", ladder[0]), ("fixed mid", ladder[len(ladder) // 2]),
+                ("fixed high", ladder[-1]), ("adaptive", None),
+                ("adapt@5MP", (driver.OV5642_2592x1944, None))]
+    print(f"target {args.fps} fps, budget {budget:g} kbit/s, {DURATION:g} s per trace, "
+          f"{len(ladder)} rungs")
+    print(f"{'trace':>8} {'policy':>11} {'fps':>6} {'s on target':>12} {'Mpx/frame':>10} "
+          f"{'kbit/s':>8} {'switches':>9} {'end rung':>9}")
+    for name, trace in traces:
+        for policy, setting in policies:
+            streamer = None
+            if setting is not None and setting[1] is not None:
+                cam = ModelCamera(*setting)
+            else:
+                # Adaptive: as main() does, the camera is at FRAME_SIZE and the streamer follows it.
+                cam = ModelCamera(setting[0] if setting else ladder[0][0])
+                rate = fw.RateController(ladder, args.fps, budget)
+                streamer = fw.Streamer(cam, None, None, fps=args.fps, rate=rate)
+                streamer.follow_camera()
+            r = simulate(trace, cam, pixels, args.fps, streamer)
+            rung = "fixed" if r["rung"] == 0xFF else r["rung"]
+            print(f"{name:>8} {policy:>11} {r['fps']:6.1f} {r['on_target']:11.0%} {r['mpx']:10.2f} "
+                  f"{r['kbps']:8.0f} {r['switches']:>9} {rung:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Lossy-link simulation of selective retransmission (NACK) vs drop-and-skip.
+
+Runs the firmware's pipelined Streamer (main.py on mpstubs) against
+cloud.Reassembler over a simulated link with a one-way delay and random
+or bursty datagram loss in both directions. With NACK the camera keeps
+its FrameRing and the receiver asks for missing chunks until the NACK
+deadline; the baseline drops every frame that lost a chunk. Reports
+complete frames per second, goodput (JPEG bytes of complete frames),
+retransmitted chunks and latency from a frame's first chunk leaving the
+camera until the frame is complete at the receiver.
+
+    python bench/sim_nack.py --loss 0,0.01,0.03,0.1 --burst 1 --rtt-ms 10
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import os
+import random
+import sys
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH, ".."))
+sys.path.insert(0, BENCH)
+
+import mpstubs  # noqa: E402
+import cloud  # noqa: E402
+
+VIEWER = ("192.168.4.1", 4444)
+
+
+class LossyLink:
+    """
+    One direction of the link: a fixed delay and Gilbert-Elliott loss with
+    mean `loss` and mean burst length `burst` datagrams (1 = independent).
+    """
+
+    def __init__(self, loss, burst, delay_us, rng):
+        self.p_recover = 1 / burst
+        self.p_fail = min(1.0, loss * self.p_recover / (1 - loss)) if loss < 1 else 1.0
+        self.delay_us = delay_us
+        self.rng = rng
+        self.bad = False
+        self.queue = []
+        self.seq = 0
+        self.sent = 0
+        self.lost = 0
+
+    def send(self, data, now):
+        self.sent += 1
+        if self.bad:
+            self.bad = self.rng.random() >= self.p_recover
+        else:
+            self.bad = self.rng.random() < self.p_fail
+        if self.bad:
+            self.lost += 1
+            return
+        self.seq += 1
+        heapq.heappush(self.queue, (now + self.delay_us, self.seq, bytes(data)))
+
+    def due(self, now):
+        while self.queue and self.queue[0][0] <= now:
+            t, _, data = heapq.heappop(self.queue)
+            yield t, data
+
+
+class Network:
+    """
+    Both directions of the link and the viewer's reassembler, advanced
+    lazily to the camera's virtual clock whenever the camera polls its
+    socket, so NACKs reach it mid-step just as they would on the board.
+    """
+
+    def __init__(self, reasm, loss, burst, rtt_ms, seed):
+        rng = random.Random(seed)
+        self.up = LossyLink(loss, burst, rtt_ms * 500, rng)
+        self.down = LossyLink(loss, burst, rtt_ms * 500, rng)
+        self.reasm = reasm
+        self.inbox = []
+        self.sent_at = {}            # frame_id -> clock.us of its first chunk
+        self.latency_ms = []
+        self.good_bytes = 0
+        self.next_retry = 0
+
+    def uplink(self, data, now):
+        if data[0] == cloud.PKT_FRAME_CHUNK:
+            self.sent_at.setdefault((data[1] << 8) | data[2], now)
+        self.up.send(data, now)
+
+    def advance(self, now):
+        for t, data in self.up.due(now):
+            self._retry(t)
+            if data[0] == cloud.PKT_STATS:
+                # As Ingest does: NACK the camera only once it reports it can resend.
+                flags = cloud.STATS.unpack_from(data)[17]
+                self.reasm.allow_nacks(0, flags & cloud.STATS_CAN_RESEND)
+                continue
+            slot = self.reasm.feed(0, data, t / 1e6)
+            if slot is not None:
+                self.latency_ms.append((t - self.sent_at.pop(slot.frame_id, t)) / 1000)
+                self.good_bytes += slot.size
+                slot.release()
+            elif self.reasm.nack_ready:
+                self._nack(t)
+        self._retry(now)
+        for _, data in self.down.due(now):
+            self.inbox.append((data, VIEWER))
+
+    def _retry(self, t):
+        # Ingest's NACK retry timer.
+        if self.reasm.nack_deadline and t >= self.next_retry:
+            self.next_retry = t + self.reasm.nack_retry * 1e6
+            self._nack(t)
+
+    def _nack(self, t):
+        for _, packet in self.reasm.nacks(t / 1e6):
+            self.down.send(packet, t)
+
+
+class CameraSocket(mpstubs.UDPSocket):
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+        self.inbox = net.inbox
+
+    def sendto(self, data, addr):
+        n = super().sendto(data, addr)
+        self.net.uplink(data, mpstubs.clock.us)
+        return n
+
+    def recvfrom(self, n):
+        self.net.advance(mpstubs.clock.us)
+        return super().recvfrom(n)
+
+
+def simulate(nack, loss, burst, rtt_ms, deadline_ms, seconds, fps, seed, **config):
+    fw = mpstubs.load_firmware(**config)
+    fw.NACK_DEADLINE_MS = deadline_ms
+    with contextlib.redirect_stdout(io.StringIO()):
+        cam = fw.camera_init()
+    reasm = cloud.Reassembler(nack_deadline=deadline_ms / 1000 if nack else 0)
+    net = Network(reasm, loss, burst, rtt_ms, seed)
+    sock = CameraSocket(net)
+    ring = fw.FrameRing(fw.NACK_RING_SIZE, fw.NACK_FRAMES) if nack else None
+    streamer = fw.Streamer(cam, sock, VIEWER, fps=fps, pipelined=True, ring=ring)
+
+    clock = mpstubs.clock
+    start = clock.us
+    end = start + seconds * 1_000_000
+    streamer.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while clock.us < end:
+            streamer.poll()          # the main loop's control check
+            streamer.step()
+            streamer.report()
+    net.advance(clock.us + rtt_ms * 1000)
+    elapsed = (clock.us - start) / 1_000_000
+
+    lat = sorted(net.latency_ms) or [0.0]
+    return {
+        "sent": streamer.frames,
+        "fps": len(net.latency_ms) / elapsed,
+        "goodput": net.good_bytes * 8 / elapsed / 1e6,
+        "resent": streamer.resent / max(1, sock.packets - streamer.resent),
+        "nacks": net.down.sent,
+        "p50": lat[len(lat) // 2],
+        "p95": lat[int(len(lat) * 0.95)],
+        "max": lat[-1],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--loss", default="0,0.01,0.03,0.1", help="datagram loss rates, each direction")
+    ap.add_argument("--burst", type=float, default=1.0, help="mean loss burst length in datagrams")
+    ap.add_argument("--rtt-ms", type=float, default=10.0)
+    ap.add_argument("--deadline-ms", type=int, default=None,
+                    help="default: firmware NACK_DEADLINE_MS")
+    ap.add_argument("--frame-kb", type=float, default=20)
+    ap.add_argument("--wifi-mbps", type=float, default=8.0)
+    ap.add_argument("--spi-mhz", type=float, default=8.0)
+    ap.add_argument("--target-fps", type=int, default=15, help="0 = unpaced")
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    config = {"frame_bytes": int(args.frame_kb * 1024), "wifi_mbps": args.wifi_mbps,
+              "spi_baud": int(args.spi_mhz * 1e6)}
+    with contextlib.redirect_stdout(io.StringIO()):
+        deadline = args.deadline_ms or mpstubs.load_firmware(**config).NACK_DEADLINE_MS
+    print(f"{args.frame_kb:g} KB frames, target {args.target_fps or 'unpaced'} fps, "
+          f"Wi-Fi {args.wifi_mbps:g} Mbit/s, RTT {args.rtt_ms:g} ms, burst {args.burst:g}, "
+          f"NACK deadline {deadline} ms")
+    print(f"{'loss':>6} {'mode':>6} {'fps':>6} {'goodput Mbit/s':>15} {'resent':>7} {'NACKs':>6} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}")
+    for loss in (float(v) for v in args.loss.split(",")):
+        for nack in (False, True):
+            r = simulate(nack, loss, args.burst, args.rtt_ms, deadline, args.seconds,
+                         args.target_fps, args.seed, **config)
+            print(f"{loss:6.1%} {'nack' if nack else 'skip':>6} {r['fps']:6.1f} {r['goodput']:15.2f} "
+                  f"{r['resent']:7.1%} {r['nacks']:>6} {r['p50']:7.1f} {r['p95']:7.1f} {r['max']:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
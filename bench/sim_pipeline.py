@@ -0,0 +1,72 @@
+"""
+Host-side simulation of the ESP32 streaming loop.
+
+Runs main.Streamer against stub machine/network modules (see mpstubs.py)
+and reports the frame rate the firmware can reach for a given SPI clock,
+Wi-Fi throughput, sensor rate and JPEG size: sequential, pipelined, and
+streamed (sent while the FIFO is read, no frame buffer). Frames larger
+than the firmware's MAX_JPEG_SIZE only get through streamed.
+
+    python bench/sim_pipeline.py --spi-mhz 8 --wifi-mbps 6 --frame-kb 20,150,300
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mpstubs  # noqa: E402
+
+
+def simulate(pipelined, seconds, fps, stream=False, **config):
+    fw = mpstubs.load_firmware(**config)
+    fw.STREAM_READOUT = stream
+    with contextlib.redirect_stdout(io.StringIO()):
+        cam = fw.camera_init()
+    sock = fw.socket.socket()
+    streamer = fw.Streamer(cam, sock, ("192.168.4.1", 4444), fps=fps, pipelined=pipelined,
+                           stream=stream)
+
+    clock = mpstubs.clock
+    start = clock.us
+    streamer.reset()
+    with contextlib.redirect_stdout(io.StringIO()):  # oversized-frame warnings
+        while clock.us - start < seconds * 1_000_000:
+            streamer.step()
+    elapsed = (clock.us - start) / 1_000_000
+    return {
+        "fps": streamer.frames / elapsed,
+        "mbps": sock.bytes * 8 / elapsed / 1e6,
+        "timeouts": streamer.timeouts,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--spi-mhz", type=float, default=8.0, help="SPI clock (main.py asks for 2 MHz)")
+    ap.add_argument("--wifi-mbps", type=float, default=6.0, help="sustained UDP throughput")
+    ap.add_argument("--frame-kb", default="10,20,40,300", help="JPEG sizes to try")
+    ap.add_argument("--sensor-fps", type=int, default=30)
+    ap.add_argument("--target-fps", type=int, default=0, help="0 = unpaced")
+    ap.add_argument("--seconds", type=float, default=10)
+    args = ap.parse_args()
+
+    print(f"SPI {args.spi_mhz:g} MHz, Wi-Fi {args.wifi_mbps:g} Mbit/s, sensor {args.sensor_fps} fps, "
+          f"target {args.target_fps or 'unpaced'}")
+    print(f"{'frame KB':>9} {'sequential fps':>15} {'pipelined fps':>14} {'gain':>6} {'link Mbit/s':>12} "
+          f"{'streamed fps':>13}")
+    for kb in (float(k) for k in args.frame_kb.split(",")):
+        config = dict(spi_baud=int(args.spi_mhz * 1e6), wifi_mbps=args.wifi_mbps,
+                      frame_bytes=int(kb * 1024), sensor_fps=args.sensor_fps)
+        seq = simulate(False, args.seconds, args.target_fps, **config)
+        pipe = simulate(True, args.seconds, args.target_fps, **config)
+        stream = simulate(False, args.seconds, args.target_fps, stream=True, **config)
+        gain = f"{pipe['fps'] / seq['fps']:5.2f}x" if seq["fps"] else "    -"
+        print(f"{kb:9g} {seq['fps']:15.1f} {pipe['fps']:14.1f} {gain:>6} "
+              f"{pipe['mbps']:12.2f} {stream['fps']:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Heap-fragmentation soak test for ArducamClass.read_jpeg.
+
+Streams many frames of varying size through the real driver against the
+simulated ArduChip FIFO (mpstubs.py), once allocating per frame and once
+with use_frame_buffer(). Every bytearray/bytes the driver allocates is
+replayed into a first-fit heap model the size of a MicroPython heap,
+interleaved with small long-lived allocations from the rest of the
+firmware. Reports frames lost to model MemoryErrors, the smallest largest-free-block seen,
+and the real bytes allocated per frame (tracemalloc).
+
+    python bench/soak_read_jpeg.py --frames 20000 --heap-kb 96
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mpstubs  # noqa: E402
+
+BLOCK = 16  # MicroPython GC block size
+
+
+class FirstFitHeap:
+    """Address-ordered first-fit allocator, like MicroPython's block heap."""
+
+    def __init__(self, size):
+        self.size = size
+        self.free = [(0, size)]      # (start, length), sorted, coalesced
+        self.used = {}               # start -> length
+
+    def alloc(self, n):
+        n = max(BLOCK, (n + BLOCK - 1) // BLOCK * BLOCK)
+        for i, (start, length) in enumerate(self.free):
+            if length >= n:
+                if length == n:
+                    del self.free[i]
+                else:
+                    self.free[i] = (start + n, length - n)
+                self.used[start] = n
+                return start
+        raise MemoryError(n)
+
+    def release(self, addr):
+        n = self.used.pop(addr)
+        free = self.free
+        i = 0
+        while i < len(free) and free[i][0] < addr:
+            i += 1
+        free.insert(i, (addr, n))
+        # coalesce with neighbours
+        if i + 1 < len(free) and free[i][0] + free[i][1] == free[i + 1][0]:
+            free[i] = (free[i][0], free[i][1] + free[i + 1][1])
+            del free[i + 1]
+        if i > 0 and free[i - 1][0] + free[i - 1][1] == free[i][0]:
+            free[i - 1] = (free[i - 1][0], free[i - 1][1] + free[i][1])
+            del free[i]
+
+    def largest_free(self):
+        return max((length for _, length in self.free), default=0)
+
+
+def soak(reuse, frames, heap_kb, sizes, seed):
+    fw = mpstubs.load_firmware()
+    # Size the frame buffer for the largest test frame, as a board without PSRAM would.
+    fw.MAX_JPEG_SIZE = max(sizes) + 1024
+    fw.REUSE_FRAME_BUFFER = reuse
+    driver = sys.modules["Arducam"]
+
+    heap = FirstFitHeap(heap_kb * 1024)
+    tracked = []                     # model addresses allocated by the driver
+
+    def track(real):
+        def wrapper(*args):
+            obj = real(*args)
+            tracked.append(heap.alloc(len(obj)))
+            return obj
+        return wrapper
+
+    driver.bytearray = track(bytearray)
+    driver.bytes = track(bytes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cam = fw.camera_init()
+    tracked.clear()                  # init-time buffers live forever
+
+    fifos = [mpstubs.filler_jpeg(n) + bytes(mpstubs.CONFIG["fifo_padding"]) for n in sizes]
+    rng = random.Random(seed)
+    background = []                  # (expires_at_frame, addr)
+    errors = 0
+    min_largest = heap.largest_free()
+    allocated = 0
+
+    tracemalloc.start()
+    for i in range(frames):
+        cam.spi.fifo = fifos[rng.randrange(len(fifos))]
+        cam.flush_fifo()
+        cam.start_capture()
+        mpstubs.clock.advance(100_000)
+
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                jpeg = cam.read_jpeg()
+        except MemoryError:
+            jpeg = b""
+        allocated += tracemalloc.get_traced_memory()[1] - base
+        if not jpeg:
+            errors += 1  # the driver swallows MemoryError and returns b""
+
+        # The read buffer dies when read_jpeg returns; the returned copy lives until sent.
+        held = tracked[-1:] if jpeg and not isinstance(jpeg, memoryview) else []
+        for addr in tracked[:len(tracked) - len(held)]:
+            heap.release(addr)
+        tracked.clear()
+
+        # Sending and control handling allocate small objects, some long-lived.
+        for _ in range(rng.randrange(1, 4)):
+            try:
+                background.append((i + rng.randrange(1, 60), heap.alloc(rng.randrange(16, 400))))
+            except MemoryError:
+                errors += 1
+        for addr in held:
+            heap.release(addr)
+        keep = []
+        for expires, addr in background:
+            if expires <= i:
+                heap.release(addr)
+            else:
+                keep.append((expires, addr))
+        background = keep
+        min_largest = min(min_largest, heap.largest_free())
+    tracemalloc.stop()
+
+    return {"errors": errors, "min_largest": min_largest, "per_frame": allocated / frames}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--frames", type=int, default=5000)
+    ap.add_argument("--heap-kb", type=int, default=96, help="modelled MicroPython heap")
+    ap.add_argument("--sizes-kb", default="6,10,14,20,28,36", help="JPEG sizes to cycle through")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    sizes = [int(float(k) * 1024) for k in args.sizes_kb.split(",")]
+    print(f"{args.frames} frames, {args.heap_kb} KB heap, JPEG sizes {args.sizes_kb} KB")
+    print(f"{'mode':>14} {'failed frames':>13} {'min largest free KB':>20} {'bytes alloc/frame':>18}")
+    for reuse in (False, True):
+        r = soak(reuse, args.frames, args.heap_kb, sizes, args.seed)
+        mode = "frame buffer" if reuse else "per-frame"
+        print(f"{mode:>14} {r['errors']:>13} {r['min_largest'] / 1024:20.1f} {r['per_frame']:18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Helpers shared by the desktop benchmarks.
+
+    pct             nearest-rank percentile of a list of timings
+    synthetic_jpeg  a PIL-encoded JPEG with gradients, edges and noise, so it
+                    decodes and compresses like a camera frame
+    START           wall-clock time simulated recordings start at
+
+(mpstubs.filler_jpeg is the firmware-side counterpart: SOI, filler, EOI,
+for exercising FIFO readout without PIL.)
+"""
+import io
+
+from PIL import Image, ImageDraw, ImageFilter
+
+START = 1767225600.0                 # 2026-01-01 00:00 UTC
+
+
+def pct(values, p):
+    """The `p`th percentile of `values` by nearest rank, 0.0 if there are none."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def synthetic_jpeg(size, quality=80):
+    """A JPEG with gradients, edges and noise so it compresses like a real scene."""
+    w, h = size
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, w, max(1, w // 12)):
+        draw.rectangle((i, h // 4, i + w // 24, h // 2 + i % (h // 3 + 1)), fill=(i % 255, 90, 200))
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    img = Image.blend(img, noise, 0.25).filter(ImageFilter.SMOOTH)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
@@ -1,138 +1,1512 @@
+import asyncio
+import queue
 import socket
 import struct
 import threading
 import time
 import tkinter as tk
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
-from PIL import Image, ImageTk
+from PIL import Image, ImageDraw, ImageTk
 import io
+import metrics
+import playback
+import recorder
+import thumbnails
 
-ESP_IP = "yyy.yyy.yyy.yyy"
+try:
+    import motion
+except ImportError:  # NumPy not installed: no motion analysis
+    motion = None
+
+# Registered cameras: (name, ESP32 IP address)
+CAMERAS = [
+    ("cam0", "yyy.yyy.yyy.yyy"),
+]
 PORT = 4444
 
-# Shared frame buffer
-latest_jpeg = None
-latest_ts = 0.0
-lock = threading.Lock()
-running = True
+# Recording: every frame received is written under these directories, one
+# per disk (cameras are spread over them); empty to disable
+RECORD_DIRS = ("recordings",)
+RECORD_PRE_EVENT = None              # seconds kept in memory and written on an event (motion
+                                     # reported by a camera's gate, or Event in the viewer);
+                                     # None records continuously
+RECORD_POST_EVENT = 10               # seconds recorded after an event
+RECORD_RETAIN_SECONDS = 7 * 24 * 3600  # delete segments older than this; None keeps them
+RECORD_RETAIN_BYTES = None           # and the oldest while a directory holds more; None = no limit
+RECORD_THUMB_INTERVAL = 2.0          # seconds between recorded thumbnails per camera; None disables
+
+# Motion analysis of the received frames (motion.py; needs NumPy). Motion
+# boxes are drawn over the video and motion is an event for RECORD_PRE_EVENT.
+MOTION_ANALYSIS = True
+MOTION_BOX_AGE = 0.5                 # seconds apart a frame and the analysis drawn over it may be
+
+# Frame sizes offered by the viewer's RES command (names from Arducam.set_framesize)
+RESOLUTIONS = ("QVGA", "VGA", "XGA", "1280x960", "UXGA", "QXGA", "QSXGA")
+
+# Chunked frame protocol (must match main.py)
+PKT_FRAME_CHUNK = 0x01
+CHUNK_HDR = struct.Struct(">BHHHH")  # type, frame_id, chunk_id, total, payload_len
+MAX_PAYLOAD = 1200
+
+# Receiver feedback to each camera (must match main.py)
+PKT_FEEDBACK = 0x10
+FEEDBACK = struct.Struct(">BBHHHHHH")  # type, seq, frames, chunks, lost chunks, timeouts,
+                                       # assembly ms, display ms; counts per interval
+FEEDBACK_INTERVAL = 1.0              # seconds between feedback packets; 0 disables
+NO_SAMPLE = 0xFFFF                   # latency field when no frame was measured
+
+# Selective retransmission of missing chunks (must match main.py)
+PKT_NACK = 0x11
+NACK_HDR = struct.Struct(">BHH")     # type, frame_id, first missing chunk; bitmap follows
+NACK_SPAN = 256                      # chunks one NACK covers (32-byte bitmap)
+NACK_DEADLINE = 0.15                 # seconds after a frame's first chunk to keep asking; 0 disables
+NACK_RETRY = 0.03                    # seconds between NACKs for the same frame
+
+# XOR parity chunks (must match main.py / lib/fec.py)
+PKT_FEC_PARITY = 0x03
+PARITY_HDR = struct.Struct(">BHHHBHH")  # type, frame_id, first chunk, total, chunks covered,
+                                        # XOR of their lengths, parity length
+
+# Camera telemetry report (must match main.py)
+PKT_STATS = 0x04
+STATS = struct.Struct(">BBHHHHIHHHHHHBHHBB")  # type, seq, interval ms, frames, timeouts, resent,
+                                              # bytes, (total, longest) ms per stage, rung, heap KB,
+                                              # frames held back by the motion gate, gate state, flags
+STATS_CAN_RESEND = 0x01              # flag: the camera keeps frames to answer NACKs
+STAGES = ("capture", "readout", "send")
+GATE_STATES = ("off", "active", "idle")
+
+# Metrics
+METRICS_ADDR = ("127.0.0.1", 9108)  # scrape endpoint http://host:port/metrics; None disables
+RATE_INTERVAL = 1.0                  # seconds between fps/bandwidth gauge updates
+OVERLAY_MS = 500                     # stats overlay refresh
+KB_BOUNDS = (4, 8, 16, 32, 64, 128, 256, 512)
+
+REASM_TIMEOUT = 0.5                  # seconds a partial frame may wait for chunks
+REORDER_WINDOW = 64                  # frame ids this far behind the newest are stale
+
+# Frame slot pool (receive buffers are reused, never reallocated)
+FRAME_SLOT_SIZE = 1024 * 1024        # largest frame; 2592x1944 JPEGs reach ~600 KB, ~1 MB at low qscale
+FRAME_POOL_SLOTS = 32
+SLOTS_PER_CAMERA = 3                 # latest + in-flight + one being displayed
+MAX_CHUNKS = FRAME_SLOT_SIZE // MAX_PAYLOAD
+PACKET_BUF_SIZE = 2048
+RECV_BATCH = 256                     # datagrams read per wake-up before timers get a turn
+
+# Display
+PHOTO_CACHE_SIZES = 4                # resized PhotoImages kept for the shown frame
+DECODE_WORKERS = 2                   # JPEG decode/scale threads (PIL releases the GIL)
+UI_TICK_MS = 15                      # how often the Tk thread drains its queues while frames flow
+UI_IDLE_MS = 50                      # and while nothing is arriving or being decoded
+
+# Events handed from the ingest loop to the Tk thread
+EV_FRAME = "frame"                   # arg: camera index with a new latest frame
+EV_STATUS = "status"                 # arg: status line text
+EV_MOTION = "motion"                 # arg: motion.MotionEvent
+UI_QUEUE_SIZE = 1024
+
+_NO_CHUNKS = bytes(MAX_CHUNKS)
+
+
+def frame_id_stale(frame_id, newest):
+    """
+    True if 16-bit `frame_id` is at or shortly behind `newest`.
+    Ids further back than REORDER_WINDOW are treated as a camera restart.
+    """
+    return ((newest - frame_id) & 0xFFFF) < REORDER_WINDOW
+
+
+class FrameSlot:
+    """
+    One preallocated frame buffer. While a frame is being reassembled the
+    slot also carries its chunk bookkeeping; once complete it is shared by
+    reference count between the receiver, display and recorder.
+    """
+    __slots__ = ("pool", "buf", "mv", "have", "refs", "received", "total",
+                 "size", "first_ts", "frame_id", "source", "ts", "seq", "tail", "nack_ts")
+
+    def __init__(self, pool, size):
+        self.pool = pool
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.have = bytearray(MAX_CHUNKS)
+        self.refs = 0
+        self.received = 0
+        self.total = 0
+        self.size = 0
+        self.first_ts = 0.0
+        self.frame_id = 0
+        self.source = None
+        self.ts = 0.0
+        self.seq = 0                 # per-camera publish sequence number
+        self.tail = False            # sender has moved past this frame
+        self.nack_ts = 0.0           # monotonic time of the last NACK, 0 if none
+
+    def view(self):
+        """Zero-copy view of the JPEG bytes in this slot."""
+        return self.mv[:self.size]
+
+    def retain(self):
+        self.pool.retain(self)
+        return self
+
+    def release(self):
+        self.pool.release(self)
+
+
+class FramePool:
+    """Fixed set of FrameSlots recycled once every holder has released them."""
+
+    def __init__(self, slots=FRAME_POOL_SLOTS, slot_size=FRAME_SLOT_SIZE):
+        self.slot_size = slot_size
+        self.slots = [FrameSlot(self, slot_size) for _ in range(slots)]
+        self._free = list(self.slots)
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def acquire(self):
+        """Take a free slot (refcount 1), or None if every slot is in use."""
+        with self._lock:
+            if not self._free:
+                self.exhausted += 1
+                return None
+            slot = self._free.pop()
+            slot.refs = 1
+        return slot
+
+    def retain(self, slot):
+        with self._lock:
+            slot.refs += 1
+
+    def release(self, slot):
+        with self._lock:
+            slot.refs -= 1
+            if slot.refs == 0:
+                self._free.append(slot)
+
+    def free_count(self):
+        with self._lock:
+            return len(self._free)
+
+
+class Reassembler:
+    """
+    Rebuild JPEG frames from chunk packets.
+
+    Partial frames are keyed by (source, frame_id) and live in slots taken
+    from a FramePool. Each chunk is copied once, straight from the receive
+    buffer into its final position in the slot, and a completed frame is
+    handed out as the slot itself. Partials older than `timeout` are
+    dropped, and the oldest partial is evicted when the pool runs dry.
+
+    Frames streamed straight from the camera FIFO do not know their chunk
+    count up front: their chunks carry total=0 until the last one, which
+    carries the real total.
+
+    A parity packet covering a group of chunks rebuilds the one chunk of
+    that group that is missing when it arrives, in place in the slot.
+
+    With a `nack_deadline`, a partial frame from a source in
+    `nack_sources` whose last chunk has arrived, or whose sender has
+    started a newer frame, is listed by nacks() for its missing chunks
+    until it completes or the deadline passes. A newer frame completing
+    first still drops it: live video never waits.
+    """
+
+    def __init__(self, pool=None, timeout=REASM_TIMEOUT, nack_deadline=NACK_DEADLINE,
+                 nack_retry=NACK_RETRY):
+        self.pool = pool if pool is not None else FramePool()
+        self.timeout = timeout
+        self.nack_deadline = nack_deadline
+        self.nack_retry = nack_retry
+        self.nack_ready = False  # a partial frame became NACK-able; call nacks()
+        self.nack_sources = set()  # sources that can resend, i.e. worth a NACK
+        self.max_chunks = min(MAX_CHUNKS, self.pool.slot_size // MAX_PAYLOAD)
+        self.pending = {}        # (source, frame_id) -> FrameSlot, oldest first
+        self.last_done = {}      # source -> newest completed frame_id
+        self.on_drop = None      # optional callback(source, missing chunks, timed out)
+        self.completed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.bad_packets = 0
+        self.oversize = 0        # chunks of frames too large for a slot
+        self.nack_packets = 0
+        self.fec_rebuilt = 0
+        self.fec_failed = 0      # parity that arrived with two or more chunks of its group lost
+        self._next_sweep = 0.0
+
+    def feed(self, source, packet, now):
+        """
+        Add one chunk or parity packet (bytes or memoryview) from `source`.
+        Returns the completed FrameSlot, owned by the caller, or None.
+        """
+        if now >= self._next_sweep:
+            self.expire(now)
+            self._next_sweep = now + self.timeout / 4
+
+        if len(packet) < CHUNK_HDR.size or packet[0] != PKT_FRAME_CHUNK:
+            if len(packet) >= PARITY_HDR.size and packet[0] == PKT_FEC_PARITY:
+                return self._feed_parity(source, packet, now)
+            self.bad_packets += 1
+            return None
+        _, frame_id, chunk_id, total, n = CHUNK_HDR.unpack_from(packet)
+        if chunk_id >= self.max_chunks or total > self.max_chunks:
+            self.oversize += 1
+            return None
+        if (chunk_id >= (total or self.max_chunks)
+                or n > MAX_PAYLOAD or len(packet) != CHUNK_HDR.size + n
+                or (chunk_id != total - 1 and n != MAX_PAYLOAD)):
+            self.bad_packets += 1
+            return None
+
+        slot = self._slot(source, frame_id, total, now)
+        if slot is None:
+            return None
+        if slot.total and chunk_id >= slot.total:
+            self.bad_packets += 1
+            return None
+        if slot.have[chunk_id]:
+            return None
+        off = chunk_id * MAX_PAYLOAD
+        # Assign through the memoryview: bytearray slice assignment would
+        # first copy a memoryview source into a temporary bytearray.
+        slot.mv[off:off + n] = packet[CHUNK_HDR.size:CHUNK_HDR.size + n]
+        slot.have[chunk_id] = 1
+        slot.received += 1
+        if chunk_id == total - 1:
+            slot.size = off + n
+        return self._complete(slot, chunk_id == total - 1)
+
+    def _slot(self, source, frame_id, total, now):
+        """Pending slot for a packet of (source, frame_id), or None to ignore the packet."""
+        last = self.last_done.get(source)
+        if last is not None and frame_id_stale(frame_id, last):
+            return None  # late packet of a frame we already finished or skipped
+
+        key = (source, frame_id)
+        slot = self.pending.get(key)
+        if slot is None:
+            slot = self.pool.acquire()
+            while slot is None and self.pending:
+                self._drop(next(iter(self.pending)))
+                self.evicted += 1
+                slot = self.pool.acquire()
+            if slot is None:
+                return None  # every slot is held downstream
+            clear = total or self.max_chunks
+            slot.have[:clear] = memoryview(_NO_CHUNKS)[:clear]
+            slot.received = 0
+            slot.total = total
+            slot.size = 0
+            slot.first_ts = now
+            slot.frame_id = frame_id
+            slot.source = source
+            slot.tail = False
+            slot.nack_ts = 0.0
+            if self.nack_deadline and source in self.nack_sources:
+                self._sender_moved_on(source, frame_id)
+            self.pending[key] = slot
+        elif total and slot.total != total:
+            if slot.total or slot.have.find(1, total, self.max_chunks) != -1:
+                self.bad_packets += 1
+                return None
+            slot.total = total  # end of a streamed frame
+        return slot
+
+    def _complete(self, slot, tail):
+        """Hand out `slot` if it now holds every chunk; `tail`: the sender is done with it."""
+        if slot.received < slot.total or not slot.total:
+            if tail and self.nack_deadline and slot.source in self.nack_sources:
+                slot.tail = True
+                self.nack_ready = True
+            return None
+
+        del self.pending[(slot.source, slot.frame_id)]
+        self._finish(slot.source, slot.frame_id)
+        self.completed += 1
+        slot.ts = time.time()
+        return slot
+
+    def _feed_parity(self, source, packet, now):
+        _, frame_id, first, total, count, len_xor, n = PARITY_HDR.unpack_from(packet)
+        end = first + count
+        if (not count or end > (total or self.max_chunks) or total > self.max_chunks
+                or n > MAX_PAYLOAD or len(packet) != PARITY_HDR.size + n):
+            self.bad_packets += 1
+            return None
+
+        slot = self._slot(source, frame_id, total, now)
+        if slot is None:
+            return None
+        if slot.total and end > slot.total:
+            self.bad_packets += 1
+            return None
+        have = slot.have
+        lost = have.find(0, first, end)
+        if lost == -1:
+            return None  # nothing missing in this group
+        if have.find(0, lost + 1, end) != -1:
+            self.fec_failed += 1
+            return None  # XOR parity rebuilds one chunk per group
+
+        # XOR as little-endian integers: shorter chunks are implicitly
+        # zero-padded at the end, as the sender's parity is.
+        last = slot.total - 1
+        acc = int.from_bytes(packet[PARITY_HDR.size:], "little")
+        size = len_xor
+        for i in range(first, end):
+            if i != lost:
+                off = i * MAX_PAYLOAD
+                m = slot.size - off if i == last else MAX_PAYLOAD
+                size ^= m
+                acc ^= int.from_bytes(slot.mv[off:off + m], "little")
+        if size > n or (lost != last and size != MAX_PAYLOAD):
+            self.bad_packets += 1
+            return None
+
+        off = lost * MAX_PAYLOAD
+        slot.mv[off:off + size] = acc.to_bytes(n, "little")[:size]
+        have[lost] = 1
+        slot.received += 1
+        if lost == last:
+            slot.size = off + size
+        self.fec_rebuilt += 1
+        return self._complete(slot, end == total)
+
+    def allow_nacks(self, source, allowed):
+        """Start or stop NACKing `source`, as its stats reports say it can resend or not."""
+        if allowed:
+            self.nack_sources.add(source)
+        else:
+            self.nack_sources.discard(source)
+
+    def nacks(self, now):
+        """
+        (source, NACK packet) for every partial frame that is due to ask for
+        its missing chunks: at most once per `nack_retry`, and only until
+        `nack_deadline` after its first chunk arrived.
+        """
+        self.nack_ready = False
+        out = []
+        for slot in self.pending.values():
+            if (not slot.tail or now - slot.first_ts > self.nack_deadline
+                    or (slot.nack_ts and now - slot.nack_ts < self.nack_retry)):
+                continue
+            packet = self._nack_packet(slot)
+            if packet is not None:
+                slot.nack_ts = now
+                self.nack_packets += 1
+                out.append((slot.source, packet))
+        return out
+
+    def _nack_packet(self, slot):
+        # Without a total (streamed frame, last chunk lost) only gaps below
+        # the highest chunk seen can be asked for.
+        total = slot.total or slot.have.rfind(1, 0, self.max_chunks) + 1
+        first = slot.have.find(0, 0, total)
+        if first == -1:
+            return None
+        span = min(total - first, NACK_SPAN)
+        bits = bytearray((span + 7) // 8)
+        have = slot.have
+        for i in range(span):
+            if not have[first + i]:
+                bits[i >> 3] |= 1 << (i & 7)
+        return NACK_HDR.pack(PKT_NACK, slot.frame_id, first) + bits
+
+    def _sender_moved_on(self, source, frame_id):
+        # A new frame from `source` means it has sent all of the older ones.
+        for (src, fid), slot in self.pending.items():
+            if src == source and not slot.tail and frame_id_stale(fid, frame_id):
+                slot.tail = True
+                self.nack_ready = True
+
+    def expire(self, now):
+        """Drop partial frames that have waited longer than the timeout."""
+        stale = [k for k, s in self.pending.items() if now - s.first_ts > self.timeout]
+        for key in stale:
+            self._drop(key, timed_out=True)
+        self.expired += len(stale)
+
+    def _finish(self, source, frame_id):
+        # Anything older from the same source can no longer be shown.
+        self.last_done[source] = frame_id
+        older = [k for k in self.pending
+                 if k[0] == source and frame_id_stale(k[1], frame_id)]
+        for key in older:
+            self._drop(key)
+        self.expired += len(older)
+
+    def _drop(self, key, timed_out=False):
+        slot = self.pending.pop(key)
+        # A streamed frame without a total is still missing its last chunk,
+        # which comes at least one after the highest chunk seen.
+        total = slot.total or slot.have.rfind(1, 0, self.max_chunks) + 2
+        missing = total - slot.received
+        slot.release()
+        if self.on_drop is not None:
+            self.on_drop(key[0], missing, timed_out)
+
+
+class CameraTable:
+    """
+    Registered cameras and their per-camera state.
+
+    Each camera gets a small integer index at registration; the ingest loop
+    maps a source IP to that index once per packet and everything else
+    (latest frame, counters, reassembly keys) is addressed by it. Counters
+    are kept column-wise in arrays so 50+ cameras stay compact.
+    """
+
+    def __init__(self, cameras=()):
+        self.index = {}              # ip -> camera index
+        self.names = []
+        self.ips = []
+        self.latest = []             # newest complete FrameSlot per camera
+        self.frames = array("Q")
+        self.bytes = array("Q")
+        self.dropped = array("Q")
+        self.last_ts = array("d")
+        self.chunks = array("Q")     # chunk packets received
+        self.lost = array("Q")       # chunks missing from dropped frames
+        self.timeouts = array("Q")   # partial frames expired after REASM_TIMEOUT
+        self.assembly = array("d")   # summed seconds from first to last chunk
+        self.displayed = array("Q")  # frames shown by the viewer
+        self.display = array("d")    # summed seconds from first chunk to on screen
+        self.unknown = 0             # packets from unregistered addresses
+        self.lock = threading.Lock()
+        for name, ip in cameras:
+            self.register(name, ip)
+
+    def __len__(self):
+        return len(self.names)
+
+    def register(self, name, ip):
+        """Add a camera and return its index. Call before ingest starts."""
+        if ip in self.index:
+            return self.index[ip]
+        idx = len(self.names)
+        self.index[ip] = idx
+        self.names.append(name)
+        self.ips.append(ip)
+        self.latest.append(None)
+        self.frames.append(0)
+        self.bytes.append(0)
+        self.dropped.append(0)
+        self.last_ts.append(0.0)
+        self.chunks.append(0)
+        self.lost.append(0)
+        self.timeouts.append(0)
+        self.assembly.append(0.0)
+        self.displayed.append(0)
+        self.display.append(0.0)
+        return idx
+
+    def publish(self, idx, slot, assembly=0.0):
+        """Make `slot` camera `idx`'s latest frame, releasing the one it replaces."""
+        with self.lock:
+            old = self.latest[idx]
+            self.latest[idx] = slot
+            self.frames[idx] += 1
+            slot.seq = self.frames[idx]
+            self.bytes[idx] += slot.size
+            self.last_ts[idx] = slot.ts
+            self.assembly[idx] += assembly
+        if old is not None:
+            old.release()
+
+    def retain_latest(self, idx):
+        """Latest FrameSlot of camera `idx` with a reference held, or None."""
+        with self.lock:
+            slot = self.latest[idx]
+            return slot.retain() if slot is not None else None
+
+    def count_drop(self, idx, missing=0, timed_out=False):
+        self.dropped[idx] += 1
+        self.lost[idx] += missing
+        if timed_out:
+            self.timeouts[idx] += 1
+
+    def count_display(self, idx, seconds):
+        """Viewer thread: camera `idx`'s frame reached the screen `seconds` after its first chunk."""
+        with self.lock:
+            self.displayed[idx] += 1
+            self.display[idx] += seconds
+
+    def counters(self, idx):
+        """Running totals behind camera `idx`'s feedback packets."""
+        with self.lock:
+            return (self.frames[idx], self.chunks[idx], self.lost[idx], self.timeouts[idx],
+                    self.assembly[idx], self.displayed[idx], self.display[idx])
+
+
+def make_reassembler(table, extra=0):
+    """Reassembler with a pool sized for every camera in `table`, plus `extra` slots."""
+    slots = max(FRAME_POOL_SLOTS, SLOTS_PER_CAMERA * len(table)) + extra
+    reasm = Reassembler(FramePool(slots))
+    reasm.on_drop = table.count_drop
+    return reasm
+
+
+def notify(events, event):
+    """Queue an event for the UI; if the UI has fallen behind, drop it."""
+    try:
+        events.put_nowait(event)
+    except queue.Full:
+        pass
+
+
+def mean_ms(seconds, n):
+    """Mean of `n` samples summing to `seconds`, in ms for a feedback field."""
+    if n <= 0:
+        return NO_SAMPLE
+    return min(int(seconds * 1000 / n + 0.5), NO_SAMPLE - 1)
+
+
+def feedback_packet(seq, before, after):
+    """
+    PKT_FEEDBACK covering the interval between two CameraTable.counters()
+    snapshots of one camera, or None if it sent nothing in between.
+    """
+    frames, chunks, lost, timeouts = (min(b - a, 0xFFFF) for a, b in zip(before[:4], after[:4]))
+    if not (chunks or lost or timeouts):
+        return None
+    assembly = mean_ms(after[4] - before[4], frames)
+    display = mean_ms(after[6] - before[6], after[5] - before[5])
+    return FEEDBACK.pack(PKT_FEEDBACK, seq, frames, chunks, lost, timeouts, assembly, display)
+
+
+class Telemetry:
+    """
+    The viewer's metrics registry, filled from both ends of the stream.
+
+    Receive-side totals stay in CameraTable's arrays and the Reassembler's
+    counters and are copied in when the registry is rendered. Per-frame
+    sizes and reassembly, decode and display times go into histograms as
+    they happen, and each camera's PKT_STATS reports add its own frame,
+    byte and stage-time counts.
+    """
+
+    def __init__(self, table, reasm, registry=None):
+        self.table = table
+        self.reasm = reasm
+        self.registry = r = registry if registry is not None else metrics.Registry()
+        cam = ("camera",)
+        self.frames = r.counter("viewer_frames_total", "Complete frames received", cam)
+        self.bytes = r.counter("viewer_bytes_total", "JPEG bytes in complete frames", cam)
+        self.dropped = r.counter("viewer_dropped_frames_total", "Partial frames given up on", cam)
+        self.chunks = r.counter("viewer_chunks_total", "Chunk packets received", cam)
+        self.lost = r.counter("viewer_lost_chunks_total", "Chunks missing from dropped frames", cam)
+        self.timeouts = r.counter("viewer_reassembly_timeouts_total",
+                                  "Partial frames expired after REASM_TIMEOUT", cam)
+        self.packets = r.counter("viewer_packets_total", "Receiver packet outcomes", ("outcome",))
+        self.fps = r.gauge("viewer_fps", "Complete frames per second", cam)
+        self.kbps = r.gauge("viewer_kbps", "Received JPEG kbit/s", cam)
+        self.frame_kb = r.histogram("viewer_frame_kb", "JPEG size per frame (KB)", cam, KB_BOUNDS)
+        self.assembly_ms = r.histogram("viewer_reassembly_ms", "First to last chunk of a frame", cam)
+        self.decode_ms = r.histogram("viewer_decode_ms", "JPEG decode and scale", cam)
+        self.display_ms = r.histogram("viewer_display_latency_ms", "First chunk to on screen", cam)
+
+        self.cam_frames = r.counter("camera_frames_total", "Frames sent, reported by the camera", cam)
+        self.cam_bytes = r.counter("camera_bytes_total", "JPEG bytes sent, reported by the camera", cam)
+        self.cam_timeouts = r.counter("camera_capture_timeouts_total", "Captures that timed out", cam)
+        self.cam_resent = r.counter("camera_resent_chunks_total", "Chunks resent on NACK", cam)
+        self.cam_fps = r.gauge("camera_fps", "Frames sent per second in the last report", cam)
+        self.cam_stage_ms = r.counter("camera_stage_ms_total", "Time per frame stage",
+                                      ("camera", "stage"))
+        self.cam_stage_max = r.gauge("camera_stage_max_ms", "Longest frame per stage in the last report",
+                                     ("camera", "stage"))
+        self.cam_rung = r.gauge("camera_rate_rung", "Adaptive bitrate ladder rung (255 = fixed)", cam)
+        self.cam_heap = r.gauge("camera_heap_free_kb", "Free MicroPython heap", cam)
+        self.cam_gated = r.counter("camera_gated_frames_total",
+                                   "Frames the motion gate held back", cam)
+        self.cam_gate = r.gauge("camera_motion_gate", "Motion gate: 0 off, 1 active, 2 idle", cam)
+        self.reports = [None] * len(table)  # newest STATS fields per camera
+        self._last = [(0, 0)] * len(table)  # frames, bytes at the previous tick()
+        self._last_ts = time.monotonic()
+        r.add_collector(self.collect)
+
+    def on_frame(self, idx, size, assembly):
+        """Ingest thread: camera `idx` completed a `size`-byte frame in `assembly` seconds."""
+        name = self.table.names[idx]
+        self.frame_kb.labels(name).observe(size / 1024)
+        self.assembly_ms.labels(name).observe(assembly * 1000)
+
+    def on_stats(self, idx, packet):
+        """Ingest thread: a PKT_STATS report from camera `idx`."""
+        f = STATS.unpack_from(packet)
+        name = self.table.names[idx]
+        self.cam_frames.labels(name).inc(f[3])
+        self.cam_timeouts.labels(name).inc(f[4])
+        self.cam_resent.labels(name).inc(f[5])
+        self.cam_bytes.labels(name).inc(f[6])
+        self.cam_fps.labels(name).set(f[3] * 1000 / f[2] if f[2] else 0)
+        for i, stage in enumerate(STAGES):
+            self.cam_stage_ms.labels(name, stage).inc(f[7 + 2 * i])
+            self.cam_stage_max.labels(name, stage).set(f[8 + 2 * i])
+        self.cam_rung.labels(name).set(f[13])
+        self.cam_heap.labels(name).set(f[14])
+        self.cam_gated.labels(name).inc(f[15])
+        self.cam_gate.labels(name).set(f[16])
+        self.reports[idx] = f
 
+    def tick(self, now):
+        """Update the per-camera fps and bandwidth gauges; call about once a second."""
+        dt = now - self._last_ts
+        if dt <= 0:
+            return
+        table = self.table
+        for idx, name in enumerate(table.names):
+            frames, nbytes = table.frames[idx], table.bytes[idx]
+            last = self._last[idx]
+            self.fps.labels(name).set((frames - last[0]) / dt)
+            self.kbps.labels(name).set((nbytes - last[1]) * 8 / dt / 1000)
+            self._last[idx] = (frames, nbytes)
+        self._last_ts = now
 
-def udp_receiver():
-    """Background thread: receive UDP packets and store latest JPEG."""
-    global latest_jpeg, latest_ts
+    def collect(self):
+        """Copy totals counted elsewhere into the registry."""
+        table = self.table
+        for idx, name in enumerate(table.names):
+            self.frames.labels(name).set(table.frames[idx])
+            self.bytes.labels(name).set(table.bytes[idx])
+            self.dropped.labels(name).set(table.dropped[idx])
+            self.chunks.labels(name).set(table.chunks[idx])
+            self.lost.labels(name).set(table.lost[idx])
+            self.timeouts.labels(name).set(table.timeouts[idx])
+        reasm = self.reasm
+        for outcome, value in (("unknown_source", table.unknown), ("bad", reasm.bad_packets),
+                               ("oversize", reasm.oversize),
+                               ("nack_sent", reasm.nack_packets), ("fec_rebuilt", reasm.fec_rebuilt),
+                               ("fec_failed", reasm.fec_failed), ("evicted", reasm.evicted),
+                               ("pool_exhausted", reasm.pool.exhausted)):
+            self.packets.labels(outcome).set(value)
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("0.0.0.0", PORT))
-    sock.settimeout(0.5)
+    def overlay(self, idx):
+        """Text block with camera `idx`'s live numbers for the viewer overlay."""
+        table = self.table
+        name = table.names[idx]
+        lines = [
+            f"{name}  rx {self.fps.labels(name).value:4.1f} fps  {self.kbps.labels(name).value:6.0f} kbit/s",
+            f"dropped {table.dropped[idx]}  lost chunks {table.lost[idx]}  timeouts {table.timeouts[idx]}",
+            f"frame      {self.frame_kb.labels(name).summary('KB')}",
+            f"reassembly {self.assembly_ms.labels(name).summary()}",
+            f"decode     {self.decode_ms.labels(name).summary()}",
+            f"display    {self.display_ms.labels(name).summary()}",
+        ]
+        f = self.reports[idx]
+        if f is None:
+            lines.append("camera: no stats received")
+        else:
+            frames = f[3] or 1
+            stages = "  ".join(f"{stage} {f[7 + 2 * i] / frames:.0f}/{f[8 + 2 * i]} ms"
+                               for i, stage in enumerate(STAGES))
+            rung = "fixed" if f[13] == 0xFF else f"rung {f[13]}"
+            lines.append(f"camera {f[3] * 1000 / (f[2] or 1):4.1f} fps  {rung}  heap {f[14]} KB  "
+                         f"timeouts {f[4]}  resent {f[5]}")
+            lines.append(f"mean/max {stages}")
+            if f[16] in (1, 2):
+                lines.append(f"motion gate {GATE_STATES[f[16]]}  held back {f[15]} frames")
+        return "\n".join(lines)
 
-    print(f"[UDP] Listening on 0.0.0.0:{PORT}")
 
-    while running:
+class IngestProtocol(asyncio.DatagramProtocol):
+    """One datagram endpoint for every camera: frame chunks in, commands out."""
+
+    def __init__(self, table, reasm, events, telemetry, recorder=None, analyzer=None):
+        self.table = table
+        self.reasm = reasm
+        self.events = events
+        self.telemetry = telemetry
+        self.recorder = recorder
+        self.analyzer = analyzer
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        idx = self.table.index.get(addr[0])
+        if idx is None:
+            self.table.unknown += 1
+            return
+
+        if len(data) == STATS.size and data[0] == PKT_STATS:
+            self.telemetry.on_stats(idx, data)
+            self.reasm.allow_nacks(idx, self.telemetry.reports[idx][17] & STATS_CAN_RESEND)
+            if self.recorder is not None and self.telemetry.reports[idx][16] == 1:
+                self.recorder.trigger(idx)  # the camera's motion gate sees motion
+            return
+
+        self.table.chunks[idx] += 1
+        now = time.monotonic()
+        slot = self.reasm.feed(idx, data, now)
+        if slot is not None:
+            assembly = now - slot.first_ts
+            self.table.publish(idx, slot, assembly)
+            if self.recorder is not None:
+                self.recorder.add(idx, slot)
+            if self.analyzer is not None:
+                self.analyzer.notify(idx)
+            self.telemetry.on_frame(idx, slot.size, assembly)
+            notify(self.events, (EV_FRAME, idx))
+        elif self.reasm.nack_ready:
+            self.send_nacks(now)
+
+    def send_nacks(self, now):
+        for idx, packet in self.reasm.nacks(now):
+            self.transport.sendto(packet, (self.table.ips[idx], PORT))
+
+    def error_received(self, exc):
+        # ICMP unreachable from an offline camera; keep serving the others.
+        pass
+
+
+class DrainingTransport(asyncio.DatagramTransport):
+    """
+    Minimal datagram transport that drains the socket on each wake-up.
+
+    asyncio's stock datagram transport does one recvfrom() per selector
+    event and hands out a fresh bytes object each time. At tens of
+    thousands of chunks per second that loop overhead dominates, so this
+    transport reads every queued datagram with recvfrom_into() into one
+    reusable buffer and passes the protocol a memoryview of it. It reads
+    at most RECV_BATCH per wake-up, so under a flood the loop's timers
+    still run between batches; the selector calls again for the rest.
+    """
+
+    def __init__(self, loop, sock, protocol):
+        super().__init__()
+        self._loop = loop
+        self._sock = sock
+        self._protocol = protocol
+        self._buf = bytearray(PACKET_BUF_SIZE)
+        self._view = memoryview(self._buf)
+        sock.setblocking(False)
+        loop.add_reader(sock.fileno(), self._read_ready)
+        protocol.connection_made(self)
+
+    def _read_ready(self):
+        recv = self._sock.recvfrom_into
+        view = self._view
+        handle = self._protocol.datagram_received
+        for _ in range(RECV_BATCH):
+            try:
+                n, addr = recv(self._buf)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self._protocol.error_received(e)
+                return
+            handle(view[:n], addr)
+
+    def sendto(self, data, addr=None):
+        try:
+            self._sock.sendto(data, addr)
+        except OSError as e:
+            self._protocol.error_received(e)
+
+    def get_extra_info(self, name, default=None):
+        if name == "socket":
+            return self._sock
+        if name == "sockname":
+            return self._sock.getsockname()
+        return default
+
+    def is_closing(self):
+        return self._sock.fileno() < 0
+
+    def close(self):
+        if self.is_closing():
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._protocol.connection_lost(None)
+
+
+class Ingest:
+    """
+    Receiver and control plane on a single asyncio event loop.
+
+    The loop runs in a background thread and wakes only when a datagram
+    arrives or a timer is due. The Tk side never touches sockets: it
+    consumes `events` and calls send_cmd(), which is safe from any thread.
+    Every `feedback_interval` seconds each camera that sent chunks gets a
+    PKT_FEEDBACK packet with its frame, loss and latency counts. NACKs go
+    out as soon as a frame turns out incomplete and are repeated from a
+    timer until the reassembler's NACK deadline. With a Recorder, every
+    completed frame is also handed to it for writing to disk. With a
+    motion.MotionAnalyzer, every camera's latest frame is analysed; its
+    events are queued as EV_MOTION and keep an event-mode Recorder
+    recording while the motion lasts.
+    """
+
+    def __init__(self, table, bind=("0.0.0.0", PORT), feedback_interval=FEEDBACK_INTERVAL,
+                 recorder=None, analyzer=None):
+        self.table = table
+        self.bind = bind
+        self.feedback_interval = feedback_interval
+        self.recorder = recorder
+        self.analyzer = analyzer
+        self.feedback_sent = 0
+        # Each analysis worker holds a frame while decoding it.
+        self.reasm = make_reassembler(table, analyzer.workers if analyzer is not None else 0)
+        self.telemetry = Telemetry(table, self.reasm)
+        if recorder is not None:
+            recorder.register_metrics(self.telemetry.registry)
+        if analyzer is not None:
+            analyzer.register_metrics(self.telemetry.registry)
+            analyzer.on_event = self._on_motion
+        self.events = queue.Queue(maxsize=UI_QUEUE_SIZE)
+        self.address = None
+        self.loop = None
+        self.protocol = None
+        self.error = None
+        self._ready = threading.Event()
+        self._stopping = None
+        self._sweeper = None
+        self._feedback_timer = None
+        self._nack_timer = None
+        self._rate_timer = None
+        self._feedback_seq = 0
+        self._reported = [table.counters(i) for i in range(len(table))]
+        self._thread = None
+
+    def start(self):
+        """Start the event loop thread and wait until the socket is bound."""
+        if self.analyzer is not None:
+            self.analyzer.start()
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(),), daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self):
+        if self.loop is not None and self._stopping is not None:
+            self.loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self.analyzer is not None:
+            self.analyzer.stop()
+
+    def send_cmd(self, cmd: str, ips):
+        """Fan a START/STOP/config command out to every IP in `ips`."""
+        self.loop.call_soon_threadsafe(self._send, cmd.encode("ascii"), list(ips))
+
+    async def _serve(self):
+        try:
+            self.loop = asyncio.get_running_loop()
+            self._stopping = asyncio.Event()
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            sock.bind(self.bind)
+            self.address = sock.getsockname()
+            self.protocol = IngestProtocol(self.table, self.reasm, self.events, self.telemetry,
+                                           self.recorder, self.analyzer)
+            try:
+                transport = DrainingTransport(self.loop, sock, self.protocol)
+            except NotImplementedError:
+                # Proactor loops (Windows) have no add_reader(); use the stock transport.
+                transport, _ = await self.loop.create_datagram_endpoint(
+                    lambda: self.protocol, sock=sock)
+        except Exception as e:
+            self.error = e
+            self._ready.set()
+            return
+
+        print(f"[UDP] Listening on {self.address[0]}:{self.address[1]} for {len(self.table)} camera(s)")
+        self._ready.set()
+        self._sweep()
+        if self.feedback_interval:
+            self._feedback_timer = self.loop.call_later(self.feedback_interval, self._feedback)
+        if self.reasm.nack_deadline:
+            self._nack_retry()
+        self._rates()
         try:
-            data, addr = sock.recvfrom(65535)
-        except socket.timeout:
-            continue
-        except Exception:
-            break
+            await self._stopping.wait()
+        finally:
+            self._sweeper.cancel()
+            for timer in (self._feedback_timer, self._nack_timer, self._rate_timer):
+                if timer is not None:
+                    timer.cancel()
+            transport.close()
+
+    def _sweep(self):
+        # Expire stalled partial frames even when no packets are arriving.
+        self.reasm.expire(time.monotonic())
+        self._sweeper = self.loop.call_later(self.reasm.timeout / 4, self._sweep)
+
+    def _rates(self):
+        self.telemetry.tick(time.monotonic())
+        if self.analyzer is not None and self.recorder is not None:
+            for idx, active in enumerate(self.analyzer.active):
+                if active:
+                    self.recorder.trigger(idx)  # still moving: keep recording
+        self._rate_timer = self.loop.call_later(RATE_INTERVAL, self._rates)
+
+    def _nack_retry(self):
+        if self.reasm.pending:
+            self.protocol.send_nacks(time.monotonic())
+        self._nack_timer = self.loop.call_later(self.reasm.nack_retry, self._nack_retry)
+
+    def _feedback(self):
+        self._feedback_seq = (self._feedback_seq + 1) & 0xFF
+        for idx, ip in enumerate(self.table.ips):
+            now = self.table.counters(idx)
+            packet = feedback_packet(self._feedback_seq, self._reported[idx], now)
+            self._reported[idx] = now
+            if packet is not None:
+                self.protocol.transport.sendto(packet, (ip, PORT))
+                self.feedback_sent += 1
+        self._feedback_timer = self.loop.call_later(self.feedback_interval, self._feedback)
+
+    def _on_motion(self, event):
+        """Analysis thread: motion started or ended on a camera."""
+        if event.kind == "start" and self.recorder is not None:
+            self.recorder.trigger(event.camera, at=event.ts)
+        print(f"[MOTION] {self.table.names[event.camera]} {event.kind}"
+              + (f", {len(event.boxes)} region(s)" if event.boxes else ""))
+        notify(self.events, (EV_MOTION, event))
+
+    def _send(self, data, ips):
+        for ip in ips:
+            self.protocol.transport.sendto(data, (ip, PORT))
+        text = data.decode("ascii")
+        print(f"[CTRL] Sent {text} to {len(ips)} camera(s)")
+        notify(self.events, (EV_STATUS, f"{text} sent to {len(ips)} camera(s)"))
+
+
+def fitted_size(src, box):
+    """Size of an image `src` (w, h) downscaled to fit inside `box`; never upscales."""
+    if box is None:
+        return src
+    scale = min(box[0] / src[0], box[1] / src[1])
+    if scale >= 1:
+        return src
+    return max(1, int(src[0] * scale)), max(1, int(src[1] * scale))
+
+
+def fit_image(img, size):
+    """Downscale `img` to fit inside `size` (w, h); never upscales."""
+    target = fitted_size(img.size, size)
+    if target == img.size:
+        return img
+    return img.resize(target, Image.BICUBIC)
 
-        # Accept only ESP packets
-        if addr[0] != ESP_IP:
-            continue
 
-        # Expect at least: type(1) + size(4)
-        if len(data) < 5:
-            continue
+class DecodeJob:
+    """
+    Decode (unless `image` is given) and scale one frame for display.
 
-        if data[0] != 0x01:
-            continue
+    JPEGs are decoded in draft mode: libjpeg scales by 1/2, 1/4 or 1/8 in
+    the DCT domain to the smallest size that still covers the display, so
+    a frame shown at a quarter of its capture size is never fully decoded.
+    When the window is as large as the frame, draft picks 1/1 (full decode).
+    """
+    __slots__ = ("key", "slot", "image", "full_size", "size", "result", "error", "arrival",
+                 "decode_ms")
 
-        size = struct.unpack(">I", data[1:5])[0]
-        jpeg = data[5:]
+    def __init__(self, key, slot, size, image=None, full_size=None):
+        self.key = key               # (camera index, seq)
+        self.slot = slot             # retained FrameSlot; ownership moves to the UI
+        self.image = image
+        self.full_size = full_size   # capture size; `image` may be a reduced draft
+        self.size = size
+        self.result = None
+        self.error = None
+        self.arrival = slot.first_ts  # monotonic time the first chunk arrived
+        self.decode_ms = None         # set when run() decoded the JPEG
 
-        if len(jpeg) != size:
-            continue
+    def run(self):
+        try:
+            t0 = time.perf_counter()
+            if self.image is None:
+                img = Image.open(io.BytesIO(self.slot.view()))
+                self.full_size = img.size
+                if self.size is not None:
+                    img.draft(None, fitted_size(img.size, self.size))
+                img.load()
+                self.image = img
+                self.result = fit_image(img, self.size)
+                self.decode_ms = (time.perf_counter() - t0) * 1000
+            else:
+                self.result = fit_image(self.image, self.size)
+        except Exception as e:
+            self.error = e
+
+
+class FrameDecoder:
+    """
+    Runs DecodeJobs on a worker pool with a latest-wins policy.
+
+    At most `workers` jobs run at once. A job submitted while every worker
+    is busy waits in a single pending spot and replaces (drops) whatever
+    was waiting there, so a slow decode never builds a backlog of stale
+    frames. Finished jobs are queued on `results` for the Tk thread.
+    """
+
+    def __init__(self, workers=DECODE_WORKERS):
+        self.workers = workers
+        self.results = queue.Queue()
+        self.dropped = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._pending = None
 
-        with lock:
-            latest_jpeg = jpeg
-            latest_ts = time.time()
+    def submit(self, job):
+        with self._lock:
+            if self._busy < self.workers:
+                self._busy += 1
+            else:
+                stale, self._pending = self._pending, job
+                job = None
+        if job is not None:
+            self._pool.submit(self._run, job)
+        elif stale is not None:
+            self.dropped += 1
+            stale.slot.release()
 
-    sock.close()
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
 
+    def _run(self, job):
+        while job is not None:
+            job.run()
+            self.results.put(job)
+            with self._lock:
+                job, self._pending = self._pending, None
+                if job is None:
+                    self._busy -= 1
 
-def send_cmd(cmd: str):
-    """Send START/STOP to ESP32 via UDP."""
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.sendto(cmd.encode("ascii"), (ESP_IP, PORT))
-    s.close()
-    print(f"[CTRL] Sent {cmd} to {ESP_IP}:{PORT}")
+    def busy(self):
+        return self._busy > 0
 
 
 class App(tk.Tk):
-    def __init__(self):
+    ALL_CAMERAS = "All cameras"
+
+    def __init__(self, ingest):
         super().__init__()
         self.title("Visual IoT Surveillance")
         self.geometry("900x600")
+        self.ingest = ingest
+        self.table = table = ingest.table
 
         # Top controls
         top = ttk.Frame(self)
         top.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
 
+        self.camera_var = tk.StringVar(value=table.names[0] if len(table) else "")
+        picker = ttk.Combobox(top, textvariable=self.camera_var, state="readonly", width=16,
+                              values=[self.ALL_CAMERAS] + table.names)
+        picker.pack(side=tk.LEFT, padx=(0, 10))
+        picker.bind("<<ComboboxSelected>>", lambda e: self.on_camera())
+
         self.status_var = tk.StringVar(value="Idle (press START)")
         ttk.Label(top, textvariable=self.status_var).pack(side=tk.LEFT)
 
         ttk.Button(top, text="START", command=self.on_start).pack(side=tk.RIGHT, padx=5)
         ttk.Button(top, text="STOP", command=self.on_stop).pack(side=tk.RIGHT, padx=5)
+        if ingest.recorder is not None and ingest.recorder.pre_event is not None:
+            ttk.Button(top, text="Event", command=self.on_event).pack(side=tk.RIGHT, padx=5)
+
+        self.res_var = tk.StringVar(value=RESOLUTIONS[0])
+        res = ttk.Combobox(top, textvariable=self.res_var, state="readonly", width=10,
+                           values=RESOLUTIONS)
+        res.pack(side=tk.RIGHT, padx=5)
+        res.bind("<<ComboboxSelected>>", lambda e: self.on_resolution())
+
+        self.motion_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text="Motion gate", variable=self.motion_var,
+                        command=self.on_motion_gate).pack(side=tk.RIGHT, padx=5)
+
+        self.overlay_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text="Stats", variable=self.overlay_var,
+                        command=self.update_overlay).pack(side=tk.RIGHT, padx=5)
+
+        self.playback_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text="Playback", variable=self.playback_var,
+                        command=self.on_playback).pack(side=tk.RIGHT, padx=5)
+
+        self.boxes_var = tk.BooleanVar(value=ingest.analyzer is not None)
+        if ingest.analyzer is not None:
+            ttk.Checkbutton(top, text="Motion boxes", variable=self.boxes_var,
+                            command=lambda: self.show_latest(force=True)).pack(side=tk.RIGHT, padx=5)
 
         # Video area
         self.image_label = ttk.Label(self)
         self.image_label.pack(side=tk.TOP, expand=True, fill=tk.BOTH, padx=10, pady=10)
 
-        self._tk_img = None  
-        self.after(50, self.update_frame)  # UI refresh loop
+        # Playback controls, shown in playback mode only
+        self.seek_bar = ttk.Frame(self)
+        ttk.Button(self.seek_bar, text="\u25c0", width=3,
+                   command=lambda: self.step_playback(-1)).pack(side=tk.LEFT)
+        self.play_button = ttk.Button(self.seek_bar, text="Play", width=6, command=self.toggle_play)
+        self.play_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.seek_bar, text="\u25b6", width=3,
+                   command=lambda: self.step_playback(1)).pack(side=tk.LEFT)
+        self.seek_time_var = tk.StringVar()
+        ttk.Label(self.seek_bar, textvariable=self.seek_time_var, width=24).pack(side=tk.RIGHT, padx=5)
+        self.seek_var = tk.DoubleVar()
+        self.seek_scale = ttk.Scale(self.seek_bar, variable=self.seek_var, command=self.on_seek)
+        self.seek_scale.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=10)
+        self.overlay = tk.Label(self, font="TkFixedFont", justify=tk.LEFT, anchor="nw",
+                                bg="black", fg="#7CFC00")
+
+        self._tk_img = None
+        self._slot = None            # retained FrameSlot of the frame on screen
+        self._frame = None           # its decoded (possibly draft-reduced) image
+        self._full_size = None       # its capture size
+        self._frame_key = None       # its (camera index, seq)
+        self._photos = {}            # display size -> PhotoImage of self._frame
+        self._resize_pending = False
+        self.decoder = FrameDecoder()
+        self.telemetry = ingest.telemetry
+        self._overlay_job = None
+        self.archive = None          # playback.Archive of the camera being played back
+        self._played = None          # the playback.Frame last requested
+        self._play_job = None
+        self._play_seq = 0           # playback decode keys; later requests win
+        self.bind("<Configure>", self.on_configure)
+        self.after(UI_TICK_MS, self.update_frame)  # UI refresh loop
+
+    def selected_camera(self):
+        """Index of the camera being viewed, or None for "All cameras"."""
+        name = self.camera_var.get()
+        if name in self.table.names:
+            return self.table.names.index(name)
+        return None
+
+    def target_ips(self):
+        idx = self.selected_camera()
+        return self.table.ips if idx is None else [self.table.ips[idx]]
 
     def on_start(self):
-        send_cmd("START")
+        self.ingest.send_cmd("START", self.target_ips())
         self.status_var.set("START sent. Waiting for frames...")
 
     def on_stop(self):
-        send_cmd("STOP")
+        self.ingest.send_cmd("STOP", self.target_ips())
         self.status_var.set("STOP sent. (stream should stop)")
 
-    def update_frame(self):
-        """Update displayed image if a new frame is available."""
-        global latest_jpeg, latest_ts
+    def on_resolution(self):
+        self.ingest.send_cmd("RES " + self.res_var.get(), self.target_ips())
+        self.status_var.set(f"Resolution {self.res_var.get()} requested")
+
+    def on_motion_gate(self):
+        state = "ON" if self.motion_var.get() else "OFF"
+        self.ingest.send_cmd("MOTION " + state, self.target_ips())
+        self.status_var.set(f"Motion gate {state.lower()} requested")
+
+    def on_event(self):
+        idx = self.selected_camera()
+        cameras = range(len(self.table)) if idx is None else [idx]
+        for i in cameras:
+            self.ingest.recorder.trigger(i)
+        self.status_var.set(f"Event: recording {len(cameras)} camera(s) "
+                            f"from {self.ingest.recorder.pre_event:g} s ago")
+
+    def on_camera(self):
+        if self.archive is not None:
+            self.on_playback()       # play back the newly picked camera instead
+        else:
+            self.show_latest(force=True)
+
+    def on_playback(self):
+        """Enter or leave playback of the viewed camera's recordings."""
+        self.close_playback()
+        self.clear_frame()
+        if not self.playback_var.get():
+            self.seek_bar.pack_forget()
+            self.show_latest(force=True)
+            return
+        idx = self.selected_camera()
+        rec = self.ingest.recorder
+        problem = None
+        if rec is None:
+            problem = "Recording is off (RECORD_DIRS)"
+        elif idx is None:
+            problem = "Pick one camera to play back"
+        else:
+            archive = playback.Archive(rec.camera_dir(idx))
+            span = archive.span()
+            if span is None:
+                archive.close()
+                problem = f"No recordings of {self.table.names[idx]} yet"
+        if problem is not None:
+            self.playback_var.set(False)
+            self.seek_bar.pack_forget()
+            self.status_var.set(problem)
+            self.show_latest(force=True)
+            return
+        self.archive = archive
+        self.seek_scale.configure(from_=span[0], to=span[1])
+        self.seek_bar.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0, 10), before=self.image_label)
+        self.show_recorded(archive.seek(span[1]))
 
-        frame = None
-        ts = 0.0
-        with lock:
-            if latest_jpeg is not None:
-                frame = latest_jpeg
-                ts = latest_ts
+    def close_playback(self):
+        self.stop_play()
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+        self._played = None
 
-        if frame:
+    def clear_frame(self):
+        """Forget the frame on screen, e.g. when switching between live and playback."""
+        if self._slot is not None:
+            self._slot.release()
+        self._slot = self._frame = self._frame_key = None
+        self._photos.clear()
+
+    def on_seek(self, value):
+        if self.archive is not None:
+            self.show_recorded(self.archive.seek(float(value)))
+
+    def step_playback(self, n):
+        self.stop_play()
+        if self.archive is not None and self._played is not None:
+            self.show_recorded(self.archive.step(self._played, n))
+
+    def toggle_play(self):
+        if self._play_job is not None:
+            self.stop_play()
+        elif self.archive is not None and self._played is not None:
+            self.play_button.configure(text="Pause")
+            self.play_next()
+
+    def stop_play(self):
+        if self._play_job is not None:
+            self.after_cancel(self._play_job)
+            self._play_job = None
+        self.play_button.configure(text="Play")
+
+    def play_next(self):
+        """Show the next recorded frame and schedule the one after at its recorded pace."""
+        frame = self.archive.step(self._played)
+        if frame is None:
+            self._play_job = None
+            self.stop_play()         # caught up with the recording
+            return
+        delay = frame.ts - self._played.ts
+        self.show_recorded(frame)
+        # Gaps in the recording are skipped after a second.
+        self._play_job = self.after(int(min(max(delay, 0.001), 1.0) * 1000), self.play_next)
+
+    def show_recorded(self, frame):
+        """Queue a recorded frame for decoding; its bytes stay in the segment's mapping."""
+        if frame is None:
+            return
+        self._played = frame
+        self._play_seq += 1
+        idx = self.selected_camera()
+        self.seek_var.set(frame.ts)
+        self.seek_time_var.set(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(frame.ts))
+                               + f".{int(frame.ts * 1000) % 1000:03d}")
+        self.decoder.submit(DecodeJob((idx, self._play_seq), frame, self.display_size()))
+
+    def on_configure(self, event):
+        if event.widget is self and self._frame is not None and not self._resize_pending:
+            self._resize_pending = True
+            self.after_idle(self.render)
+
+    def update_frame(self):
+        """Drain ingest events and finished decodes; never decodes on this thread."""
+        idx = self.selected_camera()
+        fresh = False
+        active = False
+        while True:
+            try:
+                kind, arg = self.ingest.events.get_nowait()
+            except queue.Empty:
+                break
+            active = True
+            if kind == EV_FRAME:
+                fresh = fresh or arg == idx
+            elif kind == EV_STATUS:
+                self.status_var.set(arg)
+            elif kind == EV_MOTION and arg.camera == idx and self.archive is None:
+                state = "Motion" if arg.kind == "start" else "Motion ended"
+                self.status_var.set(time.strftime(f"{state} on {self.table.names[idx]} at %H:%M:%S",
+                                                  time.localtime(arg.ts)))
+
+        if fresh and self.archive is None:
+            self.show_latest()
+        while True:
             try:
-                img = Image.open(io.BytesIO(frame))
-                # Resize to fit window
-                w = self.winfo_width() - 40
-                h = self.winfo_height() - 120
-                if w > 50 and h > 50:
-                    img.thumbnail((w, h))
-                self._tk_img = ImageTk.PhotoImage(img)
-                self.image_label.configure(image=self._tk_img)
-                self.status_var.set(time.strftime("Receiving… last frame %H:%M:%S", time.localtime(ts)))
-            except Exception as e:
-                self.status_var.set(f"Decode error: {e}")
+                self.on_decoded(self.decoder.results.get_nowait())
+            except queue.Empty:
+                break
+            active = True
+        # Poll fast only while frames are arriving or decoding; an idle viewer wakes 20 times a second.
+        active = active or self.decoder.busy()
+        self.after(UI_TICK_MS if active else UI_IDLE_MS, self.update_frame)
+
+    def show_latest(self, force=False):
+        """Queue the viewed camera's latest frame for decoding, unless it is already shown."""
+        idx = self.selected_camera()
+        if idx is None:
+            return
+        if not force and self._frame_key == (idx, self.table.frames[idx]):
+            return
+        slot = self.table.retain_latest(idx)
+        if slot is None:
+            return
+        if (idx, slot.seq) == self._frame_key:
+            slot.release()
+            self.render()
+            return
+        self.decoder.submit(DecodeJob((idx, slot.seq), slot, self.display_size()))
+
+    def on_decoded(self, job):
+        """Tk thread: wrap a finished decode in a PhotoImage and show it."""
+        idx, seq = job.key
+        current = self._frame_key
+        played = isinstance(job.slot, playback.Frame)
+        if (job.error is not None or idx != self.selected_camera()
+                or played != (self.archive is not None)
+                or (current is not None and current[0] == idx and seq < current[1])):
+            if job.error is not None:
+                self.status_var.set(f"Decode error: {job.error}")
+            job.slot.release()
+            return
+
+        if job.key != current:
+            if self._slot is not None:
+                self._slot.release()
+            self._slot = job.slot
+            self._frame = job.image
+            self._full_size = job.full_size
+            self._frame_key = job.key
+            self._photos.clear()
+            name = self.table.names[idx]
+            if played:
+                self.status_var.set(f"Playback of {name}: frame {job.slot.seq}, "
+                                    f"{len(self.archive)} segment(s)")
+            else:
+                self.status_var.set(time.strftime("Receiving… last frame %H:%M:%S", time.localtime(job.slot.ts))
+                                    + f" ({self.table.frames[idx]} frames, {self.table.dropped[idx]} dropped)"
+                                    + f" | latency {self.telemetry.display_ms.labels(name).summary()}")
+                arrival = job.arrival
+                self.after_idle(lambda: self.on_shown(idx, arrival))
+        else:
+            # A rescale of the frame already on screen. If it had to decode again at a
+            # larger draft scale, keep that image so later resizes rescale from it.
+            if job.image.width * job.image.height > self._frame.width * self._frame.height:
+                self._frame = job.image
+                self._full_size = job.full_size
+            job.slot.release()
+        if job.decode_ms is not None:
+            self.telemetry.decode_ms.labels(self.table.names[idx]).observe(job.decode_ms)
+
+        if len(self._photos) >= PHOTO_CACHE_SIZES:
+            self._photos.clear()
+        image = job.result
+        if not played and self.boxes_var.get():
+            image = self.draw_motion(idx, self._slot.ts, image)
+        self._photos[job.size] = ImageTk.PhotoImage(image)
+        self.render()
 
-        self.after(50, self.update_frame)
+    def draw_motion(self, idx, ts, image):
+        """`image` with the motion boxes of camera `idx`'s frame at `ts` drawn on a copy."""
+        result = self.ingest.analyzer.results[idx]
+        if result is None or not result.boxes or abs(result.ts - ts) > MOTION_BOX_AGE:
+            return image
+        image = image.copy()
+        draw = ImageDraw.Draw(image)
+        w, h = image.size
+        for x0, y0, x1, y1 in result.boxes:
+            draw.rectangle([x0 * w, y0 * h, x1 * w - 1, y1 * h - 1], outline=(255, 48, 48), width=2)
+        return image
+
+    def on_shown(self, idx, arrival):
+        latency = time.monotonic() - arrival
+        self.telemetry.display_ms.labels(self.table.names[idx]).observe(latency * 1000)
+        self.table.count_display(idx, latency)
+
+    def update_overlay(self):
+        """Show and keep refreshing, or hide, the stats overlay over the video."""
+        if self._overlay_job is not None:
+            self.after_cancel(self._overlay_job)
+            self._overlay_job = None
+        if not self.overlay_var.get():
+            self.overlay.place_forget()
+            return
+        idx = self.selected_camera()
+        if idx is None:
+            text = "\n\n".join(self.telemetry.overlay(i) for i in range(len(self.table)))
+        else:
+            text = self.telemetry.overlay(idx)
+        self.overlay.configure(text=text)
+        self.overlay.place(in_=self.image_label, x=8, y=8)
+        self.overlay.lift()
+        self._overlay_job = self.after(OVERLAY_MS, self.update_overlay)
+
+    def display_size(self):
+        """Largest image size that fits the window, or None if not laid out yet."""
+        w = self.winfo_width() - 40
+        h = self.winfo_height() - 120
+        return (w, h) if w > 50 and h > 50 else None
+
+    def render(self):
+        """Show the current frame at the window size; rescale off-thread on a cache miss."""
+        self._resize_pending = False
+        if self._frame is None:
+            return
+        size = self.display_size()
+        photo = self._photos.get(size)
+        if photo is None:
+            # Rescale from the decoded image if it has enough pixels, else decode again.
+            target = fitted_size(self._full_size, size)
+            enough = target[0] <= self._frame.width and target[1] <= self._frame.height
+            self.decoder.submit(DecodeJob(self._frame_key, self._slot.retain(), size,
+                                          self._frame if enough else None, self._full_size))
+            return
+        if photo is not self._tk_img:
+            self._tk_img = photo
+            self.image_label.configure(image=photo)
 
 
 if __name__ == "__main__":
-    # Start UDP receiver thread
-    t = threading.Thread(target=udp_receiver, daemon=True)
-    t.start()
+    table = CameraTable(CAMERAS)
+    rec = None
+    if RECORD_DIRS:
+        thumbs = thumbnails.Thumbnailer(RECORD_THUMB_INTERVAL) if RECORD_THUMB_INTERVAL else None
+        rec = recorder.Recorder(RECORD_DIRS, table.names, pre_event=RECORD_PRE_EVENT,
+                                post_event=RECORD_POST_EVENT, retain_seconds=RECORD_RETAIN_SECONDS,
+                                retain_bytes=RECORD_RETAIN_BYTES, thumbnailer=thumbs).start()
+        mode = "continuously" if RECORD_PRE_EVENT is None else f"on events (+{RECORD_PRE_EVENT:g} s before)"
+        print(f"[REC] Recording {len(table)} camera(s) {mode} to {', '.join(RECORD_DIRS)}")
+    analyzer = None
+    if MOTION_ANALYSIS:
+        if motion is None:
+            print("[MOTION] NumPy is not installed (pip install numpy); motion analysis is off")
+        else:
+            analyzer = motion.MotionAnalyzer(table)
+    ingest = Ingest(table, recorder=rec, analyzer=analyzer).start()
+    if METRICS_ADDR is not None:
+        try:
+            metrics.serve(ingest.telemetry.registry, METRICS_ADDR)
+            print(f"[METRICS] http://{METRICS_ADDR[0]}:{METRICS_ADDR[1]}/metrics")
+        except OSError as e:
+            print(f"[METRICS] Scrape endpoint disabled: {e}")
 
-    app = App()
+    app = App(ingest)
     try:
         app.mainloop()
     finally:
-        running = False
+        ingest.stop()
+        if app.archive is not None:
+            app.archive.close()
+        if rec is not None:
+            rec.stop()
+        app.decoder.shutdown()
+        for name in ingest.table.names:
+            latency = ingest.telemetry.display_ms.labels(name)
+            if latency.count:
+                print(f"[UI] {name} arrival-to-screen latency:", latency.summary())
+                print(latency.format())
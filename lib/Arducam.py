@@ -1,8 +1,9 @@
 from machine import Pin, SPI, I2C
 import machine
+import gc
+import sys
 import time
 import utime
-from OV5642_reg import *
 
 OV2640=0
 OV5642=1
@@ -16,6 +17,14 @@ CAP_DONE_MASK=0x08
 
 OV5642_CHIPID_HIGH=0x300a
 OV5642_CHIPID_LOW=0x300b
+OV5642_SYSTEM_CTRL=0x3008  # bit 7: software reset
+OV5642_GROUP_ACCESS=0x3212
+OV5642_JPEG_QSCALE=0x4407  # JPEG quantization scale: lower is better quality, bigger frames
+# Written every time, never skipped as unchanged by apply_profile()
+OV5642_VOLATILE_REGS=(OV5642_SYSTEM_CTRL, OV5642_GROUP_ACCESS)
+
+I2C_BURST_MAX=32           # data bytes per auto-increment register write
+SENSOR_RESET_MS=5          # settle time after a software reset
 
 OV2640_160x120  =0
 OV2640_176x144  =1
@@ -36,6 +45,28 @@ OV5642_2048x1536=5
 OV5642_2592x1944=6
 OV5642_1920x1080=7
 
+# JPEG window table for each OV5642_* size (modules in ov5642_tables/)
+OV5642_JPEG_TABLES = {
+    OV5642_320x240:   "ov5642_320x240",
+    OV5642_640x480:   "ov5642_640x480",
+    OV5642_1024x768:  "ov5642_1024x768",
+    OV5642_1280x960:  "ov5642_1280x960",
+    OV5642_1600x1200: "ov5642_1600x1200",
+    OV5642_2048x1536: "ov5642_2048x1536",
+    OV5642_2592x1944: "ov5642_2592x1944",
+}
+
+# set_framesize() names for OV5642 sizes
+OV5642_FRAMESIZES = {
+    "QVGA": OV5642_320x240,     "320X240": OV5642_320x240,
+    "VGA": OV5642_640x480,      "640X480": OV5642_640x480,
+    "XGA": OV5642_1024x768,     "1024X768": OV5642_1024x768,
+    "1280X960": OV5642_1280x960,
+    "UXGA": OV5642_1600x1200,   "1600X1200": OV5642_1600x1200,
+    "QXGA": OV5642_2048x1536,   "2048X1536": OV5642_2048x1536,
+    "QSXGA": OV5642_2592x1944,  "2592X1944": OV5642_2592x1944,
+}
+
 Advanced_AWB =0
 Simple_AWB   =1
 Manual_day   =2
@@ -160,6 +191,33 @@ BMP =0
 JPEG=1
 RAW =2
 
+def load_regs(name):
+    """
+    Import one register table from the ov5642_tables package and return
+    its packed blob. The module is unloaded straight away, so the table
+    is freed once the caller drops the blob.
+    """
+    full = "ov5642_tables." + name
+    regs = __import__(full, None, None, ("REGS",)).REGS
+    del sys.modules[full]
+    pkg = sys.modules.get("ov5642_tables")
+    if pkg is not None and hasattr(pkg, name):
+        delattr(pkg, name)
+    return regs
+
+def pack_regs16_8(reg_value):
+    """Pack a [[addr, val], ...] table (up to [0xffff, 0xff]) into 3-byte entries."""
+    blob = bytearray()
+    for data in reg_value:
+        addr = data[0]
+        val = data[1]
+        if (addr == 0xffff and val == 0xff):
+            break
+        blob.append((addr >> 8) & 0xff)
+        blob.append(addr & 0xff)
+        blob.append(val)
+    return blob
+
 class ArducamClass(object):
     def __init__(self, spi, cs_pin, i2c):
         self.CameraMode = JPEG
@@ -179,6 +237,20 @@ class ArducamClass(object):
         print("I2C scan:", self.i2c.scan())
 
         self.max_jpeg_size = 256 * 1024
+        self.jpeg_buf = None  # reusable frame buffer, see use_frame_buffer()
+
+        # Preallocated register transfer buffers (no per-call allocation)
+        self._spi_tx = bytearray(2)
+        self._spi_rx = bytearray(2)
+        self._i2c_buf = bytearray(2 + I2C_BURST_MAX)
+
+        # Last value written since the last reset to each register apply_profile()
+        # and set_jpeg_qscale() compare against: sorted addresses (2 bytes each),
+        # then a value and a written-since-reset flag per address
+        self._shadow_regs = load_regs("shadow_regs")
+        self.shadow = bytearray(len(self._shadow_regs) // 2)
+        self._shadow_known = bytearray(len(self.shadow))
+        self.resolution = OV5642_320x240  # JPEG size Camera_Init leaves the sensor at
 
         # Reset Arduchip
         self.Spi_write(0x07, 0x80)
@@ -214,12 +286,20 @@ class ArducamClass(object):
         self.CameraMode=mode
     
     def wrSensorReg16_8(self,addr,val):
-        buffer=bytearray(3)
+        buffer=self._i2c_buf
         buffer[0]=(addr>>8)&0xff
         buffer[1]=addr&0xff
         buffer[2]=val
-        self.iic_write(buffer)
-        time.sleep(0.003)
+        try:
+            self.iic_write(buffer, end=3)
+        except OSError:
+            self.clear_shadow()
+            raise
+        if addr==OV5642_SYSTEM_CTRL and val&0x80:
+            self.clear_shadow()
+            time.sleep_ms(SENSOR_RESET_MS)
+        elif addr not in OV5642_VOLATILE_REGS:
+            self._shadow_set(addr, val)
 
     def rdSensorReg16_8(self,addr):
         buffer=bytearray(2)
@@ -282,21 +362,22 @@ class ArducamClass(object):
         elif self.CameraType==OV5642:
             self.wrSensorReg16_8(0x3008, 0x80)
             if self.CameraMode == RAW:
-                self.wrSensorRegs16_8(OV5642_1280x960_RAW)
-                self.wrSensorRegs16_8(OV5642_640x480_RAW)
+                self.wrSensorRegs16_8(load_regs("ov5642_1280x960_raw"))
+                self.wrSensorRegs16_8(load_regs("ov5642_640x480_raw"))
             else:
-                self.wrSensorRegs16_8(OV5642_QVGA_Preview1)
-                self.wrSensorRegs16_8(OV5642_QVGA_Preview2)
+                self.wrSensorRegs16_8(load_regs("ov5642_qvga_preview1"))
+                self.wrSensorRegs16_8(load_regs("ov5642_qvga_preview2"))
                 time.sleep(0.1)
                 if self.CameraMode == JPEG:
                     time.sleep(0.1)
-                    self.wrSensorRegs16_8(OV5642_JPEG_Capture_QSXGA)
-                    self.wrSensorRegs16_8(ov5642_320x240)
+                    self.wrSensorRegs16_8(load_regs("ov5642_jpeg_capture_qsxga"))
+                    self.wrSensorRegs16_8(load_regs("ov5642_320x240"))
+                    self.resolution = OV5642_320x240
                     time.sleep(0.1)
                     self.wrSensorReg16_8(0x3818, 0xa8)
                     self.wrSensorReg16_8(0x3621, 0x10)
                     self.wrSensorReg16_8(0x3801, 0xb0)
-                    self.wrSensorReg16_8(0x4407, 0x20)
+                    self.wrSensorReg16_8(OV5642_JPEG_QSCALE, 0x20)
                 else:
                     self.wrSensorReg16_8(0x4740, 0x21)
                     self.wrSensorReg16_8(0x501e, 0x2a)
@@ -309,30 +390,34 @@ class ArducamClass(object):
                     self.wrSensorReg16_8(0x3621, reg_val & 0xdf)            
         else:
             pass
+        gc.collect()  # the register tables are garbage now
         
     def Spi_write(self,address,value):
         maskbits = 0x80
-        buffer=bytearray(2)
+        buffer=self._spi_tx
         buffer[0]=address | maskbits
         buffer[1]=value
         self.SPI_CS_LOW()
-        self.spi_write(buffer)
+        self.spi.write(buffer)
         self.SPI_CS_HIGH()
         
     def Spi_read(self, address):
+        return bytearray((self.Spi_read_byte(address),))
+
+    def Spi_read_byte(self, address):
         maskbits = 0x7f
-        tx = bytearray(2)
-        rx = bytearray(2)
+        tx = self._spi_tx
+        rx = self._spi_rx
 
         tx[0] = address & maskbits
         tx[1] = 0x00  # dummy byte to clock data out
 
         self.SPI_CS_LOW()
-        self.spi_write_readinto(tx, rx)
+        self.spi.write_readinto(tx, rx)
         self.SPI_CS_HIGH()
 
         # data is returned in the 2nd byte
-        return bytearray((rx[1],))
+        return rx[1]
 
     def spi_write(self, buf, *, start=0, end=None):
         if end is None:
@@ -356,7 +441,7 @@ class ArducamClass(object):
         self.spi.write_readinto(tx_view, rx_view)
         
     def get_bit(self,addr,bit):
-        value=self.Spi_read(addr)[0]
+        value=self.Spi_read_byte(addr)
         return value&bit
   
     def SPI_CS_LOW(self):
@@ -388,9 +473,9 @@ class ArducamClass(object):
 
         
     def read_fifo_length(self):
-        len1=self.Spi_read(0x42)[0]
-        len2=self.Spi_read(0x43)[0]
-        len3=self.Spi_read(0x44)[0]
+        len1=self.Spi_read_byte(0x42)
+        len2=self.Spi_read_byte(0x43)
+        len3=self.Spi_read_byte(0x44)
         len3=len3 & 0x7f
         lenght=((len3<<16)|(len2<<8)|(len1))& 0x07fffff
         return lenght
@@ -405,12 +490,128 @@ class ArducamClass(object):
             time.sleep(0.001)
             
     def wrSensorRegs16_8(self,reg_value):
-        for data in reg_value:
-            addr = data[0]
-            val = data[1]
-            if (addr == 0xffff and val == 0xff):
-                return
-            self.wrSensorReg16_8(addr, val)
+        """
+        Write a register table: a packed blob of 3-byte entries (address
+        high, address low, value) as returned by load_regs(), or a list of
+        [addr, val] pairs ending at [0xffff, 0xff]. Runs of consecutive
+        addresses go out as one auto-increment I2C write (up to
+        I2C_BURST_MAX registers) from a reused buffer; the only delay is
+        after a software reset. Writes to shadowed registers are recorded.
+        """
+        if isinstance(reg_value, (list, tuple)):
+            reg_value = pack_regs16_8(reg_value)
+        buffer = self._i2c_buf
+        n = 0            # values queued after the 2-byte start address
+        nxt = -1         # address that would extend the queued run
+        try:
+            for i in range(0, len(reg_value), 3):
+                addr = (reg_value[i] << 8) | reg_value[i + 1]
+                val = reg_value[i + 2]
+                if addr != nxt or n == I2C_BURST_MAX:
+                    if n:
+                        self.iic_write(buffer, end=2 + n)
+                    buffer[0] = (addr >> 8) & 0xff
+                    buffer[1] = addr & 0xff
+                    n = 0
+                buffer[2 + n] = val
+                n += 1
+                nxt = addr + 1
+                if addr == OV5642_SYSTEM_CTRL and val & 0x80:
+                    self.iic_write(buffer, end=2 + n)
+                    self.clear_shadow()
+                    time.sleep_ms(SENSOR_RESET_MS)
+                    n = 0
+                    nxt = -1
+                elif addr not in OV5642_VOLATILE_REGS:
+                    self._shadow_set(addr, val)
+            if n:
+                self.iic_write(buffer, end=2 + n)
+        except OSError:
+            self.clear_shadow()   # unknown which writes landed
+            raise
+
+    def _shadow_index(self, addr):
+        """Position of `addr` in the shadowed registers, or -1."""
+        regs = self._shadow_regs
+        lo = 0
+        hi = len(regs) // 2
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            cur = (regs[2 * mid] << 8) | regs[2 * mid + 1]
+            if cur < addr:
+                lo = mid + 1
+            elif cur > addr:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    def _shadow_set(self, addr, val):
+        i = self._shadow_index(addr)
+        if i >= 0:
+            self.shadow[i] = val
+            self._shadow_known[i] = 1
+
+    def shadow_value(self, addr):
+        """Value last written to a shadowed register since the last reset, or None."""
+        i = self._shadow_index(addr)
+        if i < 0 or not self._shadow_known[i]:
+            return None
+        return self.shadow[i]
+
+    def clear_shadow(self):
+        known = self._shadow_known
+        for i in range(len(known)):
+            known[i] = 0
+
+    def apply_profile(self, reg_value):
+        """
+        Write only the entries of a register table (blob or list, as for
+        wrSensorRegs16_8) whose value differs from the shadow, in table
+        order. Registers that are not shadowed (see ov5642_tables/shadow_regs),
+        never written since the last reset, or in OV5642_VOLATILE_REGS are
+        always written. Returns the number of registers written.
+        """
+        if isinstance(reg_value, (list, tuple)):
+            reg_value = pack_regs16_8(reg_value)
+        pending = {}     # values this table sets before the current entry
+        diff = bytearray()
+        for i in range(0, len(reg_value), 3):
+            addr = (reg_value[i] << 8) | reg_value[i + 1]
+            val = reg_value[i + 2]
+            cur = pending.get(addr)
+            if cur is None:
+                cur = self.shadow_value(addr)
+            if cur != val or addr in OV5642_VOLATILE_REGS:
+                diff.append(reg_value[i])
+                diff.append(reg_value[i + 1])
+                diff.append(val)
+                pending[addr] = val
+        if diff:
+            self.wrSensorRegs16_8(diff)
+        return len(diff) // 3
+
+    def set_resolution(self, size):
+        """
+        Switch the OV5642 JPEG output to `size` (an OV5642_* constant),
+        writing only the window registers that change. Returns the number
+        of registers written, or None if there is no table for `size`.
+        """
+        name = OV5642_JPEG_TABLES.get(size)
+        if name is None:
+            return None
+        written = self.apply_profile(load_regs(name))
+        self.resolution = size
+        gc.collect()
+        return written
+
+    def set_jpeg_qscale(self, qscale):
+        """Set the OV5642 JPEG quantization scale (1-63) if it changed."""
+        qscale = max(1, min(63, int(qscale)))
+        if self.shadow_value(OV5642_JPEG_QSCALE) == qscale:
+            return False
+        self.wrSensorReg16_8(OV5642_JPEG_QSCALE, qscale)
+        return True
             
     def set_format(self,mode):
         if mode==BMP or mode==JPEG or mode==RAW:   
@@ -442,6 +643,12 @@ class ArducamClass(object):
         else:
             self.wrSensorRegs8_8(OV2640_320x240_JPEG)
       
+    def OV5642_set_JPEG_size(self,size):
+        if size not in OV5642_JPEG_TABLES:
+            size = OV5642_320x240
+        self.wrSensorRegs16_8(load_regs(OV5642_JPEG_TABLES[size]))
+        self.resolution = size
+        gc.collect()
       
     def OV2640_set_Light_Mode(self,result):
         if result==Auto:
@@ -693,9 +900,14 @@ class ArducamClass(object):
         self.set_format(JPEG)
         
     def set_framesize(self, size_str):
+        key = str(size_str).strip().upper()
+        if self.CameraType == OV5642:
+            if key not in OV5642_FRAMESIZES:
+                print("Unknown OV5642 frame size:", size_str)
+                return None
+            return self.set_resolution(OV5642_FRAMESIZES[key])
         if self.CameraType != OV2640:
             return
-        key = str(size_str).strip().upper()
         size_map = {
             "QQVGA": OV2640_160x120,
             "QCIF": OV2640_176x144,
@@ -714,6 +926,23 @@ class ArducamClass(object):
             self.max_jpeg_size = None
         elif max_size > 0:
             self.max_jpeg_size = int(max_size)
+        if self.jpeg_buf is not None:
+            self.jpeg_buf = None
+            self.use_frame_buffer()
+
+    def use_frame_buffer(self, enable=True):
+        """
+        Keep one buffer of max_jpeg_size bytes for every frame. read_jpeg()
+        then returns a memoryview of the JPEG inside it instead of allocating,
+        so the heap does not fragment during long streams. The view is only
+        valid until the next read_jpeg().
+        """
+        if enable and self.max_jpeg_size:
+            if self.jpeg_buf is None or len(self.jpeg_buf) != self.max_jpeg_size:
+                self.jpeg_buf = None
+                self.jpeg_buf = bytearray(self.max_jpeg_size)
+        else:
+            self.jpeg_buf = None
             
     def capture(self):
         self.flush_fifo()
@@ -734,6 +963,19 @@ class ArducamClass(object):
         if max_size is not None and length > max_size:
             print("JPEG length too large for configured limit:", length, ">", max_size)
             return b""
+        buf = self.jpeg_buf
+        if buf is not None:
+            if length > len(buf):
+                print("JPEG length too large for frame buffer:", length, ">", len(buf))
+                return b""
+            self.set_fifo_burst()
+            self.spi_readinto(buf, end=length)
+            self.SPI_CS_HIGH()
+            start = buf.find(b'\xff\xd8', 0, length)
+            end = buf.find(b'\xff\xd9', start, length)
+            if start != -1 and end != -1:
+                return memoryview(buf)[start:end+2]
+            return b""
         self.set_fifo_burst()
         try:
             buf = bytearray(length)
@@ -749,5 +991,67 @@ class ArducamClass(object):
             return bytes(buf[start:end+2])
         return b""
 
+    def read_jpeg_blocks(self, buf, *, start=0, end=None):
+        """
+        Stream the captured JPEG out of the FIFO in fixed-size blocks.
+
+        Generator. Bursts the FIFO straight into buf[start:end] and yields
+        the number of valid bytes each time that region holds the next
+        block: the first block starts at SOI and every block is full except
+        the last, which ends at EOI. self.block_last is True while the last
+        block is yielded. Consume the block before resuming; RAM use is the
+        block size whatever the frame size. Stops without a last block if
+        the FIFO runs out before EOI.
+        """
+        self.block_last = False
+        length = self.read_fifo_length()
+        if length == 0 or length == MAX_FIFO_SIZE:
+            return
+        if end is None:
+            end = len(buf)
+        mv = memoryview(buf)
+        fill = start            # next write position in buf
+        found = False           # SOI seen
+        prev_ff = False         # previous block ended with 0xFF
+        self.set_fifo_burst()
+        try:
+            while length:
+                n = min(end - fill, length)
+                self.spi.readinto(mv[fill:fill + n])
+                length -= n
+                new = fill
+                fill += n
+                if not found:
+                    i = buf.find(b'\xff\xd8', start, fill)
+                    if i < 0:
+                        # keep a trailing 0xFF in case SOI straddles two reads
+                        last = buf[fill - 1]
+                        fill = start
+                        if last == 0xFF:
+                            buf[start] = 0xFF
+                            fill = start + 1
+                        continue
+                    if i > start:
+                        buf[start:start + fill - i] = buf[i:fill]
+                        fill -= i - start
+                    found = True
+                    new = start + 2
+                if prev_ff and new == start and buf[start] == 0xD9:
+                    eoi = start + 1      # EOI straddles two blocks
+                else:
+                    eoi = buf.find(b'\xff\xd9', max(new - 1, start), fill)
+                    if eoi >= 0:
+                        eoi += 2
+                if eoi >= 0:
+                    self.block_last = True
+                    yield eoi - start
+                    return
+                if fill == end:
+                    prev_ff = buf[end - 1] == 0xFF
+                    yield end - start
+                    fill = start
+        finally:
+            self.SPI_CS_HIGH()
+
 # Alias for compatibility
 Arducam = ArducamClass
@@ -0,0 +1,58 @@
+"""
+XOR parity for the chunked frame sender.
+
+XorParity accumulates the XOR of up to `group` consecutive chunk payloads
+in one preallocated packet buffer; the receiver can rebuild any single
+chunk of the group from the parity and the others. Chunk lengths are
+XORed too, so a short last chunk is rebuilt at its true length.
+
+On MicroPython xor_into() is compiled with the viper emitter (the ESP32
+ports have it). On CPython it falls back to the plain byte loop a
+bytecode-only build would run, which is what bench/bench_fec.py times.
+"""
+
+try:
+    import micropython
+
+    @micropython.viper
+    def xor_into(dst: ptr8, src: ptr8, n: int):
+        i = 0
+        while i < n:
+            dst[i] = dst[i] ^ src[i]
+            i += 1
+except ImportError:
+    def xor_into(dst, src, n):
+        for i in range(n):
+            dst[i] ^= src[i]
+
+
+class XorParity:
+    def __init__(self, group, max_payload, hdr_size):
+        self.group = group
+        self.hdr_size = hdr_size
+        self.pkt = bytearray(hdr_size + max_payload)
+        self.payload = memoryview(self.pkt)[hdr_size:]
+        self.reset(0)
+
+    def reset(self, first):
+        """Start a new group whose first chunk is `first`."""
+        self.first = first
+        self.count = 0
+        self.len_xor = 0
+        self.size = 0
+
+    def add(self, data):
+        """Fold in the next chunk's payload (never longer than the group's first)."""
+        n = len(data)
+        if self.count == 0:
+            self.payload[:n] = data  # the first chunk is the longest: no zeroing needed
+            self.size = n
+        else:
+            xor_into(self.payload, data, n)
+        self.len_xor ^= n
+        self.count += 1
+        return self.count == self.group
+
+    def packet(self):
+        """The parity packet buffer; header at [:hdr_size], parity after it."""
+        return memoryview(self.pkt)[:self.hdr_size + self.size]
@@ -0,0 +1,93 @@
+"""
+Motion gate for the camera stream.
+
+MotionGate decides, from the JPEG size of each captured frame alone,
+whether to send it. The size of a JPEG tracks how much detail the scene
+holds, so it barely moves while nothing happens (sensor noise only) and
+jumps when something enters, leaves or moves across a textured
+background. The camera reads the size from the FIFO length register
+before reading the frame out, so a frame that is not sent costs neither
+SPI readout nor airtime.
+
+While the scene is static only one frame every `keepalive_ms` goes out,
+so the viewer keeps a current picture; any change sends every frame
+again until nothing has changed for `hold_ms`. Sizes are smoothed over a
+few frames and compared with the size of the static scene, which
+follows slow drift (light) while nothing moves. A change is a
+difference of more than `threshold_pct` percent or NOISE_K times the
+mean frame-to-frame jitter, whichever is larger; the jitter is sensor
+noise, which something moving through the scene hardly adds to. While there
+is a change the static size only creeps towards the new one, so
+something moving across the frame stays a change for its whole way but
+an object that stops and stays becomes part of the scene after a while.
+
+Time comes from time.ticks_ms() only, which mpstubs' virtual clock
+provides, so bench/bench_motion_gate.py replays JPEG sequences through
+this class at any frame rate.
+"""
+import time
+
+LEVEL_ALPHA = 1 / 4    # EMA weight of the newest frame size
+BASE_ALPHA = 1 / 32    # EMA weight of the level in the static scene size
+BASE_CREEP = 1 / 64    # the same during a change, so a parked object fades in
+NOISE_ALPHA = 1 / 16   # EMA weight of the newest frame-to-frame size jitter
+NOISE_K = 1.5          # jitter multiple that counts as a change
+
+
+class MotionGate:
+    def __init__(self, threshold_pct, hold_ms, keepalive_ms):
+        self.threshold = threshold_pct / 100
+        self.hold_ms = hold_ms
+        self.keepalive_ms = keepalive_ms
+        self.enabled = True
+        self.skipped = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the scene, e.g. after a resolution or quality change."""
+        self.prev = 0
+        self.level = 0.0
+        self.base = 0.0
+        self.noise = 0.0
+        self.active = True
+        self.last_motion = time.ticks_ms()
+        self.last_sent = self.last_motion
+
+    def wake(self):
+        """Send every frame for the next hold_ms, e.g. on an external trigger."""
+        self.active = True
+        self.last_motion = time.ticks_ms()
+
+    def observe(self, size):
+        """
+        Account one captured frame of `size` bytes. Returns True if it
+        should be sent.
+        """
+        now = time.ticks_ms()
+        if not self.enabled or size <= 0:
+            self.last_sent = now
+            return True
+        if not self.prev:
+            self.prev = size
+            self.level = self.base = float(size)
+            self.wake()
+            self.last_sent = now
+            return True
+
+        self.noise += NOISE_ALPHA * (abs(size - self.prev) - self.noise)
+        self.prev = size
+        self.level += LEVEL_ALPHA * (size - self.level)
+        if abs(self.level - self.base) > max(self.base * self.threshold, NOISE_K * self.noise):
+            self.active = True
+            self.last_motion = now
+            self.base += BASE_CREEP * (self.level - self.base)
+        else:
+            self.base += BASE_ALPHA * (self.level - self.base)
+
+        if self.active and time.ticks_diff(now, self.last_motion) > self.hold_ms:
+            self.active = False
+        if self.active or time.ticks_diff(now, self.last_sent) >= self.keepalive_ms:
+            self.last_sent = now
+            return True
+        self.skipped += 1
+        return False
@@ -0,0 +1,2 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# One module per OV5642 register table; see Arducam.load_regs().
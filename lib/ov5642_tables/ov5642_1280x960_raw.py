@@ -0,0 +1,38 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# OV5642_1280x960_RAW: 271 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x31\x03\x93\x30\x08\x02\x30\x17\x7f\x30\x18\xf0\x36\x15\xf0\x30\x00\xf8\x30\x01\x48\x30\x02\x5c"
+    b"\x30\x03\x02\x30\x05\xb7\x30\x06\x43\x30\x07\x37\x30\x0f\x06\x30\x11\x08\x30\x10\x20\x30\x12\x00"
+    b"\x46\x0c\x22\x38\x15\x04\x37\x0c\xa0\x36\x02\xfc\x36\x12\xff\x36\x34\xc0\x36\x13\x00\x36\x22\x00"
+    b"\x36\x03\x27\x40\x00\x21\x40\x1d\x02\x36\x00\x54\x36\x05\x04\x36\x06\x3f\x50\x20\x04\x51\x97\x01"
+    b"\x50\x01\xff\x55\x00\x10\x55\x02\x00\x55\x03\x04\x55\x04\x00\x55\x05\x7f\x50\x80\x08\x30\x0e\x18"
+    b"\x46\x10\x00\x47\x1d\x05\x47\x08\x06\x37\x10\x10\x36\x32\x41\x36\x31\x01\x50\x1f\x03\x36\x04\x40"
+    b"\x43\x00\x00\x38\x24\x11\x50\x00\x4f\x38\x18\xc1\x37\x05\xdb\x37\x0a\x81\x36\x21\xc7\x38\x00\x03"
+    b"\x38\x01\xe8\x38\x02\x03\x38\x03\xe8\x38\x04\x38\x38\x05\x00\x38\x06\x03\x38\x07\xc0\x38\x08\x05"
+    b"\x38\x09\x00\x38\x0a\x03\x38\x0b\xc0\x38\x0c\x0a\x38\x0d\xf0\x38\x0e\x03\x38\x0f\xe8\x38\x27\x08"
+    b"\x38\x10\xc0\x56\x83\x00\x56\x86\x03\x56\x87\xc0\x3a\x1a\x04\x3a\x13\x30\x30\x04\xdf\x35\x0c\x07"
+    b"\x35\x0d\xd0\x35\x00\x35\x35\x01\x00\x35\x02\x00\x35\x0a\x00\x35\x0b\x00\x35\x03\x00\x56\x82\x05"
+    b"\x3a\x0f\x78\x3a\x11\xd0\x3a\x1b\x7a\x3a\x1e\x66\x3a\x1f\x40\x3a\x10\x68\x30\x30\x0b\x3a\x01\x04"
+    b"\x3a\x02\x00\x3a\x03\x78\x3a\x04\x00\x3a\x05\x30\x3a\x14\x00\x3a\x15\x64\x3a\x16\x00\x3a\x17\x89"
+    b"\x3a\x18\x00\x3a\x19\x70\x3a\x00\x78\x3a\x08\x12\x3a\x09\xc0\x3a\x0a\x0f\x3a\x0b\xa0\x3a\x0d\x04"
+    b"\x3a\x0e\x03\x3c\x00\x04\x3c\x01\xb4\x56\x88\xfd\x56\x89\xdf\x56\x8a\xfe\x56\x8b\xef\x56\x8c\xfe"
+    b"\x56\x8d\xef\x56\x8e\xaa\x56\x8f\xaa\x58\x9b\x04\x58\x9a\xc5\x52\x8a\x00\x52\x8b\x02\x52\x8c\x08"
+    b"\x52\x8d\x10\x52\x8e\x20\x52\x8f\x28\x52\x90\x30\x52\x92\x00\x52\x93\x00\x52\x94\x00\x52\x95\x02"
+    b"\x52\x96\x00\x52\x97\x08\x52\x98\x00\x52\x99\x10\x52\x9a\x00\x52\x9b\x20\x52\x9c\x00\x52\x9d\x28"
+    b"\x52\x9e\x00\x52\x82\x00\x52\x9f\x30\x53\x00\x00\x53\x02\x00\x53\x03\x7c\x53\x0c\x00\x53\x0d\x0c"
+    b"\x53\x0e\x20\x53\x0f\x80\x53\x10\x20\x53\x11\x80\x53\x08\x20\x53\x09\x40\x53\x04\x00\x53\x05\x30"
+    b"\x53\x06\x00\x53\x07\x80\x53\x14\x08\x53\x15\x20\x53\x19\x30\x53\x16\x10\x53\x17\x08\x53\x18\x02"
+    b"\x53\x80\x01\x53\x81\x20\x53\x82\x00\x53\x83\x4e\x53\x84\x00\x53\x85\x0f\x53\x86\x00\x53\x87\x00"
+    b"\x53\x88\x01\x53\x89\x15\x53\x8a\x00\x53\x8b\x31\x53\x8c\x00\x53\x8d\x00\x53\x8e\x00\x53\x8f\x0f"
+    b"\x53\x90\x00\x53\x91\xab\x53\x92\x00\x53\x93\xa2\x53\x94\x08\x53\x01\x20\x54\x80\x14\x54\x82\x03"
+    b"\x54\x83\x57\x54\x84\x65\x54\x85\x71\x54\x81\x21\x54\x86\x7d\x54\x87\x87\x54\x88\x91\x54\x89\x9a"
+    b"\x54\x8a\xaa\x54\x8b\xb8\x54\x8c\xcd\x54\x8d\xdd\x54\x8e\xea\x54\x8f\x10\x54\x90\x05\x54\x91\x00"
+    b"\x54\x92\x04\x54\x93\x20\x54\x94\x03\x54\x95\x60\x54\x96\x02\x54\x97\xb8\x54\x98\x02\x54\x99\x86"
+    b"\x54\x9a\x02\x54\x9b\x5b\x54\x9c\x02\x54\x9d\x3b\x54\x9e\x02\x54\x9f\x1c\x54\xa0\x02\x54\xa1\x04"
+    b"\x54\xa2\x01\x54\xa3\xed\x54\xa4\x01\x54\xa5\xc5\x54\xa6\x01\x54\xa7\xa5\x54\xa8\x01\x54\xa9\x6c"
+    b"\x54\xaa\x01\x54\xab\x41\x54\xac\x01\x54\xad\x20\x54\xae\x00\x54\xaf\x16\x34\x06\x00\x51\x92\x04"
+    b"\x51\x91\xf8\x51\x93\x70\x51\x94\xf0\x51\x95\xf0\x51\x8d\x3d\x51\x8f\x54\x51\x8e\x3d\x51\x90\x54"
+    b"\x51\x8b\xc0\x51\x8c\xbd\x51\x87\x18\x51\x88\x18\x51\x89\x6e\x51\x8a\x68\x51\x86\x1c\x51\x81\x50"
+    b"\x51\x82\x11\x51\x83\x14\x51\x84\x25\x51\x85\x24\x50\x25\x82\x55\x83\x40\x55\x84\x40\x55\x80\x02"
+    b"\x36\x33\x07\x37\x02\x10\x37\x03\xb2\x37\x04\x18\x37\x0b\x40\x37\x0d\x02\x36\x20\x52"
+)
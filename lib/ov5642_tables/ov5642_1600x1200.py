@@ -0,0 +1,8 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# ov5642_1600x1200: 25 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x38\x00\x01\x38\x01\xb0\x38\x02\x00\x38\x03\x0a\x38\x04\x0a\x38\x05\x20\x38\x06\x07\x38\x07\x98"
+    b"\x38\x08\x06\x38\x09\x40\x38\x0a\x04\x38\x0b\xb0\x38\x0c\x0c\x38\x0d\x80\x38\x0e\x07\x38\x0f\xd0"
+    b"\x50\x01\x7f\x56\x80\x00\x56\x81\x00\x56\x82\x0a\x56\x83\x20\x56\x84\x00\x56\x85\x00\x56\x86\x07"
+    b"\x56\x87\x98"
+)
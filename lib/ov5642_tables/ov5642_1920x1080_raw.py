@@ -0,0 +1,5 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# OV5642_1920x1080_RAW: 4 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x38\x08\x07\x38\x09\x80\x38\x0a\x04\x38\x0b\x38"
+)
@@ -0,0 +1,12 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# ov5642_2048x1536: 57 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x38\x00\x01\x38\x01\xb0\x38\x02\x00\x38\x03\x0a\x38\x04\x0a\x38\x05\x20\x38\x06\x07\x38\x07\x98"
+    b"\x38\x08\x08\x38\x09\x00\x38\x0a\x06\x38\x0b\x00\x38\x0c\x0c\x38\x0d\x80\x38\x0e\x07\x38\x0f\xd0"
+    b"\x38\x10\xc2\x38\x15\x44\x38\x18\xa8\x38\x24\x01\x38\x27\x0a\x3a\x00\x78\x3a\x0d\x10\x3a\x0e\x0d"
+    b"\x3a\x00\x78\x46\x0b\x35\x47\x1d\x00\x47\x1c\x50\x56\x82\x0a\x56\x83\x20\x56\x86\x07\x56\x87\x98"
+    b"\x58\x9b\x00\x58\x9a\xc0\x58\x9b\x00\x58\x9a\xc0\x30\x02\x0c\x30\x02\x00\x43\x00\x32\x46\x0b\x35"
+    b"\x30\x02\x0c\x30\x02\x00\x47\x13\x02\x46\x00\x80\x47\x21\x02\x47\x1c\x40\x44\x08\x00\x46\x0c\x22"
+    b"\x38\x15\x04\x38\x18\xc8\x50\x1f\x00\x50\x02\xe0\x44\x0a\x01\x44\x02\x90\x38\x11\xf0\x38\x18\xa8"
+    b"\x36\x21\x10"
+)
@@ -0,0 +1,5 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# OV5642_640x480_RAW: 4 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x38\x08\x02\x38\x09\x80\x38\x0a\x01\x38\x0b\xe0"
+)
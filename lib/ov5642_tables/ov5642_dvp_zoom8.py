@@ -0,0 +1,8 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# ov5642_dvp_zoom8: 25 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x38\x00\x05\x38\x01\xf8\x38\x02\x03\x38\x03\x5c\x38\x04\x01\x38\x05\x44\x38\x06\x00\x38\x07\xf0"
+    b"\x38\x08\x01\x38\x09\x40\x38\x0a\x00\x38\x0b\xf0\x38\x0c\x0c\x38\x0d\x80\x38\x0e\x07\x38\x0f\xd0"
+    b"\x50\x01\x7f\x56\x80\x00\x56\x81\x00\x56\x82\x01\x56\x83\x44\x56\x84\x00\x56\x85\x00\x56\x86\x00"
+    b"\x56\x87\xf3"
+)
@@ -0,0 +1,13 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# OV5642_JPEG_Capture_QSXGA: 71 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x35\x03\x07\x30\x00\x00\x30\x01\x00\x30\x02\x00\x30\x03\x00\x30\x05\xff\x30\x06\xff\x30\x07\x3f"
+    b"\x35\x0c\x07\x35\x0d\xd0\x36\x02\xe4\x36\x12\xac\x36\x13\x44\x36\x21\x27\x36\x22\x08\x36\x23\x22"
+    b"\x36\x04\x60\x37\x05\xda\x37\x0a\x80\x38\x01\x8a\x38\x03\x0a\x38\x04\x0a\x38\x05\x20\x38\x06\x07"
+    b"\x38\x07\x98\x38\x08\x0a\x38\x09\x20\x38\x0a\x07\x38\x0b\x98\x38\x0c\x0c\x38\x0d\x80\x38\x0e\x07"
+    b"\x38\x0f\xd0\x38\x10\xc2\x38\x15\x44\x38\x18\xc8\x38\x24\x01\x38\x27\x0a\x3a\x00\x78\x3a\x0d\x10"
+    b"\x3a\x0e\x0d\x3a\x10\x32\x3a\x1b\x3c\x3a\x1e\x32\x3a\x11\x80\x3a\x1f\x20\x3a\x00\x78\x46\x0b\x35"
+    b"\x47\x1d\x00\x47\x13\x03\x47\x1c\x50\x56\x82\x0a\x56\x83\x20\x56\x86\x07\x56\x87\x98\x50\x01\x4f"
+    b"\x58\x9b\x00\x58\x9a\xc0\x44\x07\x08\x58\x9b\x00\x58\x9a\xc0\x30\x02\x0c\x30\x02\x00\x35\x03\x00"
+    b"\x50\x25\x80\x3a\x0f\x48\x3a\x10\x40\x3a\x1b\x4a\x3a\x1e\x3e\x3a\x11\x70\x3a\x1f\x20"
+)
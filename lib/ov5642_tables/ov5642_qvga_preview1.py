@@ -0,0 +1,43 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# OV5642_QVGA_Preview1: 308 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x31\x03\x93\x30\x08\x82\x30\x17\x7f\x30\x18\xfc\x38\x10\xc2\x36\x15\xf0\x30\x00\x00\x30\x01\x00"
+    b"\x30\x02\x5c\x30\x03\x00\x30\x04\xff\x30\x05\xff\x30\x06\x43\x30\x07\x37\x30\x11\x08\x30\x10\x10"
+    b"\x46\x0c\x22\x38\x15\x04\x37\x0c\xa0\x36\x02\xfc\x36\x12\xff\x36\x34\xc0\x36\x13\x00\x36\x05\x7c"
+    b"\x36\x21\x09\x36\x22\x60\x36\x04\x40\x36\x03\xa7\x36\x03\x27\x40\x00\x21\x40\x1d\x22\x36\x00\x54"
+    b"\x36\x05\x04\x36\x06\x3f\x3c\x01\x80\x50\x00\x4f\x50\x20\x04\x51\x81\x79\x51\x82\x00\x51\x85\x22"
+    b"\x51\x97\x01\x50\x01\xff\x55\x00\x0a\x55\x04\x00\x55\x05\x7f\x50\x80\x08\x30\x0e\x18\x46\x10\x00"
+    b"\x47\x1d\x05\x47\x08\x06\x38\x08\x02\x38\x09\x80\x38\x0a\x01\x38\x0b\xe0\x38\x0e\x07\x38\x0f\xd0"
+    b"\x50\x1f\x00\x50\x00\x4f\x43\x00\x30\x35\x03\x07\x35\x01\x73\x35\x02\x80\x35\x0b\x00\x35\x03\x07"
+    b"\x38\x24\x11\x35\x01\x1e\x35\x02\x80\x35\x0b\x7f\x38\x0c\x0c\x38\x0d\x80\x38\x0e\x03\x38\x0f\xe8"
+    b"\x3a\x0d\x04\x3a\x0e\x03\x38\x18\xc1\x37\x05\xdb\x37\x0a\x81\x38\x01\x80\x36\x21\x87\x38\x01\x50"
+    b"\x38\x03\x08\x38\x27\x08\x38\x10\x40\x38\x04\x05\x38\x05\x00\x56\x82\x05\x56\x83\x00\x38\x06\x03"
+    b"\x38\x07\xc0\x56\x86\x03\x56\x87\xbc\x3a\x00\x78\x3a\x1a\x05\x3a\x13\x30\x3a\x18\x00\x3a\x19\x7c"
+    b"\x3a\x08\x12\x3a\x09\xc0\x3a\x0a\x0f\x3a\x0b\xa0\x35\x0c\x07\x35\x0d\xd0\x35\x00\x00\x35\x01\x00"
+    b"\x35\x02\x00\x35\x0a\x00\x35\x0b\x00\x35\x03\x00\x52\x8a\x02\x52\x8b\x04\x52\x8c\x08\x52\x8d\x08"
+    b"\x52\x8e\x08\x52\x8f\x10\x52\x90\x10\x52\x92\x00\x52\x93\x02\x52\x94\x00\x52\x95\x02\x52\x96\x00"
+    b"\x52\x97\x02\x52\x98\x00\x52\x99\x02\x52\x9a\x00\x52\x9b\x02\x52\x9c\x00\x52\x9d\x02\x52\x9e\x00"
+    b"\x52\x9f\x02\x30\x30\x0b\x3a\x02\x00\x3a\x03\x7d\x3a\x04\x00\x3a\x14\x00\x3a\x15\x7d\x3a\x16\x00"
+    b"\x3a\x00\x78\x3a\x08\x09\x3a\x09\x60\x3a\x0a\x07\x3a\x0b\xd0\x3a\x0d\x08\x3a\x0e\x06\x51\x93\x70"
+    b"\x58\x9b\x04\x58\x9a\xc5\x40\x1e\x20\x40\x01\x42\x40\x1c\x04\x52\x8a\x01\x52\x8b\x04\x52\x8c\x08"
+    b"\x52\x8d\x10\x52\x8e\x20\x52\x8f\x28\x52\x90\x30\x52\x92\x00\x52\x93\x01\x52\x94\x00\x52\x95\x04"
+    b"\x52\x96\x00\x52\x97\x08\x52\x98\x00\x52\x99\x10\x52\x9a\x00\x52\x9b\x20\x52\x9c\x00\x52\x9d\x28"
+    b"\x52\x9e\x00\x52\x9f\x30\x52\x82\x00\x53\x00\x00\x53\x01\x20\x53\x02\x00\x53\x03\x7c\x53\x0c\x00"
+    b"\x53\x0d\x0c\x53\x0e\x20\x53\x0f\x80\x53\x10\x20\x53\x11\x80\x53\x08\x20\x53\x09\x40\x53\x04\x00"
+    b"\x53\x05\x30\x53\x06\x00\x53\x07\x80\x53\x14\x08\x53\x15\x20\x53\x19\x30\x53\x16\x10\x53\x17\x00"
+    b"\x53\x18\x02\x54\x02\x3f\x54\x03\x00\x34\x06\x00\x51\x80\xff\x51\x81\x52\x51\x82\x11\x51\x83\x14"
+    b"\x51\x84\x25\x51\x85\x24\x51\x86\x06\x51\x87\x08\x51\x88\x08\x51\x89\x7c\x51\x8a\x60\x51\x8b\xb2"
+    b"\x51\x8c\xb2\x51\x8d\x44\x51\x8e\x3d\x51\x8f\x58\x51\x90\x46\x51\x91\xf8\x51\x92\x04\x51\x93\x70"
+    b"\x51\x94\xf0\x51\x95\xf0\x51\x96\x03\x51\x97\x01\x51\x98\x04\x51\x99\x12\x51\x9a\x04\x51\x9b\x00"
+    b"\x51\x9c\x06\x51\x9d\x82\x51\x9e\x00\x50\x25\x80\x55\x83\x40\x55\x84\x40\x55\x80\x02\x50\x00\xcf"
+    b"\x37\x10\x10\x36\x32\x51\x37\x02\x10\x37\x03\xb2\x37\x04\x18\x37\x0b\x40\x37\x0d\x03\x36\x31\x01"
+    b"\x36\x32\x52\x36\x06\x24\x36\x20\x96\x57\x85\x07\x3a\x13\x30\x36\x00\x52\x36\x04\x48\x36\x06\x1b"
+    b"\x37\x0d\x0b\x37\x0f\xc0\x37\x09\x01\x38\x23\x00\x50\x07\x00\x50\x09\x00\x50\x11\x00\x50\x13\x00"
+    b"\x51\x9e\x00\x50\x86\x00\x50\x87\x00\x50\x88\x00\x50\x89\x00\x30\x2b\x00\x38\x08\x01\x38\x09\x40"
+    b"\x38\x0a\x00\x38\x0b\xf0\x3a\x00\x78\x50\x01\xff\x55\x83\x50\x55\x84\x50\x55\x80\x02\x3c\x01\x80"
+    b"\x3c\x00\x04\x58\x00\x48\x58\x01\x31\x58\x02\x21\x58\x03\x1b\x58\x04\x1a\x58\x05\x1e\x58\x06\x29"
+    b"\x58\x07\x38\x58\x08\x26\x58\x09\x17\x58\x0a\x11\x58\x0b\x0e\x58\x0c\x0d\x58\x0d\x0e\x58\x0e\x13"
+    b"\x58\x0f\x1a\x58\x10\x15\x58\x11\x0d\x58\x12\x08\x58\x13\x05\x58\x14\x04\x58\x15\x05\x58\x16\x09"
+    b"\x58\x17\x0d\x58\x18\x11\x58\x19\x0a\x58\x1a\x04\x58\x1b\x00\x58\x1c\x00\x58\x1d\x01\x58\x1e\x06"
+    b"\x58\x1f\x09\x58\x20\x12\x58\x21\x0b\x58\x22\x04"
+)
@@ -0,0 +1,39 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# OV5642_QVGA_Preview2: 275 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x58\x23\x00\x58\x24\x00\x58\x25\x01\x58\x26\x06\x58\x27\x0a\x58\x28\x17\x58\x29\x0f\x58\x2a\x09"
+    b"\x58\x2b\x06\x58\x2c\x05\x58\x2d\x06\x58\x2e\x0a\x58\x2f\x0e\x58\x30\x28\x58\x31\x1a\x58\x32\x11"
+    b"\x58\x33\x0e\x58\x34\x0e\x58\x35\x0f\x58\x36\x15\x58\x37\x1d\x58\x38\x6e\x58\x39\x39\x58\x3a\x27"
+    b"\x58\x3b\x1f\x58\x3c\x1e\x58\x3d\x23\x58\x3e\x2f\x58\x3f\x41\x58\x40\x0e\x58\x41\x0c\x58\x42\x0d"
+    b"\x58\x43\x0c\x58\x44\x0c\x58\x45\x0c\x58\x46\x0c\x58\x47\x0c\x58\x48\x0d\x58\x49\x0e\x58\x4a\x0e"
+    b"\x58\x4b\x0a\x58\x4c\x0e\x58\x4d\x0e\x58\x4e\x10\x58\x4f\x10\x58\x50\x11\x58\x51\x0a\x58\x52\x0f"
+    b"\x58\x53\x0e\x58\x54\x10\x58\x55\x10\x58\x56\x10\x58\x57\x0a\x58\x58\x0e\x58\x59\x0e\x58\x5a\x0f"
+    b"\x58\x5b\x0f\x58\x5c\x0f\x58\x5d\x0a\x58\x5e\x09\x58\x5f\x0d\x58\x60\x0c\x58\x61\x0b\x58\x62\x0d"
+    b"\x58\x63\x07\x58\x64\x17\x58\x65\x14\x58\x66\x18\x58\x67\x18\x58\x68\x16\x58\x69\x12\x58\x6a\x1b"
+    b"\x58\x6b\x1a\x58\x6c\x16\x58\x6d\x16\x58\x6e\x18\x58\x6f\x1f\x58\x70\x1c\x58\x71\x16\x58\x72\x10"
+    b"\x58\x73\x0f\x58\x74\x13\x58\x75\x1c\x58\x76\x1e\x58\x77\x17\x58\x78\x11\x58\x79\x11\x58\x7a\x14"
+    b"\x58\x7b\x1e\x58\x7c\x1c\x58\x7d\x1c\x58\x7e\x1a\x58\x7f\x1a\x58\x80\x1b\x58\x81\x1f\x58\x82\x14"
+    b"\x58\x83\x1a\x58\x84\x1d\x58\x85\x1e\x58\x86\x1a\x58\x87\x1a\x51\x80\xff\x51\x81\x52\x51\x82\x11"
+    b"\x51\x83\x14\x51\x84\x25\x51\x85\x24\x51\x86\x14\x51\x87\x14\x51\x88\x14\x51\x89\x69\x51\x8a\x60"
+    b"\x51\x8b\xa2\x51\x8c\x9c\x51\x8d\x36\x51\x8e\x34\x51\x8f\x54\x51\x90\x4c\x51\x91\xf8\x51\x92\x04"
+    b"\x51\x93\x70\x51\x94\xf0\x51\x95\xf0\x51\x96\x03\x51\x97\x01\x51\x98\x05\x51\x99\x2f\x51\x9a\x04"
+    b"\x51\x9b\x00\x51\x9c\x06\x51\x9d\xa0\x51\x9e\xa0\x52\x8a\x00\x52\x8b\x01\x52\x8c\x04\x52\x8d\x08"
+    b"\x52\x8e\x10\x52\x8f\x20\x52\x90\x30\x52\x92\x00\x52\x93\x00\x52\x94\x00\x52\x95\x01\x52\x96\x00"
+    b"\x52\x97\x04\x52\x98\x00\x52\x99\x08\x52\x9a\x00\x52\x9b\x10\x52\x9c\x00\x52\x9d\x20\x52\x9e\x00"
+    b"\x52\x9f\x30\x52\x82\x00\x53\x00\x00\x53\x01\x20\x53\x02\x00\x53\x03\x7c\x53\x0c\x00\x53\x0d\x10"
+    b"\x53\x0e\x20\x53\x0f\x80\x53\x10\x20\x53\x11\x80\x53\x08\x20\x53\x09\x40\x53\x04\x00\x53\x05\x30"
+    b"\x53\x06\x00\x53\x07\x80\x53\x14\x08\x53\x15\x20\x53\x19\x30\x53\x16\x10\x53\x17\x00\x53\x18\x02"
+    b"\x53\x80\x01\x53\x81\x00\x53\x82\x00\x53\x83\x1f\x53\x84\x00\x53\x85\x06\x53\x86\x00\x53\x87\x00"
+    b"\x53\x88\x00\x53\x89\xe1\x53\x8a\x00\x53\x8b\x2b\x53\x8c\x00\x53\x8d\x00\x53\x8e\x00\x53\x8f\x10"
+    b"\x53\x90\x00\x53\x91\xb3\x53\x92\x00\x53\x93\xa6\x53\x94\x08\x54\x80\x0c\x54\x81\x18\x54\x82\x2f"
+    b"\x54\x83\x55\x54\x84\x64\x54\x85\x71\x54\x86\x7d\x54\x87\x87\x54\x88\x91\x54\x89\x9a\x54\x8a\xaa"
+    b"\x54\x8b\xb8\x54\x8c\xcd\x54\x8d\xdd\x54\x8e\xea\x54\x8f\x1d\x54\x90\x05\x54\x91\x00\x54\x92\x04"
+    b"\x54\x93\x20\x54\x94\x03\x54\x95\x60\x54\x96\x02\x54\x97\xb8\x54\x98\x02\x54\x99\x86\x54\x9a\x02"
+    b"\x54\x9b\x5b\x54\x9c\x02\x54\x9d\x3b\x54\x9e\x02\x54\x9f\x1c\x54\xa0\x02\x54\xa1\x04\x54\xa2\x01"
+    b"\x54\xa3\xed\x54\xa4\x01\x54\xa5\xc5\x54\xa6\x01\x54\xa7\xa5\x54\xa8\x01\x54\xa9\x6c\x54\xaa\x01"
+    b"\x54\xab\x41\x54\xac\x01\x54\xad\x20\x54\xae\x00\x54\xaf\x16\x54\xb0\x01\x54\xb1\x20\x54\xb2\x00"
+    b"\x54\xb3\x10\x54\xb4\x00\x54\xb5\xf0\x54\xb6\x00\x54\xb7\xdf\x54\x02\x3f\x54\x03\x00\x55\x00\x10"
+    b"\x55\x02\x00\x55\x03\x06\x55\x04\x00\x55\x05\x7f\x50\x25\x80\x3a\x0f\x30\x3a\x10\x28\x3a\x1b\x30"
+    b"\x3a\x1e\x28\x3a\x11\x61\x3a\x1f\x10\x56\x88\xfd\x56\x89\xdf\x56\x8a\xfe\x56\x8b\xef\x56\x8c\xfe"
+    b"\x56\x8d\xef\x56\x8e\xaa\x56\x8f\xaa"
+)
@@ -0,0 +1,20 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# ov5642_RAW: 122 registers, 3-byte entries (address high, address low, value)
+REGS = (
+    b"\x31\x03\x03\x30\x08\x82\x30\x17\x7f\x30\x18\xfc\x38\x10\xc2\x36\x15\xf0\x30\x00\x00\x30\x01\x00"
+    b"\x30\x02\x00\x30\x03\x00\x30\x11\x08\x30\x10\x30\x36\x04\x60\x36\x22\x08\x36\x21\x17\x37\x09\x00"
+    b"\x40\x00\x21\x40\x1d\x02\x36\x00\x54\x36\x05\x04\x36\x06\x3f\x3c\x01\x80\x30\x0d\x21\x36\x23\x22"
+    b"\x50\x00\xcf\x50\x01\xff\x50\x20\x04\x51\x81\x79\x51\x82\x00\x51\x85\x22\x51\x97\x01\x55\x00\x0a"
+    b"\x55\x04\x00\x55\x05\x7f\x50\x80\x08\x30\x0e\x18\x46\x10\x00\x47\x1d\x05\x47\x08\x06\x37\x10\x10"
+    b"\x37\x0d\x06\x36\x32\x41\x37\x02\x40\x36\x20\x37\x36\x31\x01\x37\x0c\xa0\x38\x08\x0a\x38\x09\x20"
+    b"\x38\x0a\x07\x38\x0b\x98\x38\x0c\x0c\x38\x0d\x80\x38\x0e\x07\x38\x0f\xd0\x50\x00\x06\x50\x1f\x03"
+    b"\x35\x03\x07\x35\x01\x73\x35\x02\x80\x35\x0b\x00\x38\x18\xc0\x36\x21\x27\x38\x01\x8a\x3a\x00\x78"
+    b"\x3a\x1a\x04\x3a\x13\x30\x3a\x18\x00\x3a\x19\x7c\x3a\x08\x12\x3a\x09\xc0\x3a\x0a\x0f\x3a\x0b\xa0"
+    b"\x30\x04\xff\x35\x0c\x07\x35\x0d\xd0\x3a\x0d\x08\x3a\x0e\x06\x35\x00\x00\x35\x01\x00\x35\x02\x00"
+    b"\x35\x0a\x00\x35\x0b\x00\x35\x03\x00\x30\x30\x2b\x3a\x02\x00\x3a\x03\x7d\x3a\x04\x00\x3a\x14\x00"
+    b"\x3a\x15\x7d\x3a\x16\x00\x3a\x00\x78\x3a\x08\x09\x3a\x09\x60\x3a\x0a\x07\x3a\x0b\xd0\x3a\x0d\x10"
+    b"\x3a\x0e\x0d\x36\x20\x57\x37\x03\x98\x37\x04\x1c\x58\x9b\x00\x58\x9a\xc0\x36\x33\x07\x37\x02\x10"
+    b"\x37\x03\xb2\x37\x04\x18\x37\x0b\x40\x37\x0d\x02\x36\x20\x52\x50\x00\x06\x50\x01\xff\x50\x05\x00"
+    b"\x38\x18\x80\x36\x21\x17\x38\x01\xb4\x30\x01\x40\x30\x02\x1c\x38\x10\x00\x38\x18\x00\x46\x0c\x20"
+    b"\x50\x1f\x03\x43\x00\xf8"
+)
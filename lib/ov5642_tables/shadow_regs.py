@@ -0,0 +1,11 @@
+# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit.
+# 52 registers shadowed by ArducamClass, sorted 2-byte addresses (high, low)
+REGS = (
+    b"\x30\x02\x36\x21\x38\x00\x38\x01\x38\x02\x38\x03\x38\x04\x38\x05"
+    b"\x38\x06\x38\x07\x38\x08\x38\x09\x38\x0a\x38\x0b\x38\x0c\x38\x0d"
+    b"\x38\x0e\x38\x0f\x38\x10\x38\x11\x38\x15\x38\x18\x38\x24\x38\x27"
+    b"\x3a\x00\x3a\x0d\x3a\x0e\x43\x00\x44\x02\x44\x07\x44\x08\x44\x0a"
+    b"\x46\x00\x46\x0b\x46\x0c\x47\x13\x47\x1c\x47\x1d\x47\x21\x50\x01"
+    b"\x50\x02\x50\x1f\x56\x80\x56\x81\x56\x82\x56\x83\x56\x84\x56\x85"
+    b"\x56\x86\x56\x87\x58\x9a\x58\x9b"
+)
@@ -0,0 +1,132 @@
+"""
+Adaptive bitrate control for the camera stream.
+
+RateController walks a ladder of (resolution, JPEG qscale) rungs, ordered
+from the smallest frames to the largest, to hold a target fps inside a
+bandwidth budget. It is fed the size and send time of every frame and,
+when the receiver reports it, the chunk loss rate. It steps down quickly
+when the current rung does not fit and up slowly, only when the next
+rung's expected frame size fits with headroom. A rung that has to be
+left again soon after stepping up to it waits twice as long before the
+next attempt.
+
+The controller keeps no clock: it counts frames, so bench/sim_abr.py
+can drive it with modelled frame sizes and send times from link traces.
+"""
+
+ALPHA = 0.2            # EMA weight of the newest frame
+SETTLE_FRAMES = 5      # frames after a switch before judging the new rung
+DOWN_FRAMES = 3        # consecutive overloaded frames before stepping down
+UP_FRAMES = 30         # consecutive frames with room before stepping up
+MAX_UP_FRAMES = 480    # cap on the backed-off wait
+PROBE_FRAMES = 60      # leaving a rung sooner than this counts as a failed probe
+UP_HEADROOM = 0.75     # next rung must fit in this share of the budget
+BUSY_HIGH = 0.85       # share of the frame period spent sending that counts as overload
+LOSS_HIGH = 0.05       # chunk loss that counts as overload
+LOSS_LOW = 0.01        # loss must be below this to step up
+UP_GUESS = 1.8         # frame size growth assumed for a rung not seen yet
+DEFAULT_FPS = 15       # fps to plan for when the stream is unpaced
+
+
+class RateController:
+    def __init__(self, ladder, target_fps, budget_kbps, start=0):
+        self.ladder = ladder
+        self.target_fps = target_fps
+        self.budget = budget_kbps * 125      # bytes per second
+        self.est = [0.0] * len(ladder)       # learned mean frame bytes per rung
+        self.up_wait = [UP_FRAMES] * len(ladder)
+        self.loss = 0.0
+        self.switches = 0
+        self._goto(start)
+
+    @property
+    def size(self):
+        return self.ladder[self.rung][0]
+
+    @property
+    def qscale(self):
+        return self.ladder[self.rung][1]
+
+    def follow(self, size):
+        """Move to the first rung at `size` after a manual resolution change."""
+        for i, rung in enumerate(self.ladder):
+            if rung[0] == size:
+                self._goto(i)
+                return True
+        return False
+
+    def observe_loss(self, fraction):
+        """Chunk loss reported by the receiver, 0.0-1.0."""
+        self.loss += ALPHA * (fraction - self.loss)
+
+    def observe_frame(self, nbytes, send_ms):
+        """
+        Account one sent frame. Returns True if the rung changed; apply
+        self.size and self.qscale to the camera.
+        """
+        if nbytes <= 0:
+            return False
+        if self.frames == 0:
+            self.frame_bytes = float(nbytes)
+            self.send_ms = float(send_ms)
+        else:
+            self.frame_bytes += ALPHA * (nbytes - self.frame_bytes)
+            self.send_ms += ALPHA * (send_ms - self.send_ms)
+        self.frames += 1
+        self.est[self.rung] = self.frame_bytes
+        if self.frames == PROBE_FRAMES and self.rung > 0:
+            self.up_wait[self.rung - 1] = UP_FRAMES  # this rung holds; forget failed probes
+        if self.frames < SETTLE_FRAMES:
+            return False
+
+        fps = self.target_fps or DEFAULT_FPS
+        budget = self.budget
+        busy = self.send_ms * fps / 1000     # share of each frame period spent sending
+        if self.frame_bytes * fps > budget or busy > BUSY_HIGH or self.loss > LOSS_HIGH:
+            self.over += 1
+            self.under = 0
+            if self.over >= DOWN_FRAMES and self.rung > 0:
+                return self._down(fps, budget)
+            return False
+
+        self.over = 0
+        up = self.rung + 1
+        if up >= len(self.ladder) or self.loss >= LOSS_LOW:
+            self.under = 0
+            return False
+        guess = self.est[up] or self.frame_bytes * UP_GUESS
+        growth = guess / self.frame_bytes
+        if guess * fps <= budget * UP_HEADROOM and busy * growth <= BUSY_HIGH * UP_HEADROOM:
+            self.under += 1
+        else:
+            self.under = 0
+        if self.under >= self.up_wait[self.rung]:
+            self._goto(up)
+            self.switches += 1
+            return True
+        return False
+
+    def _down(self, fps, budget):
+        if self.frames < PROBE_FRAMES:
+            # Failed probe: wait longer before trying this rung again.
+            below = self.rung - 1
+            self.up_wait[below] = min(self.up_wait[below] * 2, MAX_UP_FRAMES)
+        # Skip straight past rungs that are not expected to fit either.
+        rung = self.rung - 1
+        per_byte_ms = self.send_ms / self.frame_bytes
+        while rung > 0:
+            guess = self.est[rung] or self.frame_bytes / UP_GUESS ** (self.rung - rung)
+            if guess * fps <= budget and guess * per_byte_ms * fps / 1000 <= BUSY_HIGH:
+                break
+            rung -= 1
+        self._goto(rung)
+        self.switches += 1
+        return True
+
+    def _goto(self, rung):
+        self.rung = rung
+        self.frames = 0
+        self.over = 0
+        self.under = 0
+        self.frame_bytes = 0.0
+        self.send_ms = 0.0
@@ -1,4 +1,5 @@
 from machine import Pin, SPI, I2C
+import gc
 import time
 import socket
 import network
@@ -6,9 +7,13 @@ import ustruct
 import neopixel
 
 from Arducam import (
-    Arducam, JPEG, OV5642,
+    Arducam, JPEG, OV5642, OV5642_320x240, OV5642_640x480,
+    OV5642_1024x768, OV5642_1280x960, OV5642_1600x1200,
     ARDUCHIP_TRIG, CAP_DONE_MASK, ARDUCHIP_TIM
 )
+from rate_control import RateController
+from fec import XorParity
+from motion_gate import MotionGate
 
 # ----------------------------
 # Client/Server Configuration
@@ -35,10 +40,99 @@ I2C_SDA  = 13
 LED_PIN = 38
 led = neopixel.NeoPixel(Pin(LED_PIN), 1)
 
+# ----------------------------
+# Streaming Configuration
+# ----------------------------
+FRAME_SIZE = OV5642_320x240  # any OV5642_* resolution from Arducam.py
+TARGET_FPS = 15           # 0 = as fast as the camera and link allow
+PIPELINED = True          # expose the next frame while sending the previous one
+STREAM_READOUT = False    # send while reading the FIFO; needed for frames larger than RAM
+REUSE_FRAME_BUFFER = True # one preallocated JPEG buffer instead of one per frame
+MAX_JPEG_SIZE = 256 * 1024  # frame buffer size; lower it on boards without PSRAM
+CAPTURE_TIMEOUT_MS = 3000
+
+# Adaptive bitrate: step resolution and JPEG quality to hold TARGET_FPS
+# within RATE_BUDGET_KBPS. FRAME_SIZE picks the starting rung; a FRAME_SIZE
+# (or RES <size>) not on RATE_LADDER is kept as is, with adaptive rate paused.
+ADAPTIVE_RATE = True
+RATE_BUDGET_KBPS = 4000
+RATE_LADDER = (             # (resolution, JPEG qscale), smallest frames first
+    (OV5642_320x240, 0x20),
+    (OV5642_320x240, 0x10),
+    (OV5642_640x480, 0x20),
+    (OV5642_640x480, 0x10),
+    (OV5642_1024x768, 0x20),
+    (OV5642_1024x768, 0x10),
+    (OV5642_1280x960, 0x10),
+    (OV5642_1600x1200, 0x10),
+    (OV5642_1600x1200, 0x08),
+)
+
+# Selective retransmission: keep the last NACK_FRAMES frames sent (in one
+# NACK_RING_SIZE-byte buffer) and resend the chunks the viewer reports
+# missing, up to NACK_DEADLINE_MS after the frame was sent. Buffered modes
+# only (not STREAM_READOUT). NACK_FRAMES = 0 disables it.
+NACK_FRAMES = 4
+NACK_RING_SIZE = 128 * 1024
+NACK_DEADLINE_MS = 200
+
+# Forward error correction: one XOR parity chunk after every FEC_GROUP data
+# chunks (overhead 1/FEC_GROUP), from which the viewer rebuilds one lost
+# chunk per group without a round trip. 0 disables it.
+FEC_GROUP = 0
+
+# Motion gate: while the JPEG size stays flat (nothing moves) send only one
+# frame every MOTION_KEEPALIVE_MS; a size change beyond MOTION_THRESHOLD_PCT
+# (or the scene's own jitter) resumes every frame for MOTION_HOLD_MS.
+# Frames held back are not read out of the FIFO. The viewer can switch it
+# with "MOTION ON" / "MOTION OFF" and force full rate with "WAKE".
+MOTION_GATE = False
+MOTION_THRESHOLD_PCT = 0.5
+MOTION_HOLD_MS = 3000
+MOTION_KEEPALIVE_MS = 1000
+
+# Telemetry: a PKT_STATS report to the viewer this often while streaming; 0 = off
+STATS_INTERVAL_MS = 1000
+
 # ----------------------------
 # Payload Configuration
 # ----------------------------
 MAX_PAYLOAD = 1200  # safe size to avoid UDP fragmentation
+PKT_FRAME_CHUNK = 0x01
+CHUNK_HDR_SIZE = 9  # type + frame_id + chunk_id + total + payload_len
+
+# Receiver feedback from cloud.py, about once a second while streaming:
+# type, seq, frames, chunks, lost chunks, timeouts, assembly ms, display ms
+# (counts since the previous report; 0xFFFF = no latency sample)
+PKT_FEEDBACK = 0x10
+FEEDBACK_FMT = ">BBHHHHHH"
+FEEDBACK_SIZE = ustruct.calcsize(FEEDBACK_FMT)
+
+# NACK from cloud.py: type, frame_id, first missing chunk, then a bitmap in
+# which bit i (byte i // 8, LSB first) set means chunk first + i is missing
+PKT_NACK = 0x11
+NACK_HDR_SIZE = 5
+
+# Parity chunk: type, frame_id, first chunk of the group, total (0 if not yet
+# known), chunks in the group, XOR of their lengths, parity length
+PKT_FEC_PARITY = 0x03
+PARITY_FMT = ">BHHHBHH"
+PARITY_HDR_SIZE = 12
+
+# Stats report to cloud.py (counts and times since the previous report):
+# type, seq, interval ms, frames, capture timeouts, chunks resent, bytes,
+# then total and longest ms per frame for capture wait, FIFO readout and
+# send, rate ladder rung (0xFF = fixed), free heap KB, frames held back by
+# the motion gate, gate state (GATE_*), flags (STATS_*)
+PKT_STATS = 0x04
+STATS_FMT = ">BBHHHHIHHHHHHBHHBB"
+STATS_CAN_RESEND = 0x01  # frames are kept for NACKs; the viewer only NACKs cameras that set it
+STAGE_CAPTURE = 0
+STAGE_READOUT = 1
+STAGE_SEND = 2
+GATE_OFF = 0
+GATE_ACTIVE = 1
+GATE_IDLE = 2
 
 # ----------------------------
 # Helper Function
@@ -103,16 +197,84 @@ def recv_line(sock, max_len=64):
         return "STOP"
     return None
 
-def send_frame_chunks(sock, server_ip, port, jpeg, frame_id):
+# Reused for every chunk so streaming does not allocate per packet.
+_chunk_pkt = bytearray(CHUNK_HDR_SIZE + MAX_PAYLOAD)
+_chunk_mv = memoryview(_chunk_pkt)
+_stats_pkt = bytearray(ustruct.calcsize(STATS_FMT))
+
+def send_chunk(sock, pkt, addr):
+    try:
+        sock.sendto(pkt, addr)
+    except OSError:
+        # lwIP runs out of pbufs when we outpace the radio; back off once.
+        time.sleep_ms(2)
+        sock.sendto(pkt, addr)
+
+def send_chunk_of(sock, addr, mv, frame_id, chunk_id, total):
+    """Send chunk `chunk_id` of the JPEG in memoryview `mv`; returns its payload length."""
+    start = chunk_id * MAX_PAYLOAD
+    n = min(MAX_PAYLOAD, len(mv) - start)
+
+    # type(1)=0x01, frame_id(2), chunk_id(2), total(2), payload_len(2)
+    ustruct.pack_into(">BHHHH", _chunk_pkt, 0, PKT_FRAME_CHUNK, frame_id, chunk_id, total, n)
+    _chunk_pkt[CHUNK_HDR_SIZE:CHUNK_HDR_SIZE + n] = mv[start:start + n]
+    send_chunk(sock, _chunk_mv[:CHUNK_HDR_SIZE + n], addr)
+    return n
+
+def add_parity(sock, addr, parity, frame_id, chunk_id, total, n, last):
+    """Fold the chunk just sent (n bytes) into `parity`; send the parity chunk when its group is done."""
+    if not parity.add(_chunk_mv[CHUNK_HDR_SIZE:CHUNK_HDR_SIZE + n]) and not last:
+        return
+    ustruct.pack_into(PARITY_FMT, parity.pkt, 0, PKT_FEC_PARITY, frame_id, parity.first,
+                      total, parity.count, parity.len_xor, parity.size)
+    send_chunk(sock, parity.packet(), addr)
+    parity.reset(chunk_id + 1)
+
+def send_frame_chunks(sock, server_ip, port, jpeg, frame_id, parity=None):
+    """
+    Send one JPEG as a sequence of chunk packets that each fit in a
+    single unfragmented datagram. Every chunk except the last carries
+    exactly MAX_PAYLOAD bytes, so the receiver can place a chunk at
+    chunk_id * MAX_PAYLOAD without any other bookkeeping. With an
+    XorParity, a parity chunk follows every group of data chunks.
+    """
+    addr = (server_ip, port)
+    mv = memoryview(jpeg)
     total = (len(jpeg) + MAX_PAYLOAD - 1) // MAX_PAYLOAD
+    if parity is not None:
+        parity.reset(0)
     for chunk_id in range(total):
-        start = chunk_id * MAX_PAYLOAD
-        end = min(start + MAX_PAYLOAD, len(jpeg))
-        payload = jpeg[start:end]
+        n = send_chunk_of(sock, addr, mv, frame_id, chunk_id, total)
+        if parity is not None:
+            add_parity(sock, addr, parity, frame_id, chunk_id, total, n, chunk_id == total - 1)
 
-        # type(1)=0x01, frame_id(2), chunk_id(2), total(2), payload_len(2)
-        header = b"\x01" + ustruct.pack(">HHHH", frame_id, chunk_id, total, len(payload))
-        sock.sendto(header + payload, (server_ip, port))
+def send_frame_stream(sock, server_ip, port, cam, frame_id, parity=None):
+    """
+    Send the frame waiting in the camera FIFO while it is read out. Each
+    block is burst from SPI straight into the packet payload and sent, so
+    RAM use is one packet whatever the frame size. The chunk count is only
+    known at EOI: every chunk but the last carries total=0.
+    Returns the JPEG size if the whole frame was sent, else 0.
+    """
+    addr = (server_ip, port)
+    pkt = memoryview(_chunk_pkt)
+    chunk_id = 0
+    size = 0
+    if parity is not None:
+        parity.reset(0)
+    blocks = cam.read_jpeg_blocks(_chunk_pkt, start=CHUNK_HDR_SIZE)
+    try:
+        for n in blocks:
+            total = chunk_id + 1 if cam.block_last else 0
+            ustruct.pack_into(">BHHHH", _chunk_pkt, 0, PKT_FRAME_CHUNK, frame_id, chunk_id, total, n)
+            send_chunk(sock, pkt[:CHUNK_HDR_SIZE + n], addr)
+            if parity is not None:
+                add_parity(sock, addr, parity, frame_id, chunk_id, total, n, cam.block_last)
+            chunk_id += 1
+            size += n
+    finally:
+        blocks.close()  # releases the SPI bus if a send failed
+    return size if cam.block_last else 0
 
 # ----------------------------
 # Camera Initialization + Capturing
@@ -131,12 +293,18 @@ def camera_init():
     print("I2C scan:", [hex(x) for x in i2c.scan()])
 
     cam = Arducam(spi=spi, cs_pin=CS_PIN, i2c=i2c)
+    cam.set_max_jpeg_size(MAX_JPEG_SIZE)
+    if REUSE_FRAME_BUFFER and not STREAM_READOUT:
+        # Allocate while the heap is still unfragmented.
+        cam.use_frame_buffer()
     cam.CameraType = OV5642
     cam.Set_Camera_mode(JPEG)
 
     cam.Camera_Detection()
     cam.Spi_Test(retries=5)
     cam.init()
+    if FRAME_SIZE != OV5642_320x240:
+        cam.set_resolution(FRAME_SIZE)
     time.sleep(0.2)
 
     # Important (from your example): VSYNC active-low timing bit
@@ -146,10 +314,10 @@ def camera_init():
     print("Camera ready.")
     return cam
 
-def capture_jpeg(cam, timeout_ms=3000):
+def capture_frame(cam, timeout_ms=3000):
     """
-    Capture one JPEG frame and return bytes.
-    Includes a timeout so it doesn't hang forever.
+    Capture one frame into the camera FIFO.
+    Returns False if the capture did not finish within timeout_ms.
     """
     cam.flush_fifo()
     cam.clear_fifo_flag()
@@ -158,12 +326,372 @@ def capture_jpeg(cam, timeout_ms=3000):
     t0 = time.ticks_ms()
     while not cam.get_bit(ARDUCHIP_TRIG, CAP_DONE_MASK):
         if time.ticks_diff(time.ticks_ms(), t0) > timeout_ms:
-            return b""
+            return False
         time.sleep(0.005)
+    return True
 
+def capture_jpeg(cam, timeout_ms=3000):
+    """
+    Capture one JPEG frame and return bytes (a memoryview into the
+    camera's frame buffer when REUSE_FRAME_BUFFER is on).
+    Includes a timeout so it doesn't hang forever.
+    """
+    if not capture_frame(cam, timeout_ms):
+        return b""
     jpeg = cam.read_jpeg(max_size=None)
     return jpeg
 
+# ----------------------------
+# Frame pacing + pipelined streaming
+# ----------------------------
+class FrameScheduler:
+    """
+    Paces frame starts to a target fps with ticks_ms deadlines.
+    Falling behind resynchronises instead of bursting to catch up.
+    """
+    def __init__(self, fps):
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        self.fps = fps
+        self.period_ms = 1000 // fps if fps > 0 else 0
+        self.restart()
+
+    def restart(self):
+        self.next_ms = time.ticks_ms()
+
+    def remaining_ms(self):
+        if not self.period_ms:
+            return 0
+        return max(0, time.ticks_diff(self.next_ms, time.ticks_ms()))
+
+    def due(self):
+        """True (and the next slot is booked) if a frame may start now."""
+        now = time.ticks_ms()
+        if self.period_ms and time.ticks_diff(self.next_ms, now) > 0:
+            return False
+        self.next_ms = time.ticks_add(self.next_ms, self.period_ms)
+        if time.ticks_diff(now, self.next_ms) >= 0:
+            self.next_ms = time.ticks_add(now, self.period_ms)
+        return True
+
+    def wait(self):
+        """Sleep until the next slot and book it."""
+        delay = self.remaining_ms()
+        if delay:
+            time.sleep_ms(delay)
+        self.due()
+
+class FrameRing:
+    """
+    Copies of the last few frames sent, for selective retransmission.
+
+    Frames are packed one after another into a single preallocated buffer
+    and overwritten oldest first, so the ring never allocates frame data
+    once created. A frame larger than the whole buffer is not kept.
+    """
+    def __init__(self, size, frames):
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.frames = frames
+        self.entries = []  # (frame_id, offset, size, sent_ms), oldest first
+        self.head = 0
+
+    def add(self, frame_id, jpeg, sent_ms):
+        n = len(jpeg)
+        if n > len(self.buf):
+            return False
+        start = self.head if self.head + n <= len(self.buf) else 0
+        end = start + n
+        entries = self.entries
+        i = 0
+        while i < len(entries):
+            e = entries[i]
+            if e[1] < end and start < e[1] + e[2]:
+                entries.pop(i)  # about to be overwritten
+            else:
+                i += 1
+        if len(entries) >= self.frames:
+            entries.pop(0)
+        self.mv[start:end] = jpeg
+        entries.append((frame_id, start, n, sent_ms))
+        self.head = end
+        return True
+
+    def get(self, frame_id):
+        """(memoryview of the JPEG, sent_ms) if the frame is still held, else None."""
+        for e in self.entries:
+            if e[0] == frame_id:
+                return self.mv[e[1]:e[1] + e[2]], e[3]
+        return None
+
+class Streamer:
+    """
+    Captures and sends frames, one step() at a time.
+
+    Pipelined mode starts the next capture as soon as the previous frame
+    has been drained from the FIFO into RAM, then sends that frame while
+    the sensor exposes the next one. Sequential mode is the original
+    capture -> read -> send cycle. Stream mode captures, then sends while
+    reading the FIFO; it cannot overlap the next capture, but needs no
+    frame buffer. step() never blocks for longer than one
+    FIFO readout plus one frame send, so the control socket stays responsive.
+
+    With a RateController, every sent frame's size and send time is fed
+    to it and its resolution/quality decisions are applied to the camera,
+    except while the camera is at a size off its ladder (follow_camera()).
+
+    With a FrameRing, each sent frame is kept for retransmission, and
+    NACKs that arrived while a frame was going out are answered before
+    the next one is sent, so the resent chunks reach the viewer before
+    the newer frame supersedes the damaged one. With an XorParity, every
+    frame is sent with FEC parity chunks. With an enabled MotionGate, a
+    frame the gate holds back is dropped from the FIFO unread.
+
+    Capture wait, FIFO readout and send times are accumulated per stage
+    and sent to the viewer by report(). In stream mode the readout
+    happens during the send and is counted as send time.
+    """
+    def __init__(self, cam, sock, addr, fps=TARGET_FPS, pipelined=PIPELINED,
+                 stream=STREAM_READOUT, rate=None, ring=None, parity=None, gate=None):
+        self.cam = cam
+        self.sock = sock
+        self.addr = addr
+        self.pipelined = pipelined
+        self.stream = stream
+        self.controller = rate
+        self.rate = rate      # the controller while it is in charge, None while paused
+        self.ring = ring
+        self.parity = parity
+        self.gate = gate
+        self.scheduler = FrameScheduler(fps)
+        self.frame_id = 0
+        self.capturing = False
+        self.t_capture = 0
+        self.frames = 0
+        self.bytes = 0
+        self.timeouts = 0
+        self.stage_ms = [0] * 6  # (total, longest) per STAGE_*, since the last report
+        self.stats_seq = 0
+        # Backdated so the first report, and the flags the viewer NACKs by, go out at once
+        self.stats_t0 = time.ticks_add(time.ticks_ms(), -STATS_INTERVAL_MS)
+        self.reported = (0, 0, 0, 0, 0)  # frames, timeouts, resent, bytes, skipped at the last report
+        self.feedback = None  # last receiver report, fields as in FEEDBACK_FMT
+        self.command = None   # text command read by service(), for poll()
+        self.resent = 0
+        self.nack_late = 0    # NACKs for frames already gone or past the deadline
+
+    def reset(self):
+        self.capturing = False
+        self.scheduler.restart()
+        if self.gate is not None:
+            self.gate.reset()  # the scene's JPEG size changes with the settings
+
+    def set_fps(self, fps):
+        self.scheduler.set_fps(fps)
+        if self.controller is not None:
+            self.controller.target_fps = fps
+
+    def follow_camera(self):
+        """
+        Re-sync the rate controller after a manual resolution change. At a
+        size that is not on its ladder the camera stays at that size and
+        adaptive rate is paused (rung 0xFF) until a size on the ladder is
+        set again.
+        """
+        if self.controller is None:
+            return
+        if self.controller.follow(self.cam.resolution):
+            self.rate = self.controller
+            self.cam.set_jpeg_qscale(self.rate.qscale)
+        else:
+            self.rate = None
+
+    def apply_rate(self):
+        self.cam.set_resolution(self.rate.size)
+        self.cam.set_jpeg_qscale(self.rate.qscale)
+        self.reset()  # drop any capture started with the old settings
+
+    def poll(self):
+        """
+        Handle every queued feedback and NACK packet. Returns the next text
+        command (bytes) for the main loop, or None.
+        """
+        cmd, self.command = self.command, None
+        while cmd is None:
+            try:
+                data, addr = self.sock.recvfrom(64)
+            except OSError:
+                break
+            if not data:
+                continue
+            if data[0] == PKT_FEEDBACK:
+                self.on_feedback(data)
+            elif data[0] == PKT_NACK:
+                self.on_nack(data)
+            else:
+                cmd = data
+        return cmd
+
+    def service(self):
+        """Answer pending NACKs now; a text command is kept for the main loop."""
+        if self.command is None:
+            self.command = self.poll()
+
+    def on_nack(self, data):
+        """Resend the chunks a PKT_NACK reports missing, if the frame is still held."""
+        if self.ring is None or len(data) <= NACK_HDR_SIZE:
+            return
+        _, frame_id, first = ustruct.unpack_from(">BHH", data)
+        held = self.ring.get(frame_id)
+        if held is None or time.ticks_diff(time.ticks_ms(), held[1]) > NACK_DEADLINE_MS:
+            self.nack_late += 1
+            return
+        jpeg = held[0]
+        total = (len(jpeg) + MAX_PAYLOAD - 1) // MAX_PAYLOAD
+        for i in range(min((len(data) - NACK_HDR_SIZE) * 8, total - first)):
+            if data[NACK_HDR_SIZE + (i >> 3)] & (1 << (i & 7)):
+                send_chunk_of(self.sock, self.addr, jpeg, frame_id, first + i, total)
+                self.resent += 1
+
+    def hold_back(self):
+        """True if the motion gate holds back the frame waiting in the FIFO."""
+        gate = self.gate
+        return gate is not None and gate.enabled and not gate.observe(self.cam.read_fifo_length())
+
+    def stage(self, stage, t0):
+        """Account the time since ticks_ms() `t0` to STAGE_* `stage`; returns it."""
+        ms = time.ticks_diff(time.ticks_ms(), t0)
+        t = self.stage_ms
+        t[2 * stage] += ms
+        if ms > t[2 * stage + 1]:
+            t[2 * stage + 1] = ms
+        return ms
+
+    def report(self):
+        """Send a PKT_STATS report if STATS_INTERVAL_MS have passed since the last one."""
+        now = time.ticks_ms()
+        elapsed = time.ticks_diff(now, self.stats_t0)
+        if not STATS_INTERVAL_MS or elapsed < STATS_INTERVAL_MS:
+            return
+        last = self.reported
+        t = [min(v, 0xFFFF) for v in self.stage_ms]
+        gate = self.gate
+        skipped = gate.skipped if gate is not None else 0
+        if gate is None or not gate.enabled:
+            state = GATE_OFF
+        else:
+            state = GATE_ACTIVE if gate.active else GATE_IDLE
+        flags = STATS_CAN_RESEND if self.ring is not None and not self.stream else 0
+        ustruct.pack_into(STATS_FMT, _stats_pkt, 0, PKT_STATS, self.stats_seq,
+                          min(elapsed, 0xFFFF), min(self.frames - last[0], 0xFFFF),
+                          min(self.timeouts - last[1], 0xFFFF), min(self.resent - last[2], 0xFFFF),
+                          self.bytes - last[3], t[0], t[1], t[2], t[3], t[4], t[5],
+                          self.rate.rung if self.rate is not None else 0xFF,
+                          min(gc.mem_free() // 1024, 0xFFFF), min(skipped - last[4], 0xFFFF), state,
+                          flags)
+        try:
+            self.sock.sendto(_stats_pkt, self.addr)
+        except OSError:
+            pass  # telemetry is best effort
+        self.stats_seq = (self.stats_seq + 1) & 0xFF
+        self.stats_t0 = now
+        self.reported = (self.frames, self.timeouts, self.resent, self.bytes, skipped)
+        for i in range(6):
+            self.stage_ms[i] = 0
+
+    def on_feedback(self, data):
+        """Take a PKT_FEEDBACK report; its chunk loss goes to the rate controller."""
+        if len(data) < FEEDBACK_SIZE:
+            return
+        self.feedback = ustruct.unpack_from(FEEDBACK_FMT, data)
+        chunks, lost = self.feedback[3], self.feedback[4]
+        if self.rate is not None and chunks + lost:
+            self.rate.observe_loss(lost / (chunks + lost))
+
+    def observe(self, nbytes, send_ms):
+        if self.rate is not None and self.rate.observe_frame(nbytes, send_ms):
+            self.apply_rate()
+
+    def step(self):
+        if self.stream:
+            self.scheduler.wait()
+            t0 = time.ticks_ms()
+            if not capture_frame(self.cam, timeout_ms=CAPTURE_TIMEOUT_MS):
+                self.timeouts += 1
+                return
+            self.stage(STAGE_CAPTURE, t0)
+            if self.hold_back():
+                return
+            t0 = time.ticks_ms()
+            size = send_frame_stream(self.sock, self.addr[0], self.addr[1], self.cam, self.frame_id,
+                                     self.parity)
+            send_ms = self.stage(STAGE_SEND, t0)
+            self.frame_id = (self.frame_id + 1) & 0xFFFF
+            if size:
+                self.frames += 1
+                self.bytes += size
+                self.observe(size, send_ms)
+            return
+
+        if not self.pipelined:
+            self.scheduler.wait()
+            t0 = time.ticks_ms()
+            jpeg = None
+            if capture_frame(self.cam, timeout_ms=CAPTURE_TIMEOUT_MS):
+                self.stage(STAGE_CAPTURE, t0)
+                if self.hold_back():
+                    return
+                t0 = time.ticks_ms()
+                jpeg = self.cam.read_jpeg(max_size=None)
+                self.stage(STAGE_READOUT, t0)
+            if jpeg:
+                self.send(jpeg)
+            else:
+                self.timeouts += 1
+            return
+
+        cam = self.cam
+        jpeg = None
+        if self.capturing:
+            if cam.get_bit(ARDUCHIP_TRIG, CAP_DONE_MASK):
+                self.stage(STAGE_CAPTURE, self.t_capture)
+                if not self.hold_back():
+                    t0 = time.ticks_ms()
+                    jpeg = cam.read_jpeg(max_size=None)  # FIFO is free again after this
+                    self.stage(STAGE_READOUT, t0)
+                self.capturing = False
+            elif time.ticks_diff(time.ticks_ms(), self.t_capture) > CAPTURE_TIMEOUT_MS:
+                self.capturing = False
+                self.timeouts += 1
+
+        if not self.capturing and self.scheduler.due():
+            cam.flush_fifo()
+            cam.clear_fifo_flag()
+            cam.start_capture()
+            self.capturing = True
+            self.t_capture = time.ticks_ms()
+
+        if jpeg:
+            self.send(jpeg)
+        elif self.capturing:
+            time.sleep_ms(2)
+        else:
+            time.sleep_ms(min(self.scheduler.remaining_ms(), 10))
+
+    def send(self, jpeg):
+        if self.ring is not None:
+            self.service()  # resend chunks of the previous frame first
+        t0 = time.ticks_ms()
+        send_frame_chunks(self.sock, self.addr[0], self.addr[1], jpeg, self.frame_id, self.parity)
+        send_ms = self.stage(STAGE_SEND, t0)
+        if self.ring is not None:
+            self.ring.add(self.frame_id, jpeg, t0)
+        self.frame_id = (self.frame_id + 1) & 0xFFFF
+        self.frames += 1
+        self.bytes += len(jpeg)
+        self.observe(len(jpeg), send_ms)
+
 # ----------------------------
 # Main streaming loop
 # ----------------------------
@@ -175,36 +703,66 @@ def main():
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # UDP Socket
     sock.bind(("0.0.0.0", SERVER_PORT))   # listen START/STOP
-    sock.settimeout(0.1)
+    sock.settimeout(0)                    # poll commands without blocking the stream
 
     print("UDP control ready on port", SERVER_PORT)
 
     streaming = False
+    rate = None
+    if ADAPTIVE_RATE:
+        rate = RateController(RATE_LADDER, TARGET_FPS, RATE_BUDGET_KBPS)
+    ring = None
+    if NACK_FRAMES and not STREAM_READOUT:
+        ring = FrameRing(NACK_RING_SIZE, NACK_FRAMES)
+    parity = None
+    if FEC_GROUP:
+        parity = XorParity(FEC_GROUP, MAX_PAYLOAD, PARITY_HDR_SIZE)
+    gate = MotionGate(MOTION_THRESHOLD_PCT, MOTION_HOLD_MS, MOTION_KEEPALIVE_MS)
+    gate.enabled = MOTION_GATE
+    streamer = Streamer(cam, sock, (SERVER_IP, SERVER_PORT), rate=rate, ring=ring,
+                        parity=parity, gate=gate)
+    streamer.follow_camera()
 
     while True:
-        # Receive START/STOP
+        # Handle feedback and NACKs; receive START/STOP/FPS <n>/RES <size>/MOTION ON|OFF/WAKE
         try:
-            data, addr = sock.recvfrom(64)
-            cmd = data.decode("ascii", "ignore").strip().upper()
-            if cmd == "START":
-                streaming = True
-                led_set(0, 255, 0)
-                print("Streaming ON")
-            elif cmd == "STOP":
-                streaming = False
-                led_set(255, 0, 0)
-                print("Streaming OFF")
-        except OSError:
+            data = streamer.poll()  # binary packets need no text handling
+            if data:
+                cmd = data.decode("ascii", "ignore").strip().upper()
+                if cmd == "START":
+                    streaming = True
+                    streamer.reset()
+                    led_set(0, 255, 0)
+                    print("Streaming ON")
+                elif cmd == "STOP":
+                    streaming = False
+                    led_set(255, 0, 0)
+                    print("Streaming OFF")
+                elif cmd.startswith("FPS "):
+                    streamer.set_fps(int(cmd[4:]))
+                    print("Target fps", cmd[4:])
+                elif cmd in ("MOTION ON", "MOTION OFF"):
+                    gate.enabled = cmd == "MOTION ON"
+                    gate.reset()
+                    print("Motion gate", cmd[7:])
+                elif cmd == "WAKE":
+                    gate.wake()
+                elif cmd.startswith("RES "):
+                    written = cam.set_framesize(cmd[4:])
+                    if written is not None:
+                        streamer.reset()  # drop any capture started at the old size
+                        streamer.follow_camera()
+                        print("Resolution", cmd[4:], "-", written, "registers")
+        except (OSError, ValueError):
             pass
 
         # Stream frames if enabled
         if streaming:
-            jpeg = capture_jpeg(cam, timeout_ms=3000)
-            if jpeg:
-                # frame packet: type + size + jpeg
-                packet = b"\x01" + ustruct.pack(">I", len(jpeg)) + jpeg
-                sock.sendto(packet, (SERVER_IP, SERVER_PORT))
-            time.sleep(0.05)
+            streamer.step()
+            streamer.report()
+        else:
+            time.sleep_ms(50)
 
 # Run
-main()
+if __name__ == "__main__":
+    main()
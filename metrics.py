@@ -0,0 +1,228 @@
+"""
+In-process metrics for the desktop viewer.
+
+A Registry holds metric families (counters, gauges, histograms), each
+split into children by label values:
+
+    decode = registry.histogram("viewer_decode_ms", "JPEG decode", ("camera",))
+    decode.labels("cam0").observe(4.2)
+
+render() writes every family in the Prometheus text exposition format and
+serve() answers GET /metrics with it from a background thread, so curl or
+any Prometheus-compatible scraper on this host can read the viewer.
+Collectors added with add_collector() run before each render to copy in
+totals that are counted elsewhere, such as CameraTable's arrays.
+"""
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MS_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Counter:
+    """Monotonic count for one label combination."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def set(self, value):
+        """Mirror a total that is counted elsewhere."""
+        self.value = value
+
+    def samples(self):
+        yield "", (), self.value
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+
+class Histogram:
+    """Distribution over fixed upper bucket bounds, with count, sum and max."""
+
+    def __init__(self, bounds=MS_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, p):
+        """Upper bucket bound below which `p` percent of samples fall."""
+        if not self.count:
+            return 0.0
+        need = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= need:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self, unit="ms"):
+        if not self.count:
+            return "no samples"
+        return (f"p50≤{self.percentile(50):g} {unit} p95≤{self.percentile(95):g} {unit} "
+                f"max {self.max:.1f} {unit} n={self.count}")
+
+    def format(self, width=40, unit="ms"):
+        """Multi-line text rendering with one bar per bucket."""
+        lines = []
+        peak = max(self.counts) or 1
+        lo = 0
+        for i, n in enumerate(self.counts):
+            hi = f"{self.bounds[i]:g}" if i < len(self.bounds) else "inf"
+            lines.append(f"{lo:>5}-{hi:<5} {unit} {n:>7} {'#' * (n * width // peak)}")
+            lo = hi
+        return "\n".join(lines)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self.counts)
+            count, total = self.count, self.sum
+        seen = 0
+        for bound, n in zip(self.bounds, counts):
+            seen += n
+            yield "_bucket", (("le", f"{bound:g}"),), seen
+        yield "_bucket", (("le", "+Inf"),), count
+        yield "_sum", (), total
+        yield "_count", (), count
+
+
+class Family:
+    """All children of one metric name, keyed by label values."""
+
+    def __init__(self, kind, name, help, labelnames, make):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._make = make
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._make())
+        return child
+
+    def children(self):
+        with self._lock:
+            return list(self._children.items())
+
+    # An unlabelled family is used directly.
+    def inc(self, n=1):
+        self.labels().inc(n)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace('"', r'\"').replace("\n", r"\n")
+
+
+def _value(value):
+    """A sample value at full precision: ints exactly, floats as repr (shortest round trip)."""
+    if isinstance(value, int):
+        return str(int(value))
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._families = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, family):
+        with self._lock:
+            self._families.append(family)
+        return family
+
+    def counter(self, name, help, labels=()):
+        return self._add(Family("counter", name, help, labels, Counter))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Family("gauge", name, help, labels, Gauge))
+
+    def histogram(self, name, help, labels=(), bounds=MS_BOUNDS):
+        return self._add(Family("histogram", name, help, labels, lambda: Histogram(bounds)))
+
+    def add_collector(self, fn):
+        """Call `fn()` before every render()."""
+        self._collectors.append(fn)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        for fn in self._collectors:
+            fn()
+        with self._lock:
+            families = list(self._families)
+        lines = []
+        for fam in families:
+            lines.append(f"# HELP {fam.name} {fam.help}")
+            lines.append(f"# TYPE {fam.name} {fam.kind}")
+            for values, child in fam.children():
+                base = tuple(zip(fam.labelnames, values))
+                for suffix, extra, value in child.samples():
+                    pairs = base + extra
+                    labels = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+                    lines.append(f"{fam.name}{suffix}{{{labels}}} {_value(value)}" if labels
+                                 else f"{fam.name}{suffix} {_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(registry, addr=("127.0.0.1", 9108)):
+    """Serve `registry` at http://addr/metrics from a daemon thread; returns the server."""
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+    server = ThreadingHTTPServer(addr, handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
@@ -0,0 +1,319 @@
+"""
+Motion detection on the viewer's received frames, with NumPy.
+
+Each frame is decoded straight to a small grayscale image: draft mode
+makes libjpeg scale it by 1/2 to 1/8 and skip the colour planes while
+decoding, and the result is resized to MOTION_SIZE. Per camera, a
+MotionDetector keeps a background model (an exponential moving average
+of the frames, float32) and, per frame, in whole-array operations:
+
+    diff     |frame - background| > MOTION_THRESHOLD grey levels
+    cells    the mask averaged over MOTION_CELL x MOTION_CELL cells; a cell
+             is moving when MOTION_CELL_FILL of its pixels are
+    blobs    moving cells labelled by propagating the smallest label
+             between neighbours until it settles, then one bounding box
+             per label from reduceat over the cells sorted by label
+
+Boxes are in 0..1 frame coordinates. Changed pixels learn the background
+more slowly than static ones, so someone standing still fades out over
+seconds rather than at once; a change over most of the frame (lights,
+auto exposure) resets the background instead of being reported.
+
+A MotionAnalyzer runs the detectors on worker threads (PIL's decode and
+NumPy's array operations release the GIL). Workers pull each camera's
+latest frame from the CameraTable when they are free, so analysis never
+queues frames: a camera that sends faster than it can be analysed simply
+has frames skipped. Motion starting and stopping (MOTION_HOLD seconds
+without a box) are MotionEvents, passed to on_event.
+"""
+import io
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+MOTION_SIZE = (160, 120)             # analysis resolution (width, height)
+MOTION_ALPHA = 0.05                  # background learning rate per frame
+MOTION_ALPHA_MOVING = 0.005          # the same for pixels that changed
+MOTION_THRESHOLD = 25                # grey levels a pixel must differ from the background
+MOTION_CELL = 8                      # pixels per blob grid cell side
+MOTION_CELL_FILL = 0.25              # share of a cell's pixels that must change
+MOTION_MIN_CELLS = 2                 # smallest blob reported, in cells
+MOTION_GLOBAL = 0.6                  # share of changed pixels treated as a lighting change
+MOTION_HOLD = 2.0                    # seconds without a box before motion has ended
+MOTION_WORKERS = 2
+
+_BIG = np.iinfo(np.int32).max
+
+
+def decode_gray(jpeg, size=MOTION_SIZE):
+    """A JPEG as a uint8 array of `size`, decoded at the smallest draft scale that covers it."""
+    img = Image.open(io.BytesIO(jpeg))
+    img.draft("L", size)
+    img = img.convert("L")
+    if img.size != size:
+        img = img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    return np.asarray(img)
+
+
+def blobs(grid, min_cells=MOTION_MIN_CELLS):
+    """Bounding boxes (x0, y0, x1, y1, cells) in cells of the 4-connected True regions of `grid`."""
+    h, w = grid.shape
+    if not grid.any():
+        return []
+    ids = np.arange(h * w, dtype=np.int32).reshape(h, w)
+    labels = np.where(grid, ids, _BIG)
+    while True:
+        spread = labels.copy()
+        np.minimum(spread[1:], labels[:-1], out=spread[1:])
+        np.minimum(spread[:-1], labels[1:], out=spread[:-1])
+        np.minimum(spread[:, 1:], labels[:, :-1], out=spread[:, 1:])
+        np.minimum(spread[:, :-1], labels[:, 1:], out=spread[:, :-1])
+        spread[~grid] = _BIG
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    ys, xs = np.nonzero(grid)
+    owner = labels[ys, xs]
+    order = np.argsort(owner, kind="stable")
+    owner, ys, xs = owner[order], ys[order], xs[order]
+    starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+    counts = np.diff(np.r_[starts, len(owner)])
+    x0 = np.minimum.reduceat(xs, starts)
+    y0 = np.minimum.reduceat(ys, starts)
+    x1 = np.maximum.reduceat(xs, starts) + 1
+    y1 = np.maximum.reduceat(ys, starts) + 1
+    keep = counts >= min_cells
+    return list(zip(x0[keep].tolist(), y0[keep].tolist(), x1[keep].tolist(), y1[keep].tolist(),
+                    counts[keep].tolist()))
+
+
+class MotionDetector:
+    """Background model and per-frame motion boxes for one camera."""
+
+    def __init__(self, alpha=MOTION_ALPHA, alpha_moving=MOTION_ALPHA_MOVING, threshold=MOTION_THRESHOLD,
+                 cell=MOTION_CELL, cell_fill=MOTION_CELL_FILL, min_cells=MOTION_MIN_CELLS,
+                 global_change=MOTION_GLOBAL):
+        self.alpha = alpha
+        self.alpha_moving = alpha_moving
+        self.threshold = threshold
+        self.cell = cell
+        self.cell_fill = cell_fill
+        self.min_cells = min_cells
+        self.global_change = global_change
+        self.background = None       # float32, frame shaped
+        self._frame = None           # float32 scratch buffers, reused every frame
+        self._delta = None
+
+    def reset(self):
+        self.background = None
+
+    def update(self, gray):
+        """
+        Feed one uint8 frame; returns (share of pixels changed, boxes). Boxes
+        are (x0, y0, x1, y1) in 0..1 of the frame.
+        """
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self._frame = np.empty_like(self.background)
+            self._delta = np.empty_like(self.background)
+            return 0.0, []
+        frame, delta = self._frame, self._delta
+        np.copyto(frame, gray)
+        np.subtract(frame, self.background, out=delta)
+        mask = np.abs(delta) > self.threshold
+        changed = float(mask.mean())
+        if changed > self.global_change:
+            np.copyto(self.background, frame)   # lighting or exposure, not motion
+            return changed, []
+        # background += alpha * delta, slower where the frame changed
+        delta *= np.where(mask, np.float32(self.alpha_moving), np.float32(self.alpha))
+        self.background += delta
+
+        c = self.cell
+        h, w = mask.shape
+        rows, cols = h // c, w // c
+        fill = mask[:rows * c, :cols * c].reshape(rows, c, cols, c).mean(axis=(1, 3))
+        boxes = [(x0 / cols, y0 / rows, x1 / cols, y1 / rows)
+                 for x0, y0, x1, y1, _ in blobs(fill >= self.cell_fill, self.min_cells)]
+        return changed, boxes
+
+
+class MotionEvent:
+    """Motion starting ("start") or having stopped ("end") on a camera."""
+    __slots__ = ("camera", "kind", "ts", "changed", "boxes")
+
+    def __init__(self, camera, kind, ts, changed=0.0, boxes=()):
+        self.camera = camera         # camera index
+        self.kind = kind
+        self.ts = ts                 # wall-clock time of the frame
+        self.changed = changed
+        self.boxes = boxes
+
+    def __repr__(self):
+        return f"MotionEvent({self.camera}, {self.kind!r}, {self.ts:.3f}, {len(self.boxes)} boxes)"
+
+
+class MotionResult:
+    """The latest analysed frame of a camera."""
+    __slots__ = ("seq", "ts", "changed", "boxes", "ms")
+
+    def __init__(self, seq, ts, changed, boxes, ms):
+        self.seq = seq
+        self.ts = ts
+        self.changed = changed
+        self.boxes = boxes
+        self.ms = ms                 # decode + detect time
+
+
+class MotionAnalyzer:
+    """
+    Motion detection for every camera in a CameraTable, on worker threads.
+
+    The ingest thread calls notify(idx) for each completed frame. A free
+    worker takes the next camera with a new frame, analyses its latest
+    frame and publishes a MotionResult in `results`; each camera is
+    analysed by one worker at a time, in arrival order between cameras.
+    """
+
+    def __init__(self, table, workers=MOTION_WORKERS, size=MOTION_SIZE, hold=MOTION_HOLD, **detector):
+        self.table = table
+        self.workers = workers
+        self.size = size
+        self.hold = hold
+        n = len(table)
+        self.detectors = [MotionDetector(**detector) for _ in range(n)]
+        self.results = [None] * n    # newest MotionResult per camera
+        self.active = [False] * n    # motion going on
+        self.last_motion = [0.0] * n  # time of the last frame with a box
+        self.analyzed = [0] * n
+        self.skipped = [0] * n       # frames replaced by a newer one before analysis
+        self.events = [0] * n
+        self.errors = 0
+        self.last_error = None       # newest exception analyse() raised
+        self.on_event = None         # called with each MotionEvent, on a worker thread
+        self._state = bytearray(n)   # 0 idle, 1 queued, 2 being analysed, 3 and a newer frame came
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self._ms = None
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, daemon=True, name=f"motion-{i}")
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+    def notify(self, idx):
+        """Ingest thread: camera `idx` has a new latest frame."""
+        with self._cond:
+            state = self._state[idx]
+            if state == 0:
+                self._state[idx] = 1
+                self._queue.append(idx)
+                self._cond.notify()
+            elif state == 2:
+                self._state[idx] = 3
+
+    def _next(self):
+        with self._cond:
+            while not self._queue and not self._stopping:
+                self._cond.wait()
+            if self._stopping:
+                return None
+            idx = self._queue.popleft()
+            self._state[idx] = 2
+            return idx
+
+    def _done(self, idx):
+        with self._cond:
+            if self._state[idx] == 3:
+                self._state[idx] = 1
+                self._queue.append(idx)
+                self._cond.notify()
+            else:
+                self._state[idx] = 0
+
+    def _run(self):
+        while True:
+            idx = self._next()
+            if idx is None:
+                break
+            try:
+                self.analyze(idx)
+            except Exception as e:
+                # A damaged JPEG: skip the frame, keep the worker.
+                self.errors += 1
+                self.last_error = e
+            finally:
+                self._done(idx)
+
+    def analyze(self, idx):
+        """Analyse camera `idx`'s latest frame, if it has not been already."""
+        slot = self.table.retain_latest(idx)
+        if slot is None:
+            return
+        try:
+            last = self.results[idx]
+            if last is not None and slot.seq == last.seq:
+                return
+            t0 = time.perf_counter()
+            gray = decode_gray(slot.view(), self.size)
+            seq, ts = slot.seq, slot.ts
+        finally:
+            slot.release()
+        changed, boxes = self.detectors[idx].update(gray)
+        ms = (time.perf_counter() - t0) * 1000
+        if last is not None:
+            self.skipped[idx] += seq - last.seq - 1
+        self.analyzed[idx] += 1
+        self.results[idx] = MotionResult(seq, ts, changed, boxes, ms)
+        if self._ms is not None:
+            self._ms.labels(self.table.names[idx]).observe(ms)
+
+        event = None
+        if boxes:
+            self.last_motion[idx] = ts
+            if not self.active[idx]:
+                self.active[idx] = True
+                event = MotionEvent(idx, "start", ts, changed, boxes)
+        elif self.active[idx] and ts - self.last_motion[idx] >= self.hold:
+            self.active[idx] = False
+            event = MotionEvent(idx, "end", ts)
+        if event is not None:
+            self.events[idx] += 1
+            if self.on_event is not None:
+                self.on_event(event)
+
+    def register_metrics(self, registry):
+        """Add the analyzer's counters to a metrics.Registry."""
+        cam = ("camera",)
+        self._ms = registry.histogram("motion_analysis_ms", "Decode and motion detection per frame", cam)
+        analyzed = registry.counter("motion_frames_total", "Frames analysed for motion", cam)
+        skipped = registry.counter("motion_skipped_frames_total",
+                                   "Frames replaced by a newer one before analysis", cam)
+        events = registry.counter("motion_events_total", "Motion start and end events", cam)
+        active = registry.gauge("motion_active", "Motion going on (1) or not (0)", cam)
+        changed = registry.gauge("motion_changed_ratio", "Share of pixels changed in the last frame", cam)
+
+        def collect():
+            for idx, name in enumerate(self.table.names):
+                analyzed.labels(name).set(self.analyzed[idx])
+                skipped.labels(name).set(self.skipped[idx])
+                events.labels(name).set(self.events[idx])
+                active.labels(name).set(int(self.active[idx]))
+                result = self.results[idx]
+                changed.labels(name).set(result.changed if result is not None else 0)
+
+        registry.add_collector(collect)
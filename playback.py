@@ -0,0 +1,262 @@
+"""
+Playback and seeking over the segments recorder.py writes.
+
+An Archive is one camera's recording directory. Its segments are sorted
+by the start time in their names, so finding the segment for a time is
+a bisect over that list; inside the segment, the .idx file is mapped
+with mmap and bisected in place through a strided memoryview of its
+timestamps, so a seek reads only the handful of index pages it touches.
+The segment itself is mapped too, and a Frame's view() is a memoryview
+straight into the mapping: nothing is read or copied until the decoder
+touches the bytes.
+
+Frames quack like cloud.FrameSlot (view, retain, release, ts, seq), so
+the viewer's decoder takes them unchanged. The most recent OPEN_SEGMENTS
+segments stay mapped; a segment that is still being recorded is
+re-mapped when a seek reaches past what was mapped. The segment list is
+listed again when a seek or step runs past its end, which also drops
+segments that retention has deleted since.
+"""
+import bisect
+import glob
+import mmap
+import os
+from collections import OrderedDict
+
+from recorder import INDEX, INDEX_EXT, RECORD, RECORD_MAGIC, SEGMENT_EXT, segment_start
+
+OPEN_SEGMENTS = 8
+
+
+def _map(path):
+    """Read-only mapping of a file, or None while it is empty or deleted by retention."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _unmap(m):
+    if m is not None:
+        try:
+            m.close()
+        except BufferError:
+            pass  # a Frame still views it; unmapped once that is released
+
+
+class Frame:
+    """One recorded JPEG, viewed in place in its segment's mapping."""
+    __slots__ = ("segment", "i", "ts", "seq", "frame_id", "size", "mv")
+
+    first_ts = 0.0                   # no arrival time; not a live frame
+
+    def __init__(self, segment, i, ts, seq, frame_id, mv):
+        self.segment = segment
+        self.i = i                   # position in the segment's index
+        self.ts = ts
+        self.seq = seq
+        self.frame_id = frame_id
+        self.size = len(mv)
+        self.mv = mv
+
+    def view(self):
+        return self.mv
+
+    def retain(self):
+        return self
+
+    def release(self):
+        pass
+
+
+class SegmentMap:
+    """A segment and its index, mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        self.start = segment_start(path)
+        self.index_path = path[:-len(SEGMENT_EXT)] + INDEX_EXT
+        self.data = None
+        self.index = None
+        self.times = ()
+        self.offsets = ()
+        self.count = 0
+        self.remap()
+
+    def remap(self):
+        """Map the files again, picking up records written since."""
+        old = (self.data, self.index)
+        self.data = _map(self.path)
+        self.index = _map(self.index_path)
+        self.count = len(self.index) // INDEX.size if self.index is not None else 0
+        if self.count:
+            entries = memoryview(self.index)[:self.count * INDEX.size]
+            self.times = entries.cast("d")[::2]
+            self.offsets = entries.cast("Q")[1::2]
+        else:
+            self.times = self.offsets = ()
+        for m in old:
+            _unmap(m)
+
+    def grown(self):
+        try:
+            return os.path.getsize(self.index_path) // INDEX.size > self.count
+        except OSError:
+            return False
+
+    def find(self, ts):
+        """Position of the last frame at or before `ts`, -1 if none."""
+        return bisect.bisect_right(self.times, ts) - 1
+
+    def frame(self, i):
+        """Frame at index position `i`, or None if its record is missing or damaged."""
+        off = self.offsets[i]
+        if self.data is None or off + RECORD.size > len(self.data):
+            self.remap()             # the index may run ahead of the mapped data
+            if self.data is None or off + RECORD.size > len(self.data):
+                return None
+        magic, size, _, seq, frame_id, _, ts = RECORD.unpack_from(self.data, off)
+        start = off + RECORD.size
+        if magic != RECORD_MAGIC or start + size > len(self.data):
+            return None
+        return Frame(self, i, ts, seq, frame_id, memoryview(self.data)[start:start + size])
+
+    def close(self):
+        self.times = self.offsets = ()
+        _unmap(self.data)
+        _unmap(self.index)
+        self.data = self.index = None
+
+
+class Archive:
+    """One camera's recordings, for seeking and stepping by time."""
+
+    def __init__(self, directory, open_segments=OPEN_SEGMENTS):
+        self.directory = directory
+        self.open_segments = open_segments
+        self.paths = []
+        self.starts = []
+        self._maps = OrderedDict()   # segment path -> SegmentMap, least recently used first
+        self.refresh()
+
+    def __len__(self):
+        return len(self.paths)
+
+    def refresh(self):
+        """List the segments again: new ones are added, ones deleted by retention dropped."""
+        paths = []
+        starts = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*" + SEGMENT_EXT))):
+            try:
+                start = segment_start(path)
+            except ValueError:
+                continue             # not a recorder segment name
+            paths.append(path)
+            starts.append(start)
+        self.paths = paths
+        self.starts = starts
+        gone = set(self._maps).difference(paths)
+        for path in gone:
+            self._maps.pop(path).close()
+
+    def close(self):
+        for m in self._maps.values():
+            m.close()
+        self._maps.clear()
+
+    def segment(self, n):
+        path = self.paths[n]
+        m = self._maps.get(path)
+        if m is None:
+            m = self._maps[path] = SegmentMap(path)
+            if len(self._maps) > self.open_segments:
+                self._maps.popitem(last=False)[1].close()
+        else:
+            self._maps.move_to_end(path)
+            if n == len(self.paths) - 1 and m.grown():
+                m.remap()            # still being recorded
+        return m
+
+    def span(self):
+        """(first, last) frame time, or None if nothing is recorded."""
+        self.refresh()
+        first = self._edge(range(len(self.paths)), 0)
+        last = self._edge(range(len(self.paths) - 1, -1, -1), -1)
+        if first is None or last is None:
+            return None
+        return first.ts, last.ts
+
+    def _edge(self, order, end):
+        for n in order:
+            m = self.segment(n)
+            if m.count:
+                return m.frame(end % m.count)
+        return None
+
+    def seek(self, ts):
+        """The last frame recorded at or before `ts` (the first frame if `ts` is earlier)."""
+        if not self.paths or ts >= self.starts[-1]:
+            self.refresh()
+        if not self.paths:
+            return None
+        n = max(0, bisect.bisect_right(self.starts, ts) - 1)
+        while n >= 0:
+            m = self.segment(n)
+            i = m.find(ts)
+            if i >= 0:
+                return self._valid(n, i, -1)
+            n -= 1                   # before this segment's first frame
+        return self.step_from(0, -1, 1)
+
+    def step(self, frame, n=1):
+        """The frame `n` frames after (or before, if negative) `frame`, or None past either end."""
+        seg = bisect.bisect_left(self.starts, frame.segment.start)
+        if seg < len(self.paths) and self.paths[seg] == frame.segment.path:
+            return self.step_from(seg, frame.i, n)
+        # The frame's segment is no longer listed (deleted by retention): go on from
+        # the first frame after it, or the last before it.
+        if n > 0:
+            return self.step_from(seg, -1, n) if seg < len(self.paths) else None
+        if seg == 0:
+            return None
+        return self.step_from(seg - 1, self.segment(seg - 1).count, n)
+
+    def step_from(self, seg, i, n):
+        direction = 1 if n > 0 else -1
+        remaining = abs(n)
+        while remaining:
+            i += direction
+            m = self.segment(seg)
+            while i >= m.count or i < 0:
+                seg += direction
+                if seg < 0:
+                    return None
+                if seg >= len(self.paths):
+                    self.refresh()
+                    if seg >= len(self.paths):
+                        return None
+                m = self.segment(seg)
+                i = 0 if direction > 0 else m.count - 1
+            remaining -= 1
+        return self._valid(seg, i, direction)
+
+    def _valid(self, seg, i, direction):
+        """Frame at (seg, i), or the nearest intact one in `direction` after damage."""
+        m = self.segment(seg)
+        frame = m.frame(i)
+        if frame is not None:
+            return frame
+        return self.step_from(seg, i, direction)
+
+    def frames(self, start, end):
+        """Every frame recorded from `start` up to `end`, in order."""
+        frame = self.seek(start)
+        if frame is not None and frame.ts < start:
+            frame = self.step(frame)
+        while frame is not None and frame.ts <= end:
+            yield frame
+            frame = self.step(frame)
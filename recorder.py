@@ -0,0 +1,661 @@
+"""
+Continuous recording of every camera's frames to disk.
+
+Each camera records into its own directory as a series of append-only
+segment files. A segment is a sequence of records, each one a fixed-size
+RECORD header followed by the JPEG, so it can be read back (or carved out
+with any MJPEG tool) without the index. Next to it, the segment's .idx
+file holds one INDEX entry per record, (timestamp, offset), for seeking.
+A segment is closed and a new one started after SEGMENT_BYTES or
+SEGMENT_SECONDS.
+
+The ingest thread never touches a file: add() copies the frame and its
+header onto the camera's staging buffer and returns. One writer thread
+per disk swaps out each buffer once it holds FLUSH_BYTES, or its oldest
+frame is FLUSH_INTERVAL old, and writes it with a single write() call, so
+the disk sees large sequential writes whatever the frame rate. fsync()
+runs on a separate thread every FSYNC_INTERVAL seconds, and when a
+segment is closed, so a slow flush to disk never holds up writing. If the
+disk falls behind, staged data is capped at BUFFER_BYTES per disk and
+further frames are dropped and counted rather than queued without bound.
+
+With several record directories (one per disk), cameras are spread over
+them round-robin and every disk gets its own writer.
+
+In event mode (pre_event seconds given), frames are not written as they
+arrive but kept in a PreEventRing per camera: a buffer allocated once,
+holding the newest pre_event seconds of records within a fixed byte
+budget. trigger() hands the ring to the writer, which writes it out of
+the ring's own memory, and records the camera normally until post_event
+seconds after the last trigger. The rings' budget is split between the
+cameras up to RING_TOTAL_BYTES, so memory stays fixed however many
+cameras there are.
+
+Retention runs on the fsync thread: segments older than retain_seconds,
+and the oldest segments while a directory holds more than retain_bytes,
+are deleted with their side files. The segments being written are never
+deleted.
+
+With a thumbnails.Thumbnailer, the writer offers it every record it
+writes; it keeps one per camera every few seconds in a .thm side file.
+"""
+import calendar
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+
+# On-disk format (little-endian)
+RECORD_MAGIC = b"VSR1"
+RECORD = struct.Struct("<4sIIIHHd")  # magic, JPEG size, CRC-32 of the JPEG, per-camera seq,
+                                     # camera frame_id, flags (0), wall-clock time of arrival
+INDEX = struct.Struct("<dQ")          # wall-clock time, offset of the record in the segment
+SEGMENT_EXT = ".seg"
+INDEX_EXT = ".idx"
+SIDE_EXTS = (INDEX_EXT, ".thm")      # files deleted with their segment (.thm: thumbnails.py)
+
+SEGMENT_BYTES = 256 * 1024 * 1024    # start a new segment after this many bytes
+SEGMENT_SECONDS = 300                # or after this long
+FLUSH_BYTES = 1024 * 1024            # write a camera's staged frames once this much has built up
+FLUSH_INTERVAL = 0.25                # or once its oldest is this many seconds old
+FSYNC_INTERVAL = 1.0                 # seconds between background fsyncs; 0 = after every write,
+                                     # None = only when a segment is closed
+BUFFER_BYTES = 64 * 1024 * 1024      # staged bytes per disk before frames are dropped
+
+POST_EVENT_SECONDS = 10              # event mode: keep recording this long after a trigger
+RING_BYTES = 8 * 1024 * 1024         # event mode: pre-event buffer per camera
+RING_TOTAL_BYTES = 256 * 1024 * 1024  # and for all cameras together
+RING_FRAMES = 1024                   # records a pre-event buffer holds at most
+RETAIN_INTERVAL = 10.0               # seconds between retention sweeps
+
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+def segment_name(ts):
+    """File name stem for a segment starting at wall-clock `ts`; sorts by time."""
+    return time.strftime("%Y%m%d-%H%M%S", time.gmtime(ts)) + f"-{int(ts * 1000) % 1000:03d}"
+
+
+def segment_start(path):
+    """Start time encoded in a segment file name by segment_name()."""
+    stem = os.path.basename(path)[:-len(SEGMENT_EXT)]
+    return calendar.timegm(time.strptime(stem[:15], "%Y%m%d-%H%M%S")) + int(stem[16:19]) / 1000
+
+
+def record_jpeg(parts, off):
+    """The JPEG of the record at `off` in `parts` laid end to end (records never straddle parts)."""
+    for part in parts:
+        if off < len(part):
+            size = RECORD.unpack_from(part, off)[1]
+            start = off + RECORD.size
+            return memoryview(part)[start:start + size]
+        off -= len(part)
+    raise IndexError(off)
+
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        n = os.write(fd, view)
+        view = view[n:]
+
+
+class Segment:
+    """An open segment file and its index."""
+
+    def __init__(self, directory, ts):
+        named = ts
+        stem = os.path.join(directory, segment_name(named))
+        while os.path.exists(stem + SEGMENT_EXT):  # same millisecond as the last one
+            named += 0.001
+            stem = os.path.join(directory, segment_name(named))
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND | _O_BINARY
+        self.path = stem + SEGMENT_EXT
+        self.data = os.open(self.path, flags, 0o644)
+        self.index = os.open(stem + INDEX_EXT, flags, 0o644)
+        self.directory = directory
+        self.start_ts = ts
+        self.size = 0
+        self.frames = 0
+
+    def fsync(self):
+        os.fsync(self.data)
+        os.fsync(self.index)
+
+    def close(self):
+        os.close(self.data)
+        os.close(self.index)
+
+
+class _Staged:
+    """A camera's frames waiting to be written: record bytes and (ts, offset) pairs."""
+    __slots__ = ("data", "index", "since")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.index = []
+        self.since = 0.0
+
+
+class PreEventRing:
+    """
+    The newest records of one camera, in a buffer allocated once.
+
+    Records are laid out one after another and wrap to the start of the
+    buffer when the next one does not fit at the end; the oldest records
+    are evicted to make room, and once older than `seconds`.
+    """
+
+    def __init__(self, nbytes, frames, seconds):
+        self.buf = bytearray(nbytes)
+        self.mv = memoryview(self.buf)
+        self.seconds = seconds
+        self.ts = array("d", [0.0] * frames)
+        self.off = array("Q", [0] * frames)
+        self.size = array("I", [0] * frames)
+        self.head = 0                # oldest record's entry
+        self.count = 0
+        self.tail = 0                # buffer offset after the newest record
+        self.flushing = False        # handed to the writer; not written to until it is done
+        self.evicted = 0
+
+    def clear(self):
+        self.head = self.count = self.tail = 0
+
+    def _pop(self):
+        self.head = (self.head + 1) % len(self.ts)
+        self.count -= 1
+        self.evicted += 1
+        if not self.count:
+            self.tail = 0
+
+    def _place(self, n):
+        """Buffer offset for an `n`-byte record, evicting what is in its way; None if too big."""
+        if n > len(self.buf):
+            return None
+        while self.count:
+            start = self.off[self.head]
+            if self.tail > start:        # not wrapped: free space at the end, then before start
+                if self.tail + n <= len(self.buf):
+                    return self.tail
+                if n <= start:
+                    return 0
+            elif self.tail + n <= start:  # wrapped: free space between tail and start
+                return self.tail
+            self._pop()
+        return 0
+
+    def push(self, header, view, ts):
+        """Add one record; False if it is larger than the whole buffer."""
+        while self.count and (self.count == len(self.ts) or ts - self.ts[self.head] > self.seconds):
+            self._pop()
+        n = len(header) + len(view)
+        pos = self._place(n)
+        if pos is None:
+            return False
+        self.mv[pos:pos + len(header)] = header
+        self.mv[pos + len(header):pos + n] = view
+        i = (self.head + self.count) % len(self.ts)
+        self.ts[i] = ts
+        self.off[i] = pos
+        self.size[i] = n
+        self.count += 1
+        self.tail = pos + n
+        return True
+
+    def runs(self):
+        """The records oldest first as (contiguous views, [(ts, offset)]), offsets as if concatenated."""
+        parts = []
+        index = []
+        start = end = None
+        total = 0
+        for k in range(self.count):
+            i = (self.head + k) % len(self.ts)
+            off, n = self.off[i], self.size[i]
+            if off != end:
+                if start is not None:
+                    parts.append(self.mv[start:end])
+                start = off
+            end = off + n
+            index.append((self.ts[i], total))
+            total += n
+        if start is not None:
+            parts.append(self.mv[start:end])
+        return parts, index
+
+
+class DiskWriter:
+    """Writer and fsync threads for the cameras recording to one directory."""
+
+    def __init__(self, recorder, root):
+        self.recorder = recorder
+        self.root = root
+        self.staged = {}             # camera index -> _Staged
+        self.rings = {}              # camera index -> PreEventRing, in event mode
+        self.flushes = []            # (camera index, _Staged or PreEventRing) to write first, in order
+        self.segments = {}           # camera index -> open Segment
+        self.pending = 0             # staged bytes not yet written
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.sync_lock = threading.Lock()
+        self.dirty = set()           # segments written since their last fsync
+        self.retired = []            # closed for writing, waiting for fsync and close
+        self.created = set()         # directories with new segment files
+        self.live = set()            # paths of segments not closed yet; kept from retention
+        self.stopping = False
+        self.writes = 0
+        self.write_seconds = 0.0
+        self.fsyncs = 0
+        self.fsync_seconds = 0.0
+        self.errors = 0
+        self.last_error = None
+        self.evicted_segments = 0
+        self.evicted_bytes = 0
+        self._threads = []
+
+    def add_camera(self, idx, ring=None):
+        os.makedirs(os.path.join(self.root, self.recorder.names[idx]), exist_ok=True)
+        self.staged[idx] = _Staged()
+        if ring is not None:
+            self.rings[idx] = ring
+
+    def start(self):
+        for target, name in ((self._write_loop, "writer"), (self._sync_loop, "fsync")):
+            t = threading.Thread(target=target, daemon=True, name=f"recorder-{name}-{self.root}")
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        with self.lock:
+            self.stopping = True
+            self.wake.notify()
+        for t in self._threads:
+            t.join()
+
+    def add(self, idx, slot):
+        """Ingest thread: stage one frame. False if it was dropped."""
+        view = slot.view()
+        header = RECORD.pack(RECORD_MAGIC, slot.size, zlib.crc32(view), slot.seq & 0xFFFFFFFF,
+                             slot.frame_id, 0, slot.ts)
+        need = RECORD.size + slot.size
+        with self.lock:
+            ring = self.rings.get(idx)
+            if ring is not None and not ring.flushing and slot.ts >= self.recorder.until[idx]:
+                if ring.push(header, view, slot.ts):
+                    return True
+                self.recorder.dropped[idx] += 1
+                return False
+            if self.pending + need > self.recorder.buffer_bytes or self.stopping:
+                self.recorder.dropped[idx] += 1
+                return False
+            staged = self.staged[idx]
+            if not staged.data:
+                staged.since = time.monotonic()
+            staged.index.append((slot.ts, len(staged.data)))
+            staged.data += header
+            staged.data += view
+            self.pending += need
+            if len(staged.data) >= self.recorder.flush_bytes:
+                self.wake.notify()
+        return True
+
+    def trigger(self, idx, until):
+        """Record camera `idx` until wall-clock `until`, starting with its pre-event ring."""
+        with self.lock:
+            rec = self.recorder
+            rec.until[idx] = max(rec.until[idx], until)
+            ring = self.rings.get(idx)
+            if ring is None or ring.flushing or not ring.count or self.stopping:
+                return
+            staged = self.staged[idx]
+            if staged.data:
+                # The end of an earlier event, older than anything in the ring.
+                self.flushes.append((idx, staged))
+                self.staged[idx] = _Staged()
+            ring.flushing = True
+            self.flushes.append((idx, ring))
+            rec.events[idx] += 1
+            self.wake.notify()
+
+    def ring_seconds(self, idx):
+        """Span of camera `idx`'s pre-event buffer."""
+        with self.lock:
+            ring = self.rings[idx]
+            if not ring.count:
+                return 0.0
+            newest = (ring.head + ring.count - 1) % len(ring.ts)
+            return ring.ts[newest] - ring.ts[ring.head]
+
+    def _take(self):
+        """Swap out the staged buffers that are due; waits until one is, or stop."""
+        rec = self.recorder
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                due = [(idx, s) for idx, s in self.staged.items() if s.data and (
+                    self.stopping or len(s.data) >= rec.flush_bytes or now - s.since >= rec.flush_interval)]
+                if due or self.flushes or self.stopping:
+                    break
+                self.wake.wait(rec.flush_interval / 2)
+            for idx, _ in due:
+                self.staged[idx] = _Staged()
+            due[:0], self.flushes = self.flushes, []  # triggered rings precede what came after them
+            return due
+
+    def _write_loop(self):
+        while True:
+            due = self._take()
+            if not due:
+                break  # stopping and everything written
+            for idx, staged in due:
+                if isinstance(staged, PreEventRing):
+                    self._write_ring(idx, staged)
+                else:
+                    self._write(idx, staged)
+        for seg in self.segments.values():
+            self._retire(seg)
+        self.segments.clear()
+
+    def _write(self, idx, staged):
+        try:
+            self._append(idx, (staged.data,), staged.index)
+        finally:
+            with self.lock:
+                self.pending -= len(staged.data)
+
+    def _write_ring(self, idx, ring):
+        """Write a triggered ring straight from its buffer, then give it back to add()."""
+        parts, index = ring.runs()
+        try:
+            self._append(idx, parts, index)
+        finally:
+            parts.clear()
+            with self.lock:
+                ring.clear()
+                ring.flushing = False
+
+    def _append(self, idx, parts, index):
+        """Append records (`parts` back to back, `index` relative to them) to camera `idx`'s segment."""
+        rec = self.recorder
+        n = sum(len(p) for p in parts)
+        try:
+            seg = self.segments.get(idx)
+            ts = index[0][0]
+            if seg is None or seg.size >= rec.segment_bytes or ts - seg.start_ts >= rec.segment_seconds:
+                if seg is not None:
+                    self._retire(seg)
+                seg = self.segments[idx] = Segment(os.path.join(self.root, rec.names[idx]), ts)
+                with self.sync_lock:
+                    self.created.add(seg.directory)
+                    self.live.add(seg.path)
+            t0 = time.perf_counter()
+            for part in parts:
+                write_all(seg.data, part)
+            base = seg.size
+            write_all(seg.index, b"".join(INDEX.pack(t, base + off) for t, off in index))
+            self.write_seconds += time.perf_counter() - t0
+            self.writes += 1
+            seg.size += n
+            seg.frames += len(index)
+            rec.frames[idx] += len(index)
+            rec.bytes[idx] += n
+            thumbs = rec.thumbnailer
+            if thumbs is not None:
+                for t, off in index:
+                    if thumbs.due(idx, t):
+                        thumbs.submit(idx, seg.path, t, record_jpeg(parts, off))
+            if rec.fsync_interval == 0:
+                self._fsync(seg)
+            else:
+                with self.sync_lock:
+                    self.dirty.add(seg)
+        except OSError as e:
+            # Disk full or gone: lose this batch, keep recording the others.
+            self.errors += 1
+            rec.dropped[idx] += len(index)
+            if self.last_error is None:
+                print(f"[REC] Write to {self.root} failed: {e}")
+            self.last_error = e
+
+    def _retire(self, seg):
+        if self.recorder.fsync_interval == 0:
+            seg.close()
+            with self.sync_lock:
+                self.live.discard(seg.path)
+            return
+        with self.sync_lock:
+            self.dirty.discard(seg)
+            self.retired.append(seg)
+
+    def _fsync(self, seg):
+        t0 = time.perf_counter()
+        try:
+            seg.fsync()
+        except OSError as e:
+            self.errors += 1
+            self.last_error = e
+        self.fsync_seconds += time.perf_counter() - t0
+        self.fsyncs += 1
+
+    def _sync_loop(self):
+        rec = self.recorder
+        interval = rec.fsync_interval or rec.flush_interval
+        writer = self._threads[0]
+        retain_due = time.monotonic()
+        while True:
+            done = not writer.is_alive()
+            with self.sync_lock:
+                dirty = list(self.dirty) if rec.fsync_interval else []
+                self.dirty.clear()
+                retired, self.retired = self.retired, []
+                created, self.created = self.created, set()
+            for seg in dirty:
+                self._fsync(seg)
+            for seg in retired:
+                self._fsync(seg)
+                seg.close()
+            with self.sync_lock:
+                self.live.difference_update(seg.path for seg in retired)
+            for directory in created:
+                fsync_dir(directory)
+            if done:
+                break
+            if (rec.retain_seconds or rec.retain_bytes) and time.monotonic() >= retain_due:
+                self.enforce_retention(time.time())
+                retain_due = time.monotonic() + rec.retain_interval
+            writer.join(interval)
+
+    def enforce_retention(self, now):
+        """Delete segments past the age limit, then the oldest while over the size limit."""
+        rec = self.recorder
+        segments = []                # (start, path, bytes, last modified)
+        for idx, disk in enumerate(rec.disk_of):
+            if disk is not self:
+                continue
+            directory = os.path.join(self.root, rec.names[idx])
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            for name in names:
+                if not name.endswith(SEGMENT_EXT):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    start = segment_start(path)
+                    st = os.stat(path)
+                except (OSError, ValueError):
+                    continue
+                nbytes = st.st_size
+                for ext in SIDE_EXTS:
+                    try:
+                        nbytes += os.path.getsize(path[:-len(SEGMENT_EXT)] + ext)
+                    except OSError:
+                        pass
+                segments.append((start, path, nbytes, st.st_mtime))
+        segments.sort()
+        with self.sync_lock:
+            live = set(self.live)
+        total = sum(s[2] for s in segments)
+        for start, path, nbytes, modified in segments:
+            expired = rec.retain_seconds and now - modified > rec.retain_seconds
+            if not expired and not (rec.retain_bytes and total > rec.retain_bytes):
+                continue
+            if path in live:
+                continue
+            try:
+                # The index first: a segment without one is skipped by playback
+                # and deleted by the next sweep.
+                for ext in SIDE_EXTS:
+                    try:
+                        os.remove(path[:-len(SEGMENT_EXT)] + ext)
+                    except FileNotFoundError:
+                        pass
+                os.remove(path)
+            except OSError as e:
+                self.errors += 1
+                self.last_error = e
+                continue
+            total -= nbytes
+            self.evicted_segments += 1
+            self.evicted_bytes += nbytes
+
+
+def fsync_dir(path):
+    """Make new file names in `path` durable; not possible on every platform."""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Recorder:
+    """
+    Records every frame the receiver completes. Call add() from the ingest
+    thread with each completed FrameSlot; it never blocks on the disk.
+    With `pre_event` seconds, only frames around trigger() calls are kept.
+    """
+
+    def __init__(self, roots, names, segment_bytes=SEGMENT_BYTES, segment_seconds=SEGMENT_SECONDS,
+                 flush_bytes=FLUSH_BYTES, flush_interval=FLUSH_INTERVAL,
+                 fsync_interval=FSYNC_INTERVAL, buffer_bytes=BUFFER_BYTES,
+                 pre_event=None, post_event=POST_EVENT_SECONDS, ring_bytes=RING_BYTES,
+                 ring_total_bytes=RING_TOTAL_BYTES, ring_frames=RING_FRAMES,
+                 retain_seconds=None, retain_bytes=None, retain_interval=RETAIN_INTERVAL,
+                 thumbnailer=None):
+        if isinstance(roots, str):
+            roots = [roots]
+        self.names = list(names)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.buffer_bytes = buffer_bytes
+        self.pre_event = pre_event
+        self.post_event = post_event
+        self.retain_seconds = retain_seconds
+        self.retain_bytes = retain_bytes      # per record directory
+        self.retain_interval = retain_interval
+        self.thumbnailer = thumbnailer        # thumbnails.Thumbnailer; closed by stop()
+        self.frames = array("Q", [0] * len(self.names))   # written
+        self.bytes = array("Q", [0] * len(self.names))
+        self.dropped = array("Q", [0] * len(self.names))
+        self.events = array("Q", [0] * len(self.names))   # pre-event rings written out
+        self.until = array("d", [0.0] * len(self.names))  # event mode: recording until this time
+        self.ring_bytes = 0
+        if pre_event is not None and self.names:
+            self.ring_bytes = min(ring_bytes, ring_total_bytes // len(self.names))
+        self.disks = [DiskWriter(self, root) for root in roots]
+        self.disk_of = []            # camera index -> DiskWriter
+        for idx in range(len(self.names)):
+            disk = self.disks[idx % len(self.disks)]
+            ring = None
+            if pre_event is not None:
+                ring = PreEventRing(self.ring_bytes, ring_frames, pre_event)
+            disk.add_camera(idx, ring)
+            self.disk_of.append(disk)
+
+    def start(self):
+        for disk in self.disks:
+            disk.start()
+        return self
+
+    def stop(self):
+        """Write out everything staged, fsync and close every segment."""
+        for disk in self.disks:
+            disk.stop()
+        if self.thumbnailer is not None:
+            self.thumbnailer.close()
+
+    def add(self, idx, slot):
+        """Ingest thread: record camera `idx`'s completed frame. False if dropped."""
+        return self.disk_of[idx].add(idx, slot)
+
+    def trigger(self, idx, at=None, post_event=None):
+        """
+        Any thread: an event on camera `idx` at wall-clock `at` (default now).
+        Writes its pre-event frames and records it for post_event seconds more.
+        """
+        at = time.time() if at is None else at
+        post = self.post_event if post_event is None else post_event
+        self.disk_of[idx].trigger(idx, at + post)
+
+    def camera_dir(self, idx):
+        return os.path.join(self.disk_of[idx].root, self.names[idx])
+
+    def register_metrics(self, registry):
+        """Add the recorder's counters to a metrics.Registry."""
+        cam = ("camera",)
+        disk = ("disk",)
+        frames = registry.counter("recorder_frames_total", "Frames written to disk", cam)
+        nbytes = registry.counter("recorder_bytes_total", "Record bytes written to disk", cam)
+        dropped = registry.counter("recorder_dropped_frames_total",
+                                   "Frames not recorded (disk behind or failing)", cam)
+        pending = registry.gauge("recorder_pending_bytes", "Bytes staged, not yet written", disk)
+        writes = registry.counter("recorder_writes_total", "Bulk writes", disk)
+        write_s = registry.counter("recorder_write_seconds_total", "Time in write()", disk)
+        fsyncs = registry.counter("recorder_fsyncs_total", "Segment fsyncs", disk)
+        fsync_s = registry.counter("recorder_fsync_seconds_total", "Time in fsync()", disk)
+        errors = registry.counter("recorder_errors_total", "Failed writes and fsyncs", disk)
+        events = registry.counter("recorder_events_total", "Pre-event buffers written on a trigger", cam)
+        ring = registry.gauge("recorder_pre_event_seconds", "Seconds of frames in the pre-event buffer",
+                              cam)
+        evicted = registry.counter("recorder_evicted_segments_total", "Segments deleted by retention",
+                                   disk)
+        evicted_b = registry.counter("recorder_evicted_bytes_total", "Bytes deleted by retention", disk)
+        thumbs = registry.counter("recorder_thumbnails_total", "Thumbnails by outcome", ("outcome",))
+        thumb_b = registry.counter("recorder_thumbnail_bytes_total", "Thumbnail JPEG bytes written")
+
+        def collect():
+            for idx, name in enumerate(self.names):
+                frames.labels(name).set(self.frames[idx])
+                nbytes.labels(name).set(self.bytes[idx])
+                dropped.labels(name).set(self.dropped[idx])
+                if self.pre_event is not None:
+                    events.labels(name).set(self.events[idx])
+                    ring.labels(name).set(self.disk_of[idx].ring_seconds(idx))
+            for d in self.disks:
+                pending.labels(d.root).set(d.pending)
+                writes.labels(d.root).set(d.writes)
+                write_s.labels(d.root).set(d.write_seconds)
+                fsyncs.labels(d.root).set(d.fsyncs)
+                fsync_s.labels(d.root).set(d.fsync_seconds)
+                errors.labels(d.root).set(d.errors)
+                evicted.labels(d.root).set(d.evicted_segments)
+                evicted_b.labels(d.root).set(d.evicted_bytes)
+            t = self.thumbnailer
+            if t is not None:
+                for outcome, value in (("made", t.made), ("skipped", t.skipped), ("failed", t.errors)):
+                    thumbs.labels(outcome).set(value)
+                thumb_b.labels().set(t.bytes)
+
+        registry.add_collector(collect)
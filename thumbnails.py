@@ -0,0 +1,185 @@
+"""
+Thumbnails of recorded footage, and contact sheets built from them.
+
+While recording, the disk writer offers each camera's frames to a
+Thumbnailer, which takes one every THUMB_INTERVAL seconds and has it
+shrunk in a process pool: the JPEG is decoded in draft mode, so libjpeg
+scales it by 1/2 to 1/8 while decoding and the full frame is never
+built, then fitted into THUMB_SIZE and encoded again. The thumbnails of
+a segment are appended to a .thm file next to its .seg, each a THUMB
+header followed by the small JPEG, a few KB per thumbnail.
+
+contact_sheet() lays out the thumbnails of a time range as a grid, from
+the .thm files alone; no recorded frame is read or decoded.
+"""
+import bisect
+import glob
+import io
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw
+
+from recorder import SEGMENT_EXT, segment_start
+
+THUMB = struct.Struct("<dI")         # wall-clock time of the frame, thumbnail JPEG size
+THUMB_EXT = ".thm"
+
+THUMB_INTERVAL = 2.0                 # seconds between thumbnails per camera
+THUMB_SIZE = (160, 120)              # largest thumbnail; the frame's aspect ratio is kept
+THUMB_QUALITY = 70
+THUMB_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+THUMB_QUEUE = 256                    # thumbnails waiting for a worker before more are skipped
+
+
+def thumb_path(segment_path):
+    return segment_path[:-len(SEGMENT_EXT)] + THUMB_EXT
+
+
+def make_thumbnail(jpeg, size=THUMB_SIZE, quality=THUMB_QUALITY):
+    """A JPEG of `jpeg` fitted into `size`, decoded at the smallest draft scale that covers it."""
+    img = Image.open(io.BytesIO(jpeg))
+    img.draft("RGB", size)
+    img = img.convert("RGB")
+    img.thumbnail(size, Image.BILINEAR)
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+def read_thumbnails(path):
+    """(ts, JPEG bytes) for every complete thumbnail in a .thm file, in file order."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    thumbs = []
+    off = 0
+    while off + THUMB.size <= len(data):
+        ts, size = THUMB.unpack_from(data, off)
+        start = off + THUMB.size
+        if start + size > len(data):
+            break  # still being appended
+        thumbs.append((ts, data[start:start + size]))
+        off = start + size
+    return thumbs
+
+
+class Thumbnailer:
+    """
+    Makes a thumbnail per camera every `interval` seconds of recording.
+
+    The disk writer calls due() and submit() for the records it writes;
+    the thumbnail is made in a worker process and appended to the
+    segment's .thm file by the pool's callback thread. At most `queue`
+    thumbnails wait for a worker; past that they are skipped and counted,
+    so a slow machine gets sparser thumbnails, never a growing backlog.
+    """
+
+    def __init__(self, interval=THUMB_INTERVAL, size=THUMB_SIZE, quality=THUMB_QUALITY,
+                 workers=THUMB_WORKERS, queue=THUMB_QUEUE):
+        self.interval = interval
+        self.size = size
+        self.quality = quality
+        self.queue = queue
+        self.last = {}               # camera index -> time of its last thumbnail
+        self.pending = 0
+        self.made = 0
+        self.skipped = 0
+        self.errors = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+        # Workers are spawned, not forked: the recorder and receiver threads are running.
+        self._pool = ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context("spawn"))
+
+    def due(self, idx, ts):
+        return ts - self.last.get(idx, float("-inf")) >= self.interval
+
+    def submit(self, idx, segment_path, ts, jpeg):
+        """Queue a thumbnail of `jpeg` (copied) for camera `idx`'s segment."""
+        self.last[idx] = ts
+        with self.lock:
+            if self.pending >= self.queue:
+                self.skipped += 1
+                return
+            self.pending += 1
+        try:
+            future = self._pool.submit(make_thumbnail, bytes(jpeg), self.size, self.quality)
+        except RuntimeError:
+            # The pool is shut down or broken (a worker died); recording goes on without.
+            with self.lock:
+                self.pending -= 1
+                self.errors += 1
+            return
+        future.add_done_callback(lambda f: self._store(thumb_path(segment_path), ts, f))
+
+    def _store(self, path, ts, future):
+        try:
+            thumb = future.result()
+            with self.lock:
+                with open(path, "ab") as f:
+                    f.write(THUMB.pack(ts, len(thumb)) + thumb)
+                self.made += 1
+                self.bytes += len(thumb)
+        except Exception:
+            # A damaged frame, a deleted segment or a shut-down pool: no thumbnail.
+            with self.lock:
+                self.errors += 1
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def close(self):
+        """Finish the thumbnails queued and stop the workers."""
+        self._pool.shutdown(wait=True)
+
+
+def thumbnails(directory, start, end):
+    """(ts, JPEG bytes) of one camera's thumbnails from `start` to `end`, in time order."""
+    paths = []
+    starts = []
+    for path in sorted(glob.glob(os.path.join(directory, "*" + THUMB_EXT))):
+        try:
+            starts.append(segment_start(path[:-len(THUMB_EXT)] + SEGMENT_EXT))
+        except ValueError:
+            continue
+        paths.append(path)
+    found = []
+    # From the segment `start` falls in to the last one starting by `end`.
+    for n in range(max(0, bisect.bisect_right(starts, start) - 1), bisect.bisect_right(starts, end)):
+        found.extend(t for t in read_thumbnails(paths[n]) if start <= t[0] <= end)
+    found.sort(key=lambda t: t[0])
+    return found
+
+
+def contact_sheet(directory, start, end, columns=8, limit=64, size=THUMB_SIZE):
+    """
+    A grid of camera `directory`'s thumbnails from `start` to `end`, each
+    labelled with its local time, or None if there are none. With more
+    than `limit` thumbnails in the range, `limit` evenly spaced ones are used.
+    """
+    found = thumbnails(directory, start, end)
+    if not found:
+        return None
+    if len(found) > limit:
+        step = len(found) / limit
+        found = [found[int(i * step)] for i in range(limit)]
+    columns = min(columns, len(found))
+    rows = (len(found) + columns - 1) // columns
+    w, h = size
+    label = 14
+    sheet = Image.new("RGB", (columns * (w + 4) + 4, rows * (h + label + 4) + 4), (24, 24, 24))
+    draw = ImageDraw.Draw(sheet)
+    for i, (ts, jpeg) in enumerate(found):
+        x = 4 + (i % columns) * (w + 4)
+        y = 4 + (i // columns) * (h + label + 4)
+        thumb = Image.open(io.BytesIO(jpeg))
+        sheet.paste(thumb, (x + (w - thumb.width) // 2, y + (h - thumb.height) // 2))
+        draw.text((x + 2, y + h + 1), time.strftime("%H:%M:%S", time.localtime(ts)), fill=(220, 220, 220))
+    return sheet
@@ -0,0 +1,172 @@
+"""
+Generate lib/ov5642_tables/ from the register lists in tools/OV5642_reg_src.py.
+
+Each table becomes its own module, named after the table in lower case,
+holding one bytes constant REGS of 3-byte entries (address high, address
+low, value) without the [0xffff, 0xff] terminator. Arducam.load_regs()
+imports one table at a time and wrSensorRegs16_8 consumes the blob.
+
+shadow_regs.py lists the registers the driver keeps a shadow copy of:
+every register in the resolution tables (OV5642_JPEG_TABLES in
+lib/Arducam.py) plus OV5642_JPEG_QSCALE, sorted, as 2-byte addresses.
+Edit the source lists, then run:
+
+    python tools/gen_ov5642_tables.py           # rewrite lib/ov5642_tables/
+    python tools/gen_ov5642_tables.py --check   # verify it is current and identical
+"""
+import argparse
+import ast
+import os
+import sys
+
+TOOLS = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(TOOLS, "OV5642_reg_src.py")
+DRIVER = os.path.join(TOOLS, "..", "lib", "Arducam.py")
+OUT = os.path.join(TOOLS, "..", "lib", "ov5642_tables")
+
+ENTRIES_PER_LINE = 8
+
+
+def load_source(path=SRC):
+    """[(name, [(addr, val), ...]), ...] in file order, up to each terminator."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    tables = []
+    for node in tree.body:
+        name = node.targets[0].id
+        regs = []
+        for addr, val in ast.literal_eval(node.value):
+            if addr == 0xffff and val == 0xff:
+                break
+            regs.append((addr, val))
+        tables.append((name, regs))
+    return tables
+
+
+def driver_constants(path=DRIVER):
+    """(resolution table names, JPEG qscale register) from the driver source."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    consts = {node.targets[0].id: node.value for node in tree.body
+              if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)}
+    names = [ast.literal_eval(v) for v in consts["OV5642_JPEG_TABLES"].values]
+    return names, ast.literal_eval(consts["OV5642_JPEG_QSCALE"])
+
+
+def shadow_addrs(tables, driver=DRIVER):
+    """Sorted addresses of the registers Arducam shadows."""
+    names, qscale = driver_constants(driver)
+    regs = dict((name.lower(), regs) for name, regs in tables)
+    addrs = {qscale}
+    for name in names:
+        addrs.update(addr for addr, _ in regs[name])
+    return sorted(addrs)
+
+
+def pack(regs):
+    blob = bytearray()
+    for addr, val in regs:
+        blob += bytes(((addr >> 8) & 0xff, addr & 0xff, val))
+    return bytes(blob)
+
+
+def unpack(blob):
+    return [((blob[i] << 8) | blob[i + 1], blob[i + 2]) for i in range(0, len(blob), 3)]
+
+
+HEADER = "# Generated by tools/gen_ov5642_tables.py from tools/OV5642_reg_src.py; do not edit."
+
+
+def blob_lines(blob, step):
+    return ['    b"' + "".join(f"\\x{b:02x}" for b in blob[i:i + step]) + '"'
+            for i in range(0, len(blob), step)]
+
+
+def render_table(name, regs):
+    lines = [
+        HEADER,
+        f"# {name}: {len(regs)} registers, 3-byte entries (address high, address low, value)",
+        "REGS = (",
+    ]
+    lines += blob_lines(pack(regs), ENTRIES_PER_LINE * 3)
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def render_shadow(addrs):
+    lines = [
+        HEADER,
+        f"# {len(addrs)} registers shadowed by ArducamClass, sorted 2-byte addresses (high, low)",
+        "REGS = (",
+    ]
+    blob = b"".join(bytes(((a >> 8) & 0xff, a & 0xff)) for a in addrs)
+    lines += blob_lines(blob, ENTRIES_PER_LINE * 2)
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def render(tables):
+    """{file name: text} for every file in the package."""
+    files = {"__init__.py": HEADER + "\n# One module per OV5642 register table; see Arducam.load_regs().\n"}
+    for name, regs in tables:
+        files[name.lower() + ".py"] = render_table(name, regs)
+    files["shadow_regs.py"] = render_shadow(shadow_addrs(tables))
+    return files
+
+
+def check(tables):
+    """Return a list of problems with the generated package (empty if none)."""
+    problems = []
+    expected = render(tables)
+    try:
+        present = {f for f in os.listdir(OUT) if f.endswith(".py")}
+    except OSError as e:
+        return [f"cannot read {OUT}: {e}"]
+    for fname in sorted(present - set(expected)):
+        problems.append(f"{fname}: not generated from the source lists")
+    for fname, text in expected.items():
+        path = os.path.join(OUT, fname)
+        if fname not in present:
+            problems.append(f"{fname}: missing")
+            continue
+        with open(path) as f:
+            current = f.read()
+        if current != text:
+            problems.append(f"{fname}: out of date; rerun without --check")
+    for name, regs in tables:
+        fname = name.lower() + ".py"
+        if fname not in present:
+            continue
+        generated = {}
+        with open(os.path.join(OUT, fname)) as f:
+            exec(compile(f.read(), fname, "exec"), generated)
+        if unpack(generated["REGS"]) != regs:
+            problems.append(f"{name}: register sequence differs")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--check", action="store_true",
+                    help="fail if lib/ov5642_tables/ is stale or differs from the source lists")
+    args = ap.parse_args()
+
+    tables = load_source()
+    count = sum(len(regs) for _, regs in tables)
+    if args.check:
+        problems = check(tables)
+        for p in problems:
+            print(p)
+        if problems:
+            sys.exit(1)
+        print(f"{len(tables)} tables, {count} registers identical")
+        return
+    os.makedirs(OUT, exist_ok=True)
+    for fname, text in render(tables).items():
+        with open(os.path.join(OUT, fname), "w") as f:
+            f.write(text)
+    print(f"wrote {os.path.relpath(OUT)}/: {len(tables)} tables, {count} registers")
+
+
+if __name__ == "__main__":
+    main()